@@ -0,0 +1,88 @@
+import asyncio
+import threading
+
+
+class GloveDatagramProtocol(asyncio.DatagramProtocol):
+    """ Protocolo UDP: repassa cada datagrama para o callback de decodificação. """
+
+    def __init__(self, on_datagram, on_error=None):
+        self.on_datagram = on_datagram
+        self.on_error = on_error
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.on_datagram(data, addr)
+
+    def error_received(self, exc):
+        if self.on_error:
+            self.on_error(exc)
+
+
+class AsyncioReceiver:
+    """
+    Receptor UDP baseado em asyncio, com um único event loop em thread própria.
+
+    Vários sockets (uma luva por porta, canal de controle, ...) podem ser
+    registrados com add_endpoint() sem criar uma thread por socket.
+    """
+
+    def __init__(self):
+        self.loop = None
+        self.thread = None
+        self.transports = []
+        self._ready = threading.Event()
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self._ready.clear()
+        self.thread = threading.Thread(target=self._run_loop, daemon=True)
+        self.thread.start()
+        self._ready.wait()
+
+    def _run_loop(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self._ready.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.close()
+
+    def add_endpoint(self, sock, on_datagram, on_error=None, timeout=2.0):
+        """
+        Registra um socket UDP já configurado/bindado no event loop.
+        Pode ser chamado de qualquer thread. Retorna o transport criado.
+        """
+        async def _create():
+            transport, _ = await self.loop.create_datagram_endpoint(
+                lambda: GloveDatagramProtocol(on_datagram, on_error),
+                sock=sock
+            )
+            return transport
+
+        future = asyncio.run_coroutine_threadsafe(_create(), self.loop)
+        transport = future.result(timeout)
+        self.transports.append(transport)
+        return transport
+
+    def stop(self):
+        """ Fecha todos os sockets e encerra o event loop. """
+        if not self.loop or not self.thread:
+            return
+
+        async def _shutdown():
+            for transport in self.transports:
+                transport.close()
+            self.transports = []
+            # Deixa o loop rodar uma vez para os sockets serem realmente fechados
+            await asyncio.sleep(0)
+            self.loop.stop()
+
+        if self.loop.is_running():
+            asyncio.run_coroutine_threadsafe(_shutdown(), self.loop)
+        self.thread.join(timeout=1.0)
+        self.thread = None
@@ -0,0 +1,190 @@
+"""
+Confere e mede o desacoplamento de crosstalk da Guitar.
+
+Passa as mesmas amostras por:
+  - original : cópia do laço O(dedos²) sobre dicts (algoritmo de referência)
+  - mask     : Guitar.process_data com CROSSTALK_MODE="mask", uma amostra por
+               chamada (caminho por amostra, Guitar._process_rows)
+  - lstsq    : idem com CROSSTALK_MODE="lstsq" (desmistura por mínimos quadrados)
+  - lote     : "mask" pelo Guitar.process_batch, a gravação inteira numa chamada
+
+"mask" e "lote" têm que dar exatamente as mesmas lanes que "original"; "lstsq" é
+outro modelo, então só mostra em quantas amostras as lanes diferem. O gatilho
+(histerese, hold/rearm; ver trigger.py) fica desligado para comparar com o
+limiar simples do original.
+
+Uso:
+    python bench_crosstalk.py sessao.airrec [--mappings sensor_mappings.json]
+    python bench_crosstalk.py --synthetic 20000 [--gain 1.2]
+"""
+import argparse
+import json
+import random
+import time
+
+from communication import Communication
+from instruments import Guitar
+from mapping_plan import MappingPlan
+from session_recorder import SessionReader
+
+
+def legacy_lanes(raw_activations, mappings, actions, gain, threshold):
+    """ Passo 2 original da Guitar.process_data (sem as strings de debug). """
+    final_activations = {}
+    for target_action in actions:
+        if target_action not in raw_activations:
+            final_activations[target_action] = 0.0
+            continue
+        my_raw_activation = raw_activations[target_action]
+        target_calib = mappings.get(target_action, {})
+        target_sensor_key = target_calib.get("key")
+        target_rest = float(target_calib.get("rest", 0))
+        target_full = float(target_calib.get("full", 1))
+        target_range = target_full - target_rest
+
+        total_interference = 0.0
+        for other_action in actions:
+            if other_action == target_action:
+                continue
+            other_raw_activation = raw_activations.get(other_action, 0.0)
+            if other_raw_activation > 0.05 and target_sensor_key:
+                crosstalk_ref = mappings.get(other_action, {}).get("crosstalk_ref", {})
+                value = crosstalk_ref.get(target_sensor_key)
+                if value is not None and abs(target_range) > 10:
+                    coupling_factor = (value - target_rest) / target_range
+                    current_interference = (other_raw_activation * coupling_factor) * gain
+                    if current_interference > 0:
+                        total_interference += current_interference
+        final_activations[target_action] = max(0.0, my_raw_activation - total_interference)
+    return [1 if final_activations.get(a, 0) > threshold else 0 for a in actions]
+
+
+def legacy_raw(logical_data, mappings, actions, smoothed, alpha):
+    """ Passo 1 original (filtro + normalização). """
+    raw_activations = {}
+    for action in actions:
+        if action not in mappings:
+            continue
+        calib = mappings[action]
+        key = calib.get("key")
+        if not key or key not in logical_data:
+            raw_activations[action] = 0.0
+            continue
+        raw_val = float(logical_data[key])
+        prev_val = smoothed.get(action, raw_val)
+        val = raw_val * alpha + prev_val * (1.0 - alpha)
+        smoothed[action] = val
+        try:
+            rest = float(calib.get("rest", 0))
+            full = float(calib.get("full", 1))
+        except (ValueError, TypeError):
+            raw_activations[action] = 0.0
+            continue
+        if abs(full - rest) > 0.1:
+            raw_activations[action] = max(0.0, min(1.0, (val - rest) / (full - rest)))
+        else:
+            raw_activations[action] = 0.0
+    return raw_activations
+
+
+def plain_guitar():
+    """ Guitar com gatilho de limiar simples, como o algoritmo original. """
+    guitar = Guitar()
+    guitar.TRIGGER_HYSTERESIS = 0.0
+    guitar.MIN_HOLD_TIME = 0.0
+    guitar.REARM_DELAY = 0.0
+    return guitar
+
+
+class _Capture:
+    def __init__(self):
+        self.lanes = []
+
+    def atualizar_estado(self, novo_estado):
+        self.lanes.append(tuple(novo_estado))
+
+
+def load_recording(path):
+    comm = Communication()
+    reader = comm.open_reader()
+    session = SessionReader(path)
+    samples = []
+    for t_host, addr, data in session:
+        comm._handle_datagram(data, addr)
+        for sample in reader.drain():
+            samples.append({name: sample[name] for name in sample.dtype.names})
+    session.close()
+    return samples
+
+
+def synthetic(n, mappings):
+    """ Dedos dobrando em sequência + ruído, na escala da calibração. """
+    random.seed(1)
+    calibs = [c for c in mappings.values() if "key" in c]
+    samples = []
+    for i in range(n):
+        sample = {}
+        for f, calib in enumerate(calibs):
+            rest, full = float(calib["rest"]), float(calib["full"])
+            bent = 1.0 if (i // 50) % (len(calibs) + 1) == f else 0.0
+            sample[calib["key"]] = rest + bent * (full - rest) + random.gauss(0, 0.05 * abs(full - rest))
+        samples.append(sample)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", help="Gravação .airrec (session_recorder.py)")
+    parser.add_argument("--mappings", default="sensor_mappings.json")
+    parser.add_argument("--synthetic", type=int, default=0, help="Usa N amostras sintéticas em vez de gravação")
+    parser.add_argument("--gain", type=float, default=1.0, help="CROSSTALK_GAIN")
+    args = parser.parse_args()
+
+    with open(args.mappings) as f:
+        mappings = json.load(f)
+    if args.path:
+        samples = load_recording(args.path)
+    else:
+        samples = synthetic(args.synthetic or 20000, mappings)
+    if not samples:
+        print("Nenhuma amostra.")
+        return
+
+    reference = Guitar()
+    actions = reference.finger_actions
+    smoothed = {}
+    t0 = time.perf_counter()
+    expected = []
+    for sample in samples:
+        raw = legacy_raw(sample, mappings, actions, smoothed, reference.FILTER_ALPHA)
+        expected.append(tuple(legacy_lanes(raw, mappings, actions, args.gain, reference.TRIGGER_THRESHOLD)))
+    t_ref = time.perf_counter() - t0
+
+    print(f"{len(samples)} amostras, ganho {args.gain:g}")
+    print(f"{'modo':<10}{'us/amostra':>12}{'lanes diferentes':>18}")
+    print(f"{'original':<10}{t_ref / len(samples) * 1e6:>12.1f}{'-':>18}")
+    for mode in ("mask", "lstsq"):
+        guitar = plain_guitar()
+        guitar.CROSSTALK_GAIN = args.gain
+        guitar.CROSSTALK_MODE = mode
+        capture = _Capture()
+        t0 = time.perf_counter()
+        for sample in samples:
+            guitar.process_data(sample, mappings, capture)
+        elapsed = time.perf_counter() - t0
+        diffs = sum(a != b for a, b in zip(expected, capture.lanes))
+        print(f"{mode:<10}{elapsed / len(samples) * 1e6:>12.1f}{diffs:>18}")
+
+    guitar = plain_guitar()
+    guitar.CROSSTALK_GAIN = args.gain
+    plan = MappingPlan(mappings, guitar.finger_actions)
+    values = plan.extract_batch(samples)
+    t0 = time.perf_counter()
+    lanes = guitar.process_batch(values, plan)
+    elapsed = time.perf_counter() - t0
+    diffs = sum(tuple(row) != b for row, b in zip(lanes.tolist(), expected))
+    print(f"{'lote':<10}{elapsed / len(samples) * 1e6:>12.1f}{diffs:>18}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Microbenchmark da decodificação de pacotes da luva.
+
+Compara, em amostras/s (sem rede, só CPU):
+  - struct+dict : caminho antigo (struct.unpack + dict de 21 chaves por pacote)
+  - legado      : Communication._handle_datagram com 1 amostra por datagrama
+  - lote K      : Communication._handle_datagram com o formato v2 (K amostras/datagrama)
+
+Uso:
+    python bench_decoder.py [--samples 200000] [--batch 10 25]
+"""
+import argparse
+import struct
+import time
+
+from communication import Communication
+from sample_buffer import SENSOR_FIELDS
+
+ADDR = ("127.0.0.1", 8888)
+
+
+def make_packet(i):
+    values = [i % 100] * 9 + [0.5] * 5 + [i % 100] * 6 + [i & 0xFFFFFFFF]
+    return struct.pack(Communication.STRUCT_FORMAT, *values)
+
+
+def bench_struct_dict(packets):
+    t0 = time.perf_counter()
+    for data in packets:
+        values = struct.unpack(Communication.STRUCT_FORMAT, data)
+        dict(zip(SENSOR_FIELDS, values))
+    return len(packets) / (time.perf_counter() - t0)
+
+
+def bench_legacy(packets):
+    comm = Communication()
+    t0 = time.perf_counter()
+    for data in packets:
+        comm._handle_datagram(data, ADDR)
+    return len(packets) / (time.perf_counter() - t0)
+
+
+def bench_batched(packets, k):
+    datagrams = []
+    for seq in range(0, len(packets) - k + 1, k):
+        header = Communication.BATCH_HEADER.pack(
+            Communication.BATCH_MAGIC, Communication.BATCH_VERSION, k, 0, seq
+        )
+        datagrams.append(header + b"".join(packets[seq:seq + k]))
+
+    comm = Communication()
+    t0 = time.perf_counter()
+    for data in datagrams:
+        comm._handle_datagram(data, ADDR)
+    return len(datagrams) * k / (time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=200000)
+    parser.add_argument("--batch", type=int, nargs="+", default=[10, 25])
+    args = parser.parse_args()
+
+    packets = [make_packet(i) for i in range(args.samples)]
+
+    print(f"{'formato':<14}{'amostras/s':>14}")
+    print(f"{'struct+dict':<14}{bench_struct_dict(packets):>14.0f}")
+    print(f"{'legado':<14}{bench_legacy(packets):>14.0f}")
+    for k in args.batch:
+        print(f"{f'lote {k}':<14}{bench_batched(packets, k):>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Compara os filtros dos dedos da Guitar (FILTER_TYPE), com e sem o disparo
+antecipado (PREDICTIVE_ONSET): atraso de disparo contra disparos falsos.
+
+Referência: as mesmas amostras suavizadas SEM atraso (média móvel
+centrada, que olha o futuro e por isso só existe offline) e passadas pelo
+resto da Guitar sem filtro. Cada disparo (lane 0 -> 1) de um filtro é
+casado com o disparo de referência da mesma lane a até --window ms:
+
+  - atraso : tempo entre o disparo de referência e o do filtro (negativo =
+             adiantado, ex.: Kalman extrapolando a velocidade)
+  - falsos : disparos do filtro sem disparo de referência (tremida, fantasma)
+  - perdidos: disparos de referência que o filtro não reproduziu
+  - cancel : disparos antecipados cancelados (só nas linhas "+pred")
+
+Uso:
+    python bench_filters.py sessao.airrec [--mappings sensor_mappings.json]
+    python bench_filters.py --synthetic 20000
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from bench_crosstalk import synthetic
+from communication import Communication
+from instruments import Guitar
+from mapping_plan import MappingPlan
+from session_recorder import SessionReader
+
+
+def load_recording(path):
+    """ Gravação -> (amostras estruturadas, instante de cada uma em s). """
+    comm = Communication()
+    reader = comm.open_reader()
+    session = SessionReader(path)
+    batches = []
+    for t_host, addr, data in session:
+        comm._handle_datagram(data, addr)
+        batch = reader.drain()
+        if len(batch):
+            batches.append(batch)
+    session.close()
+    if not batches:
+        return None, None
+    samples = np.concatenate(batches)
+    times = np.where(np.isnan(samples["t_sampled"]), samples["t_recv"], samples["t_sampled"])
+    return samples, times
+
+
+def centered_smooth(values, width):
+    """ Média móvel centrada por coluna (sem atraso; NaN continua NaN). """
+    if width <= 1:
+        return values
+    kernel = np.ones(width) / width
+    out = np.empty_like(values)
+    for col in range(values.shape[1]):
+        padded = np.pad(values[:, col], (width // 2, width - 1 - width // 2), mode="edge")
+        out[:, col] = np.convolve(padded, kernel, mode="valid")
+    return out
+
+
+def onsets(lanes):
+    """ Índices (amostra, lane) onde a lane passa de 0 para 1. """
+    previous = np.vstack((np.zeros((1, lanes.shape[1]), dtype=lanes.dtype), lanes[:-1]))
+    return np.argwhere((lanes == 1) & (previous == 0))
+
+
+def score(lanes, reference, times, window):
+    """ Casa os disparos com a referência: (atrasos em s, falsos, perdidos). """
+    delays = []
+    false = 0
+    missed = 0
+    hits = onsets(lanes)
+    refs = onsets(reference)
+    for lane in range(lanes.shape[1]):
+        ref_t = times[refs[refs[:, 1] == lane, 0]]
+        used = np.zeros(len(ref_t), dtype=bool)
+        for i in hits[hits[:, 1] == lane, 0]:
+            # Disparo de referência mais antigo ainda não usado dentro da janela
+            t = times[i]
+            candidates = np.flatnonzero(~used & (np.abs(ref_t - t) <= window))
+            if len(candidates) == 0:
+                false += 1
+                continue
+            j = candidates[0]
+            used[j] = True
+            delays.append(t - ref_t[j])
+        missed += int((~used).sum())
+    return np.array(delays), false, missed
+
+
+def run(guitar, values, plan, times):
+    t0 = time.perf_counter()
+    lanes = guitar.process_batch(values, plan, times=times)
+    return lanes, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", help="Gravação .airrec (session_recorder.py)")
+    parser.add_argument("--mappings", default="sensor_mappings.json")
+    parser.add_argument("--synthetic", type=int, default=0, help="Usa N amostras sintéticas (100 Hz) em vez de gravação")
+    parser.add_argument("--smooth", type=int, default=5, help="Largura da média centrada da referência (amostras)")
+    parser.add_argument("--window", type=float, default=150.0, help="Atraso máximo para casar um disparo (ms)")
+    parser.add_argument("--min-cutoff", type=float, default=1.0, help="ONE_EURO_MIN_CUTOFF (Hz)")
+    parser.add_argument("--beta", type=float, default=0.5, help="ONE_EURO_BETA")
+    parser.add_argument("--kalman-q", type=float, default=1e3, help="KALMAN_Q")
+    parser.add_argument("--lead", type=float, default=25.0, help="PREDICT_LEAD_TIME (ms)")
+    args = parser.parse_args()
+
+    with open(args.mappings) as f:
+        mappings = json.load(f)
+    plan = MappingPlan(mappings, Guitar().finger_actions)
+    if args.path:
+        samples, times = load_recording(args.path)
+    else:
+        samples = synthetic(args.synthetic or 20000, mappings)
+        times = np.arange(len(samples)) / 100.0
+    if samples is None or len(samples) == 0:
+        print("Nenhuma amostra.")
+        return
+    values = plan.extract_batch(samples)
+
+    reference_guitar = Guitar()
+    reference_guitar.FILTER_ALPHA = 1.0  # Sem filtro: a suavização já veio da média centrada
+    reference = reference_guitar.process_batch(centered_smooth(values, args.smooth), plan, times=times)
+
+    configs = [(f"ema {alpha:.1f}", {"FILTER_TYPE": "ema", "FILTER_ALPHA": alpha}) for alpha in (0.2, 0.4, 0.8)]
+    configs.append(("one_euro", {"FILTER_TYPE": "one_euro", "ONE_EURO_MIN_CUTOFF": args.min_cutoff,
+                                 "ONE_EURO_BETA": args.beta}))
+    configs.append(("kalman", {"FILTER_TYPE": "kalman", "KALMAN_Q": args.kalman_q}))
+    predictive = {"PREDICTIVE_ONSET": True, "PREDICT_LEAD_TIME": args.lead / 1000.0}
+    configs += [(f"{name} +pred", {**params, **predictive}) for name, params in configs]
+
+    print(f"{len(values)} amostras, {len(onsets(reference))} disparos de referência")
+    print(f"{'filtro':<18}{'atraso med (ms)':>16}{'p95 (ms)':>10}{'falsos':>8}{'perdidos':>10}"
+          f"{'cancel':>8}{'us/amostra':>12}")
+    for name, params in configs:
+        guitar = Guitar()
+        for attr, value in params.items():
+            setattr(guitar, attr, value)
+        lanes, elapsed = run(guitar, values, plan, times)
+        delays, false, missed = score(lanes, reference, times, args.window / 1000.0)
+        cancelled = guitar.onset_predictor.cancelled if guitar.PREDICTIVE_ONSET else "-"
+        if len(delays):
+            mean, p95 = f"{delays.mean() * 1000:.1f}", f"{np.percentile(delays, 95) * 1000:.1f}"
+        else:
+            mean, p95 = "-", "-"
+        print(f"{name:<18}{mean:>16}{p95:>10}{false:>8}{missed:>10}{cancelled:>8}"
+              f"{elapsed / len(values) * 1e6:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark dos backends de recepção da Communication.
+
+Compara o receptor com thread dedicada (recvfrom bloqueante) com o
+receptor asyncio (DatagramProtocol) em duas métricas:
+  - Vazão: pacotes/s decodificados com o emissor mandando o mais rápido possível
+  - Latência de despertar: tempo entre o sendto() e o consumidor acordar
+
+Uso:
+    python bench_receiver.py [--packets 20000] [--pings 2000] [--port 8890]
+"""
+import argparse
+import socket
+import struct
+import threading
+import time
+
+import numpy as np
+
+from communication import Communication
+
+
+def make_packet(i):
+    values = [0] * 9 + [0.0] * 5 + [0] * 6 + [i & 0xFFFFFFFF]
+    return struct.pack(Communication.STRUCT_FORMAT, *values)
+
+
+def bench_throughput(backend, port, n_packets):
+    comm = Communication(backend=backend, listen_ip="127.0.0.1", port=port)
+    comm.toggle_connection()
+    time.sleep(0.2)
+
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    packet = make_packet(0)
+    start_count = comm.samples.count
+
+    t0 = time.perf_counter()
+    for _ in range(n_packets):
+        sender.sendto(packet, ("127.0.0.1", port))
+    # Espera o receptor esvaziar a fila do kernel
+    last = -1
+    while comm.samples.count != last:
+        last = comm.samples.count
+        time.sleep(0.05)
+    elapsed = time.perf_counter() - t0 - 0.05
+
+    received = comm.samples.count - start_count
+    comm.toggle_connection()
+    sender.close()
+    return received, received / elapsed
+
+
+def bench_wakeup(backend, port, n_pings):
+    comm = Communication(backend=backend, listen_ip="127.0.0.1", port=port)
+    comm.toggle_connection()
+    time.sleep(0.2)
+
+    reader = comm.open_reader()
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    latencies = np.zeros(n_pings)
+    sent_at = [0.0]
+    go = threading.Event()
+
+    def _send_loop():
+        for i in range(n_pings):
+            go.wait()
+            go.clear()
+            sent_at[0] = time.perf_counter()
+            sender.sendto(make_packet(i), ("127.0.0.1", port))
+
+    threading.Thread(target=_send_loop, daemon=True).start()
+    for i in range(n_pings):
+        go.set()
+        while not reader.wait(timeout=1.0):
+            pass
+        latencies[i] = time.perf_counter() - sent_at[0]
+        reader.drain()
+
+    comm.toggle_connection()
+    sender.close()
+    return latencies * 1e6  # us
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--packets", type=int, default=20000)
+    parser.add_argument("--pings", type=int, default=2000)
+    parser.add_argument("--port", type=int, default=8890)
+    args = parser.parse_args()
+
+    print(f"{'backend':<10}{'recebidos':>12}{'pacotes/s':>12}{'p50 us':>10}{'p95 us':>10}{'p99 us':>10}")
+    for backend in (Communication.BACKEND_THREAD, Communication.BACKEND_ASYNCIO):
+        received, rate = bench_throughput(backend, args.port, args.packets)
+        lat = bench_wakeup(backend, args.port, args.pings)
+        p50, p95, p99 = np.percentile(lat, [50, 95, 99])
+        print(f"{backend:<10}{received:>12}{rate:>12.0f}{p50:>10.1f}{p95:>10.1f}{p99:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
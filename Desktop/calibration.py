@@ -0,0 +1,132 @@
+"""
+Calibração dos dedos a partir de janelas de amostras (não de uma leitura só).
+
+Cada pose (repouso, "só o dedo j dobrado") é capturada por CAPTURE_SECONDS
+com um SampleReader (sem perdas). O modelo ajustado, para todos os
+sensores ao mesmo tempo, é linear:
+
+    leitura[sensor] = repouso[sensor] + sum_j ativação[j] * ganho[j, sensor] + ruído
+
+Empilhando todas as janelas (repouso = ativação 0, pose do dedo j =
+ativação 1 no dedo j) sai um único mínimos quadrados, vetorizado em todos
+os sensores: X (amostras x (1 + dedos)) @ B = Y (amostras x sensores).
+A linha 0 de B é o repouso de cada sensor; a linha j + 1, quanto o dedo j
+move cada sensor (a diagonal é a faixa do dedo, o resto é o acoplamento).
+O desvio dos resíduos por sensor é o ruído, usado para sugerir a
+histerese de soltura.
+"""
+import time
+
+import numpy as np
+
+CAPTURE_SECONDS = 1.0
+NOISE_SIGMAS = 4.0   # Histerese mínima = NOISE_SIGMAS desvios do ruído (em ativação)
+MAX_HYSTERESIS = 0.4  # Acima disso o ruído não cabe abaixo do limiar de toque: recalibrar
+
+
+class SampleWindow:
+    """ Junta as amostras que chegam por 'seconds' s (poll() a cada tick da GUI). """
+
+    def __init__(self, reader, seconds=CAPTURE_SECONDS):
+        self.reader = reader
+        self.reader.skip_to_latest()
+        self.seconds = seconds
+        self.started = time.monotonic()
+        self._batches = []
+
+    @property
+    def progress(self):
+        return min((time.monotonic() - self.started) / self.seconds, 1.0)
+
+    def poll(self):
+        """ Lê o que chegou; True quando a janela terminou. """
+        batch = self.reader.drain()
+        if len(batch):
+            self._batches.append(batch)
+        return self.progress >= 1.0
+
+    def samples(self):
+        if not self._batches:
+            return None
+        return np.concatenate(self._batches)
+
+
+def sensor_matrix(samples, sensors):
+    """ Janela estruturada -> matriz T x S (float64) com as colunas 'sensors'. """
+    return np.column_stack([samples[s].astype(np.float64) for s in sensors])
+
+
+def fit_poses(windows, sensors, fingers):
+    """
+    Ajusta repouso + ganho de cada dedo em todos os sensores.
+
+    windows: lista de (pose, amostras), pose = None para repouso ou o nome
+    do dedo dobrado; só entram poses de 'fingers'. Retorna um dict com:
+        rest[S], gain[N, S]   (NaN onde o dedo não tem janela)
+        noise[S]              desvio dos resíduos por sensor
+        counts                amostras por pose
+    """
+    index = {finger: i for i, finger in enumerate(fingers)}
+    n = len(fingers)
+    xs, ys, counts = [], [], {}
+    for pose, samples in windows:
+        if samples is None or len(samples) == 0 or (pose is not None and pose not in index):
+            continue
+        y = sensor_matrix(samples, sensors)
+        x = np.zeros((len(y), 1 + n))
+        x[:, 0] = 1.0
+        if pose is not None:
+            x[:, 1 + index[pose]] = 1.0
+        xs.append(x)
+        ys.append(y)
+        counts[pose] = counts.get(pose, 0) + len(y)
+    if not xs:
+        raise ValueError("Nenhuma janela de calibração capturada.")
+    x = np.vstack(xs)
+    y = np.vstack(ys)
+
+    # Só as colunas com dados (dedos sem janela ficam de fora do sistema)
+    used = np.flatnonzero(x.any(axis=0))
+    coef, _, _, _ = np.linalg.lstsq(x[:, used], y, rcond=None)
+    full_coef = np.full((1 + n, len(sensors)), np.nan)
+    full_coef[used] = coef
+    residual = y - x[:, used] @ coef
+    dof = max(len(y) - len(used), 1)
+    noise = np.sqrt((residual ** 2).sum(axis=0) / dof)
+    return {"rest": full_coef[0], "gain": full_coef[1:], "noise": noise, "counts": counts}
+
+
+def finger_mapping(fit, sensors, fingers, finger, key):
+    """
+    Entrada do sensor_mappings.json para 'finger' lido em 'key', no formato
+    que o MappingPlan já entende ('key', 'rest', 'full', 'crosstalk_ref'),
+    mais o ruído medido e a margem de soltura ('hysteresis', em ativação)
+    que ele pede. A soltura em si sai do limiar de toque em uso na Guitar.
+
+    ValueError se a faixa do dedo for nula ou o ruído pedir uma histerese
+    maior que MAX_HYSTERESIS (o dedo nunca soltaria de forma confiável).
+    """
+    s = sensors.index(key)
+    j = fingers.index(finger)
+    rest = fit["rest"]
+    gain = fit["gain"][j]
+    span = float(gain[s])
+    noise = float(fit["noise"][s])
+    if not (np.isfinite(span) and span != 0):
+        raise ValueError(f"o sensor {key} não mudou com o dedo dobrado.")
+    noise_activation = noise / abs(span)
+    hysteresis = NOISE_SIGMAS * noise_activation
+    if not hysteresis <= MAX_HYSTERESIS:
+        raise ValueError(
+            f"ruído de {noise * 1000:.1f} mV é grande demais para a faixa de {abs(span):.3f} V do sensor {key} "
+            f"(histerese {hysteresis:.2f} > {MAX_HYSTERESIS:.2f}). Dobre mais o dedo ou confira o sensor.")
+    return {
+        "key": key,
+        "rest": float(rest[s]),
+        "full": float(rest[s] + span),
+        # Leitura esperada de cada outro sensor com só este dedo dobrado
+        "crosstalk_ref": {other: float(rest[i] + gain[i]) for i, other in enumerate(sensors) if other != key},
+        "noise": noise,
+        "noise_activation": noise_activation,
+        "hysteresis": hysteresis,
+    }
@@ -1,13 +1,20 @@
 import cv2
 import mediapipe as mp
 import math
+import threading
 import numpy as np
 
+from logger import get_logger
+
+log = get_logger("camera")
+
 class CameraProcessor:
     """
     Classe responsável pela lógica de Visão Computacional (OpenCV + MediaPipe).
     Processa o frame, desenha o esqueleto/tambores e retorna os dados lógicos.
     """
+    PREVIEW_BUFFERS = 3  # Imagens RGB em rodízio (uma pode estar com o Qt, outra sendo desenhada)
+
     def __init__(self):
         self.cap = None
         
@@ -38,6 +45,11 @@ class CameraProcessor:
         self.limite_angulo_vert = 130.0
         self.limite_angulo_cotovelo = 150.0
 
+        # Buffers reaproveitados entre frames (cv2 dst=), criados no primeiro frame
+        self._flip_buf = None
+        self._buffers = []
+        self._buffer_idx = 0
+
     def start(self):
         """ Tenta iniciar a captura de vídeo. """
         if self.cap is None or not self.cap.isOpened():
@@ -54,34 +66,63 @@ class CameraProcessor:
     def is_active(self):
         return self.cap is not None and self.cap.isOpened()
 
-    def process_frame(self):
+    def read(self):
+        """ Lê um frame cru (BGR) da câmera; None se ela caiu. Bloqueia até o próximo frame. """
+        cap = self.cap
+        if cap is None or not cap.isOpened():
+            return None
+        ret, frame = cap.read()
+        return frame if ret else None
+
+    def process_frame(self, render=True):
         """ 
         Captura um frame, processa a pose e detecta colisões.
         Retorna:
-            - final_image_rgb: Imagem pronta para o Qt (QImage)
+            - final_image_rgb: Imagem pronta para o Qt (QImage), ou None com render=False
             - data: Dicionário com ângulos e vetor de bateria
         """
         if not self.is_active():
             return None, None
 
-        ret, frame = self.cap.read()
-        if not ret:
+        frame = self.read()
+        if frame is None:
             self.stop()
             return None, None
+        return self.process_image(frame, render)
+
+    def _next_buffer(self, shape):
+        """
+        Próximo buffer RGB do rodízio (reaproveitado via dst= do OpenCV).
+        São PREVIEW_BUFFERS buffers: a prévia entregue ao Qt não é
+        sobrescrita pelos frames seguintes antes de ser desenhada.
+        """
+        if not self._buffers or self._buffers[0].shape != shape:
+            self._flip_buf = np.empty(shape, dtype=np.uint8)
+            self._buffers = [np.empty(shape, dtype=np.uint8) for _ in range(self.PREVIEW_BUFFERS)]
+        self._buffer_idx = (self._buffer_idx + 1) % len(self._buffers)
+        return self._buffers[self._buffer_idx]
+
+    def process_image(self, frame, render=True):
+        """
+        Processa um frame já capturado (BGR). Mesmo retorno de process_frame.
 
-        # 1. Espelha horizontalmente (efeito espelho)
-        frame = cv2.flip(frame, 1)
+        Com render=False (modo headless, prévia escondida) só roda a
+        inferência e a colisão: nada é desenhado e a imagem volta None.
+        Com render=True o overlay é desenhado direto na imagem RGB que foi
+        para o MediaPipe (cores convertidas para RGB), sem as conversões
+        RGB -> BGR -> RGB de ida e volta.
+        """
         h, w, _ = frame.shape
-        
-        # 2. Converte para RGB (MediaPipe exige RGB)
-        image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        image_rgb = self._next_buffer(frame.shape)
+
+        # 1. Espelha horizontalmente (efeito espelho) e converte para RGB (MediaPipe exige RGB)
+        cv2.flip(frame, 1, dst=self._flip_buf)
+        cv2.cvtColor(self._flip_buf, cv2.COLOR_BGR2RGB, dst=image_rgb)
         image_rgb.flags.writeable = False # Pequena otimização
         
-        # 3. Inferência do MediaPipe
+        # 2. Inferência do MediaPipe
         results = self.pose_processor.process(image_rgb)
-        
-        # 4. Prepara imagem para desenho (OpenCV usa BGR)
-        image_bgr = cv2.cvtColor(image_rgb, cv2.COLOR_RGB2BGR)
+        image_rgb.flags.writeable = True
 
         # Estrutura de dados de retorno
         data = {
@@ -129,21 +170,22 @@ class CameraProcessor:
             data["Angulo_Esq_Vert"] = ang_esq_vert
             data["Angulo_Dir_Vert"] = ang_dir_vert
 
-            # Define cores baseadas no ângulo (Feedback visual)
-            cor_esq = (0, 0, 255) if ang_esq_vert < self.limite_angulo_vert else (0, 255, 128)
-            cor_dir = (0, 0, 255) if ang_dir_vert < self.limite_angulo_vert else (255, 128, 0)
+            if render:
+                # Define cores baseadas no ângulo (Feedback visual)
+                cor_esq = (0, 0, 255) if ang_esq_vert < self.limite_angulo_vert else (0, 255, 128)
+                cor_dir = (0, 0, 255) if ang_dir_vert < self.limite_angulo_vert else (255, 128, 0)
 
-            # Desenha linhas do braço
-            cv2.line(image_bgr, l_sh, l_el, (0, 255, 0), 3)
-            cv2.line(image_bgr, l_el, l_wr, (0, 255, 0), 3)
-            cv2.line(image_bgr, r_sh, r_el, (0, 255, 255), 3)
-            cv2.line(image_bgr, r_el, r_wr, (0, 255, 255), 3)
-            
-            # Desenha juntas
-            cv2.circle(image_bgr, l_sh, 8, cor_esq, -1)
-            cv2.circle(image_bgr, r_sh, 8, cor_dir, -1)
-            cv2.circle(image_bgr, l_wr, 10, (0, 200, 200), -1) # Pulso
-            cv2.circle(image_bgr, r_wr, 10, (0, 200, 255), -1) # Pulso
+                # Desenha linhas do braço
+                cv2.line(image_rgb, l_sh, l_el, _rgb((0, 255, 0)), 3)
+                cv2.line(image_rgb, l_el, l_wr, _rgb((0, 255, 0)), 3)
+                cv2.line(image_rgb, r_sh, r_el, _rgb((0, 255, 255)), 3)
+                cv2.line(image_rgb, r_el, r_wr, _rgb((0, 255, 255)), 3)
+                
+                # Desenha juntas
+                cv2.circle(image_rgb, l_sh, 8, _rgb(cor_esq), -1)
+                cv2.circle(image_rgb, r_sh, 8, _rgb(cor_dir), -1)
+                cv2.circle(image_rgb, l_wr, 10, _rgb((0, 200, 200)), -1) # Pulso
+                cv2.circle(image_rgb, r_wr, 10, _rgb((0, 200, 255)), -1) # Pulso
 
         # --- LÓGICA DE COLISÃO (BATERIA) ---
         hits_text = []
@@ -190,7 +232,8 @@ class CameraProcessor:
                 self.hold_counters[i] -= 1
             
             # Desenha o tambor
-            cv2.circle(image_bgr, (cx, cy), c['raio'], cor, 2)
+            if render:
+                cv2.circle(image_rgb, (cx, cy), c['raio'], _rgb(cor), 2)
             
 
         # Atualiza os dados finais
@@ -200,10 +243,7 @@ class CameraProcessor:
         # Salva o vetor calculado no dicionário
         data["Drum_Vector"] = current_drum_vector
 
-        # 5. Converte imagem final para RGB (para exibir no PyQt)
-        final_image_rgb = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2RGB)
-        
-        return final_image_rgb, data
+        return (image_rgb if render else None), data
 
     def _calcular_angulo(self, a, b, c):
         """ Calcula ângulo entre 3 pontos (x,y). """
@@ -211,3 +251,134 @@ class CameraProcessor:
         ang = abs(ang)
         if ang > 180: ang = 360 - ang
         return ang
+
+
+def _rgb(cor):
+    """ Cor BGR (convenção do OpenCV usada nas constantes) -> RGB, para desenhar na imagem RGB. """
+    return cor[2], cor[1], cor[0]
+
+
+class LatestFrame:
+    """
+    Troca "só o mais recente" entre a thread de captura e a de inferência:
+    put() sobrescreve o frame anterior (contado em 'dropped' se ninguém o
+    pegou); wait_newer() bloqueia até existir um frame mais novo que o
+    último entregue.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._frame = None
+        self._seq = 0
+        self._taken = 0
+        self.dropped = 0
+
+    def put(self, frame):
+        with self._cond:
+            if self._seq > self._taken:
+                self.dropped += 1
+            self._frame = frame
+            self._seq += 1
+            self._cond.notify()
+
+    def wait_newer(self, timeout):
+        with self._cond:
+            if self._seq == self._taken:
+                self._cond.wait(timeout)
+            if self._seq == self._taken:
+                return None
+            self._taken = self._seq
+            frame, self._frame = self._frame, None
+            return frame
+
+    def wake(self):
+        with self._cond:
+            self._cond.notify_all()
+
+
+class CameraPipeline:
+    """
+    Câmera fora da thread da GUI:
+
+        captura (cap.read bloqueante) -> LatestFrame -> inferência (MediaPipe + colisão)
+
+    Cada resultado vai direto para os 'result_callbacks' (ex.: o
+    InstrumentWorker.update_camera_data), na thread de inferência. Só a
+    prévia opcional (preview_callback, com a imagem) sai daqui para o Qt,
+    e só enquanto preview_enabled; com ela escondida o processador roda
+    headless (sem overlay nem imagem de saída). Uma inferência lenta faz a captura
+    descartar frames velhos em vez de acumular atraso.
+    """
+
+    def __init__(self, processor=None):
+        self.processor = processor or CameraProcessor()
+        self.result_callbacks = []
+        self.preview_callback = None
+        self.preview_enabled = False
+        self.latest_data = None   # Último resultado (para telas que só consultam)
+        self.data_seq = 0
+        self.processed = 0
+        self._slot = LatestFrame()
+        self._running = False
+        self._threads = []
+
+    @property
+    def dropped(self):
+        return self._slot.dropped
+
+    def is_active(self):
+        return self._running and self.processor.is_active()
+
+    def start(self):
+        """ Abre a câmera e inicia as threads (nada a fazer se já estão rodando). """
+        if self.is_active():
+            return True
+        self.stop()
+        if not self.processor.start():
+            return False
+        self._running = True
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name="camera-capture", daemon=True),
+            threading.Thread(target=self._inference_loop, name="camera-inference", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        return True
+
+    def stop(self):
+        self._running = False
+        self._slot.wake()
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+        self._threads = []
+        self.processor.stop()
+
+    def _capture_loop(self):
+        processor = self.processor
+        slot = self._slot
+        while self._running:
+            frame = processor.read()
+            if frame is None:
+                log.warning("Câmera parou de enviar frames.")
+                self._running = False
+                slot.wake()
+                break
+            slot.put(frame)
+
+    def _inference_loop(self):
+        processor = self.processor
+        slot = self._slot
+        while self._running:
+            frame = slot.wait_newer(0.1)
+            if frame is None:
+                continue
+            # Overlay só é desenhado enquanto alguém está vendo a prévia
+            preview = self.preview_callback if self.preview_enabled else None
+            image, data = processor.process_image(frame, render=preview is not None)
+            for callback in self.result_callbacks:
+                callback(data)
+            self.latest_data = data
+            self.data_seq += 1
+            self.processed += 1
+            if preview is not None:
+                preview(image)
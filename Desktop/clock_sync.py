@@ -0,0 +1,150 @@
+import numpy as np
+
+
+class ClockSync:
+    """
+    Estimador online do relógio de uma luva: mapeia o 'timestamp' do pacote
+    (millis() do ESP32, uint32 em ms) para o time.monotonic() do host.
+
+    Cada pacote dá um par (t_device, t_host). A diferença t_host - t_device
+    é offset + atraso de rede/fila; o atraso só SOMA, então os pontos com
+    menor diferença (envelope inferior) são os que passaram pela rede sem
+    esperar. A cada BUCKET_S segundos guarda o ponto de menor diferença e
+    ajusta uma reta por mínimos quadrados sobre os últimos BUCKETS pontos:
+    o coeficiente angular é a deriva entre os cristais e a reta dá o offset.
+
+    to_host() devolve então o instante em que a amostra teria chegado sem
+    nenhuma fila (instante de amostragem + atraso mínimo do link). Assim
+    t_recv - t_sampled mede só o atraso extra da rede/fila.
+    """
+    BUCKET_S = 1.0          # Um ponto do envelope por segundo de dispositivo
+    BUCKETS = 64            # Janela do ajuste (~1 min: deriva de poucos ppm já aparece)
+    MIN_SPAN_S = 5.0        # Abaixo disso a deriva não é confiável (só offset)
+    RESIDUALS = 256         # Atrasos recentes acima do envelope (para a mediana)
+    REBOOT_JUMP_MS = 5000   # millis() e host discordam mais que isso = ESP32 reiniciou
+
+    def __init__(self):
+        self.resets = 0  # Reinícios do firmware detectados
+        self.reset()
+
+    def reset(self):
+        self._clear()
+
+    def _clear(self):
+        self._env_x = np.zeros(self.BUCKETS)  # t_device do ponto mínimo de cada balde (s)
+        self._env_y = np.zeros(self.BUCKETS)  # t_host - t_device desse ponto (s)
+        self._n_env = 0
+        self._bucket_start = None
+        self._bucket_x = 0.0
+        self._bucket_y = float("inf")
+        self._residuals = [0.0] * self.RESIDUALS
+        self.points = 0
+        self._last_raw = None       # Último millis() cru (uint32)
+        self._last_unwrapped = 0    # Mesmo valor, sem o "wrap" de 32 bits (ms)
+        self._last_host = 0.0
+        # Modelo: t_host = t_device + offset + drift * (t_device - ref)
+        self.offset_s = 0.0
+        self.drift = 0.0
+        self._ref_s = 0.0
+
+    def _unwrap(self, device_ts):
+        """ millis() uint32 (array) -> ms desenrolados (int64). O escalar é feito em update(). """
+        diff = ((np.asarray(device_ts, dtype=np.int64) - self._last_raw + 0x80000000) & 0xFFFFFFFF) - 0x80000000
+        return self._last_unwrapped + diff
+
+    def update(self, device_ts, host_time):
+        """
+        Registra um par (millis() do pacote, time.monotonic() da recepção) e
+        retorna o instante de amostragem desse pacote no relógio do host (o
+        mesmo que to_host(device_ts), sem desenrolar de novo).
+
+        Caminho por pacote: só int/float do Python, sem NumPy nem lock.
+        update()/to_host() rodam na thread de recepção; snapshot() de outra
+        thread lê valores soltos (no pior caso, de dois pacotes vizinhos).
+        """
+        device_ts = int(device_ts)
+        if self._last_raw is None:
+            unwrapped = device_ts
+        else:
+            last = self._last_unwrapped
+            unwrapped = last + ((device_ts - self._last_raw + 0x80000000) & 0xFFFFFFFF) - 0x80000000
+            if abs((unwrapped - last) - (host_time - self._last_host) * 1000.0) > self.REBOOT_JUMP_MS:
+                # Reinício do firmware: o relógio antigo não vale mais
+                self.resets += 1
+                self._clear()
+                unwrapped = device_ts
+
+        if self._last_raw is None or unwrapped >= self._last_unwrapped:
+            self._last_raw = device_ts
+            self._last_unwrapped = unwrapped
+            self._last_host = host_time
+
+        device_s = unwrapped / 1000.0
+        delta = host_time - device_s
+
+        if self._bucket_start is None:
+            self._bucket_start = device_s
+            self.offset_s = delta
+            self._ref_s = device_s
+        elif device_s - self._bucket_start >= self.BUCKET_S:
+            self._close_bucket()
+            self._bucket_start = device_s
+
+        if delta < self._bucket_y:
+            self._bucket_x = device_s
+            self._bucket_y = delta
+            if self._n_env == 0:
+                # Ainda sem ajuste: o menor atraso visto é o melhor offset
+                self.offset_s = delta
+                self._ref_s = device_s
+
+        model = self.offset_s + self.drift * (device_s - self._ref_s)
+        self._residuals[self.points % self.RESIDUALS] = delta - model
+        self.points += 1
+        return device_s + model
+
+    def _close_bucket(self):
+        i = self._n_env % self.BUCKETS
+        self._env_x[i] = self._bucket_x
+        self._env_y[i] = self._bucket_y
+        self._n_env += 1
+        self._bucket_y = float("inf")
+
+        n = min(self._n_env, self.BUCKETS)
+        x = self._env_x[:n]
+        y = self._env_y[:n]
+        ref = float(x.mean())
+        if x.max() - x.min() >= self.MIN_SPAN_S:
+            slope, intercept = np.polyfit(x - ref, y, 1)
+            self.drift = float(slope)
+            self.offset_s = float(intercept)
+        else:
+            self.drift = 0.0
+            self.offset_s = float(y.min())
+        self._ref_s = ref
+
+    def to_host(self, device_ts):
+        """
+        Converte millis() (escalar ou array uint32) para o relógio do host
+        (segundos, time.monotonic). Use depois de update() do mesmo pacote;
+        para o próprio pacote, o retorno de update() já é esse valor.
+        """
+        if self._last_raw is None:
+            return np.full(np.shape(device_ts), np.nan) if np.ndim(device_ts) else float("nan")
+        if not np.ndim(device_ts):
+            last = self._last_unwrapped
+            unwrapped = last + ((int(device_ts) - self._last_raw + 0x80000000) & 0xFFFFFFFF) - 0x80000000
+            device_s = unwrapped / 1000.0
+            return device_s + self.offset_s + self.drift * (device_s - self._ref_s)
+        device_s = self._unwrap(device_ts) / 1000.0
+        return device_s + self.offset_s + self.drift * (device_s - self._ref_s)
+
+    def snapshot(self):
+        n = min(self.points, self.RESIDUALS)
+        return {
+            "clock_offset_ms": self.offset_s * 1000.0,
+            "clock_drift_ppm": self.drift * 1e6,
+            "clock_queue_ms": float(np.median(self._residuals[:n])) * 1000.0 if n else 0.0,
+            "clock_points": self.points,
+            "clock_resets": self.resets,
+        }
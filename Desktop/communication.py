@@ -1,6 +1,15 @@
+import json
 import socket
 import struct
+import sys
 import threading
+import time
+import numpy as np
+
+from sample_buffer import SampleRingBuffer, SampleReader, packet_dtype, sample_dtype
+from async_receiver import AsyncioReceiver
+from glove_device import DeviceRegistry
+from session_recorder import SessionRecorder, ReplaySource
 
 class Communication:
     UDP_PORT = 8888
@@ -13,25 +22,86 @@ class Communication:
     # Adicionado 'hhh' antes do último 'hhhI'
     STRUCT_FORMAT = "<hhhhhhiiifffffhhhhhhI" 
     PACKET_SIZE = struct.calcsize(STRUCT_FORMAT)
+    # Mesmo layout do STRUCT_FORMAT, para decodificar com np.frombuffer
+    PACKET_DTYPE = packet_dtype(STRUCT_FORMAT)
+    # Amostra guardada nos buffers: pacote + campos do host ('t_recv')
+    SAMPLE_DTYPE = sample_dtype(PACKET_DTYPE)
+    # Offset do 'timestamp' (último campo, uint32) dentro do pacote
+    TIMESTAMP_OFFSET = PACKET_SIZE - 4
+
+    # --- Formato em lote (v2): K amostras por datagrama ---
+    # Cabeçalho: magic "AB" | versão (B) | nº de amostras K (B) | device_id (H) | seq da 1ª amostra (I)
+    # Seguido de K * PACKET_SIZE bytes no layout do STRUCT_FORMAT.
+    BATCH_MAGIC = b"AB"
+    BATCH_VERSION = 2
+    BATCH_HEADER = struct.Struct("<2sBBHI")
+    MAX_BATCH = 255
+    BUFFER_CAPACITY = 4096  # ~40s de histórico a 100Hz
+    # Luvas de um replay ficam em entradas próprias ("replay:ip:porta"): o
+    # relógio e as estatísticas da luva ao vivo não misturam as duas linhas do tempo
+    REPLAY_PREFIX = "replay:"
+
+    # Timestamps de recepção do kernel (Linux). O módulo socket não exporta a
+    # constante; 35 é o valor de asm-generic/socket.h (x86, ARM).
+    SO_TIMESTAMPNS = getattr(socket, "SO_TIMESTAMPNS", 35 if sys.platform.startswith("linux") else None)
+    TIMESPEC = struct.Struct("@ll")  # struct timespec {tv_sec, tv_nsec}
+
+    # Backends de recepção disponíveis
+    BACKEND_THREAD = "thread"    # Thread dedicada com recvfrom bloqueante
+    BACKEND_ASYNCIO = "asyncio"  # asyncio DatagramProtocol (um loop p/ vários sockets)
+
+    def __init__(self, buffer_capacity=BUFFER_CAPACITY, backend=BACKEND_THREAD,
+                 listen_ip=LISTEN_IP, port=UDP_PORT, rcvbuf=None, kernel_timestamps=False):
+        """
+        rcvbuf: tamanho pedido para o SO_RCVBUF em bytes (None = padrão do SO).
+        kernel_timestamps: marca cada datagrama com o instante de chegada no
+        kernel (SO_TIMESTAMPNS via recvmsg). Só Linux + backend 'thread';
+        nos demais casos é ignorado e 't_kernel' fica 0.
+        """
+        if backend not in (self.BACKEND_THREAD, self.BACKEND_ASYNCIO):
+            raise ValueError(f"Backend inválido: '{backend}'. Use '{self.BACKEND_THREAD}' ou '{self.BACKEND_ASYNCIO}'.")
+        self.backend = backend
+        self.listen_ip = listen_ip
+        self.port = port
+        self.rcvbuf = rcvbuf
+        self.rcvbuf_actual = None  # Valor efetivo (o Linux dobra o pedido e limita por rmem_max)
+        self.kernel_timestamps = kernel_timestamps
+        self.kernel_timestamps_active = False
 
-    def __init__(self):
         self.connected = False
         self.sock = None
         self.receiver_thread = None
-        self.data_lock = threading.Lock()
+        self.async_receiver = None
         self.new_data_event = threading.Event()
         self.network_status_message = "Parado"
-        self.last_sensor_data = {}
+
+        # Histórico pré-alocado: nenhum dict é criado por pacote.
+        # 'samples' junta todas as luvas; cada luva também tem o seu buffer.
+        self.samples = SampleRingBuffer(self.SAMPLE_DTYPE, buffer_capacity, self.PACKET_SIZE)
+        # Cabe o maior lote possível (MAX_BATCH amostras)
+        self._rx_buffer = bytearray(self.BATCH_HEADER.size + self.MAX_BATCH * self.PACKET_SIZE)
+        self.rx_invalid = 0  # Datagramas descartados (tamanho/versão desconhecidos)
+        self.rx_ignored = 0  # Datagramas da rede descartados durante um replay
+
+        # Estado por luva ("ip:porta" -> GloveDevice: buffer, estatísticas, notificação)
+        self.devices = DeviceRegistry(self.SAMPLE_DTYPE, buffer_capacity, self.PACKET_SIZE)
+
+        # Gravação / Replay de sessões
+        self.recorder = None
+        self.replay = None
 
     def toggle_connection(self):
         if self.connected:
             self.connected = False
+            if self.async_receiver:
+                self.async_receiver.stop()
+                self.async_receiver = None
             if self.sock: 
                 try:
                     self.sock.close()
                 except: 
                     pass
-            self.new_data_event.set()
+            self.wake_readers()
             if self.receiver_thread: 
                 self.receiver_thread.join(timeout=1.0)
             self.network_status_message = "Parado"
@@ -39,47 +109,199 @@ class Communication:
             self.connected = True
             self.new_data_event.clear()
             self.network_status_message = "Ouvindo UDP..."
-            self.receiver_thread = threading.Thread(target=self._receive_loop, daemon=True)
-            self.receiver_thread.start()
+            if self.backend == self.BACKEND_ASYNCIO:
+                self._start_asyncio()
+            else:
+                self.receiver_thread = threading.Thread(target=self._receive_loop, daemon=True)
+                self.receiver_thread.start()
+
+    def _open_socket(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if self.rcvbuf:
+            # Fila maior no kernel: absorve rajadas enquanto a thread espera o GIL
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.rcvbuf)
+        self.rcvbuf_actual = sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+        self.kernel_timestamps_active = False
+        if self.kernel_timestamps and self.backend == self.BACKEND_THREAD:
+            self.kernel_timestamps_active = self._enable_kernel_timestamps(sock)
+        sock.bind((self.listen_ip, self.port))
+        return sock
+
+    def _enable_kernel_timestamps(self, sock):
+        if self.SO_TIMESTAMPNS is None or not hasattr(sock, "recvmsg_into"):
+            return False
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, self.SO_TIMESTAMPNS, 1)
+        except OSError:
+            return False
+        return True
+
+    def _kernel_time(self, ancdata):
+        """
+        Extrai o SO_TIMESTAMPNS dos dados auxiliares do recvmsg. O kernel usa
+        CLOCK_REALTIME; converte para time.monotonic() (mesmo relógio do t_recv).
+        """
+        for level, kind, payload in ancdata:
+            if level == socket.SOL_SOCKET and kind == self.SO_TIMESTAMPNS and len(payload) >= self.TIMESPEC.size:
+                sec, nsec = self.TIMESPEC.unpack_from(payload)
+                return sec + nsec * 1e-9 - (time.time() - time.monotonic())
+        return 0.0
+
+    def _handle_datagram(self, data, addr, t_kernel=0.0):
+        """
+        Datagrama da rede, comum a todos os backends. Descartado enquanto
+        um replay roda (as duas fontes não se misturam).
+        t_kernel: chegada no kernel (time.monotonic), 0 se não disponível.
+        """
+        if self.is_replaying():
+            self.rx_ignored += 1
+            return
+        self._decode(data, addr, t_kernel)
+
+    def _handle_replay_datagram(self, data, addr, t_source):
+        """
+        Datagrama do replay, nas entradas REPLAY_PREFIX das luvas.
+        t_source: chegada original (já rebaseada para agora): o relógio da
+        luva e as estatísticas do link usam ela, então o t_sampled mantém o
+        espaçamento gravado em qualquer velocidade.
+        """
+        self._decode(data, addr, 0.0, t_source, self.REPLAY_PREFIX)
+
+    def _decode(self, data, addr, t_kernel=0.0, t_source=0.0, prefix=""):
+        """ Caminho de decodificação comum à rede e ao replay. """
+        t_host = time.monotonic()
+        recorder = self.recorder
+        if recorder:
+            recorder.write(data, addr, t_host)
+
+        size = len(data)
+        if size == self.PACKET_SIZE:
+            # Formato legado: uma amostra por datagrama
+            device_ts, = struct.unpack_from("<I", data, self.TIMESTAMP_OFFSET)
+            device = self.devices.get(prefix + self.device_id_for(addr))
+            # A 1kHz+ vários pacotes têm o mesmo millis(): duplicado = mesmo conteúdo
+            t_sampled = device.push(data, addr, t_host, device_ts, hash(bytes(data)), t_kernel, t_source)
+
+            # Copia os bytes crus direto para o slot do ring buffer (todas as luvas)
+            self.samples.write_bytes(data, t_host, t_sampled, t_kernel)
+            self.new_data_event.set()
+
+        elif size > self.BATCH_HEADER.size and data[:2] == self.BATCH_MAGIC:
+            self._handle_batch(data, addr, t_host, t_kernel, t_source, prefix)
+
+        else:
+            self.rx_invalid += 1
+
+    def _handle_batch(self, data, addr, t_host, t_kernel=0.0, t_source=0.0, prefix=""):
+        """ Formato em lote: decodifica K amostras de uma vez (np.frombuffer). """
+        _, version, count, device_id, seq = self.BATCH_HEADER.unpack_from(data)
+        offset = self.BATCH_HEADER.size
+        if version != self.BATCH_VERSION or count == 0 or len(data) != offset + count * self.PACKET_SIZE:
+            self.rx_invalid += 1
+            return
+
+        # millis() de cada amostra: view com passo de PACKET_SIZE, sem cópia
+        device_ts = np.frombuffer(data, self.PACKET_DTYPE, count, offset)["timestamp"]
+        device = self.devices.get(prefix + self.device_id_for(addr, device_id))
+        t_sampled = device.push_batch(data, count, offset, addr, t_host, seq, device_ts, t_kernel, t_source)
+
+        self.samples.write_batch(data, count, offset, t_host, t_sampled, t_kernel)
+        self.new_data_event.set()
+
+    @staticmethod
+    def device_id_for(addr, device_id=None):
+        """
+        Chave da luva: o ID de dispositivo quando o pacote traz um (formato em
+        lote), senão o endereço de origem.
+        """
+        if device_id is not None:
+            return f"id:{device_id}"
+        return f"{addr[0]}:{addr[1]}"
+
+    def get_device(self, device_id, create=True):
+        """
+        Retorna o GloveDevice de uma luva. Com create=True o dispositivo é
+        registrado mesmo antes do primeiro pacote (para já abrir leitores).
+        """
+        return self.devices.get(device_id, create)
+
+    def list_devices(self):
+        return self.devices.ids()
+
+    def active_device(self, max_silence=None):
+        """
+        Primeira luva (na ordem em que foram registradas) que mandou pacote
+        nos últimos 'max_silence' s (None = em qualquer momento), ou None.
+        """
+        now = time.monotonic()
+        for device in self.devices.all():
+            if device.last_seen is not None and (max_silence is None or now - device.last_seen <= max_silence):
+                return device.device_id
+        return None
+
+    def _buffer_for(self, device_id):
+        """ Buffer de uma luva específica, ou o buffer comum se device_id for None. """
+        if device_id is None:
+            return self.samples
+        return self.devices.get(device_id).samples
+
+    def get_link_stats(self):
+        """ Estatísticas de rede e do relógio por luva: {"ip:porta": {...}}. """
+        return {device.device_id: dict(device.stats.snapshot(), **device.clock.snapshot())
+                for device in self.devices.all() if device.stats.packets > 0}
+
+    def reset_link_stats(self):
+        for device in self.devices.all():
+            device.stats.reset()
+
+    def export_link_stats(self, path):
+        """ Salva as estatísticas atuais em JSON (para comparar canais/posições do Wi-Fi). """
+        report = {
+            "exported_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "port": self.port,
+            "sources": self.get_link_stats(),
+        }
+        with open(path, "w") as f:
+            json.dump(report, f, indent=4)
+
+    def _start_asyncio(self):
+        try:
+            self.sock = self._open_socket()
+            self.async_receiver = AsyncioReceiver()
+            self.async_receiver.start()
+            self.async_receiver.add_endpoint(self.sock, self._handle_datagram, self._on_async_error)
+            self.network_status_message = f"Conectado: {self.port} (asyncio)"
+        except Exception as e:
+            self.network_status_message = f"Erro: {e}"
+            self.connected = False
+            if self.async_receiver:
+                self.async_receiver.stop()
+                self.async_receiver = None
+            if self.sock:
+                try: self.sock.close()
+                except: pass
+
+    def _on_async_error(self, exc):
+        self.network_status_message = f"Erro: {exc}"
 
     def _receive_loop(self):
         try:
-            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            self.sock.bind((self.LISTEN_IP, self.UDP_PORT))
-            self.network_status_message = f"Conectado: {self.UDP_PORT}"
+            self.sock = self._open_socket()
+            self.network_status_message = f"Conectado: {self.port}"
+            if self.kernel_timestamps_active:
+                self.network_status_message += " (timestamps do kernel)"
             
+            rx_view = memoryview(self._rx_buffer)
+            ancbufsize = socket.CMSG_SPACE(self.TIMESPEC.size) if self.kernel_timestamps_active else 0
             while self.connected:
                 try:
-                    data, addr = self.sock.recvfrom(1024)
-
-                    if len(data) == self.PACKET_SIZE:
-                        values = struct.unpack(self.STRUCT_FORMAT, data)
-
-                        new_data = {
-                            # --- MESTRA ---
-                            "gyro_ax": values[0], "gyro_ay": values[1], "gyro_az": values[2],
-                            "gyro_gx": values[3], "gyro_gy": values[4], "gyro_gz": values[5],
-                            "mag_mx": values[6], "mag_my": values[7], "mag_mz": values[8],
-                            "mag_heading": values[9],
-                            "adc_v32": values[10], "adc_v33": values[11],
-                            "adc_v34": values[12], "adc_v35": values[13],
-                            
-                            "slave_ax": values[14],
-                            "slave_ay": values[15],
-                            "slave_az": values[16],
-
-                            "slave_gx": values[17],
-                            "slave_gy": values[18],
-                            "slave_gz": values[19],
-                            
-                            "timestamp": values[20]
-                        }
-                        
-                        with self.data_lock:
-                            self.last_sensor_data = new_data
-                        
-                        self.new_data_event.set()
+                    if ancbufsize:
+                        nbytes, ancdata, _, addr = self.sock.recvmsg_into([self._rx_buffer], ancbufsize)
+                        self._handle_datagram(rx_view[:nbytes], addr, self._kernel_time(ancdata))
+                    else:
+                        nbytes, addr = self.sock.recvfrom_into(self._rx_buffer)
+                        self._handle_datagram(rx_view[:nbytes], addr)
                         
                 except OSError:
                     break
@@ -90,7 +312,63 @@ class Communication:
                 try: self.sock.close()
                 except: pass
             self.connected = False
-            self.new_data_event.set()
+            self.wake_readers()
+
+    # ============ Gravação e Replay ============
+    def start_recording(self, path):
+        """ Passa a gravar todos os datagramas recebidos em 'path'. """
+        self.stop_recording()
+        self.recorder = SessionRecorder(path)
+
+    def stop_recording(self):
+        recorder, self.recorder = self.recorder, None
+        if recorder:
+            recorder.close()
+
+    def is_recording(self):
+        return self.recorder is not None
+
+    def start_replay(self, path, speed=1.0):
+        """
+        Reproduz uma gravação pelo mesmo caminho de decodificação da rede.
+        speed: 1.0 = tempo real, N = N vezes mais rápido, None = o mais rápido possível.
+        Enquanto o replay roda, o que chega da rede é descartado (rx_ignored).
+        """
+        self.stop_replay()
+        # Cada replay recomeça o relógio/estatísticas das suas luvas (os millis() voltam ao início)
+        for device in self.devices.all():
+            if device.device_id.startswith(self.REPLAY_PREFIX):
+                device.reset_sync()
+        label = f"{speed:g}x" if speed else "máx"
+        self.network_status_message = f"Replay ({label}): {path}"
+        self.replay = ReplaySource(path, self._handle_replay_datagram, speed, self._on_replay_finished)
+        self.replay.start()
+
+    def stop_replay(self):
+        replay, self.replay = self.replay, None
+        if replay:
+            replay.stop()
+
+    def is_replaying(self):
+        return self.replay is not None and self.replay.running
+
+    def _on_replay_finished(self):
+        self.network_status_message = "Replay concluído"
+        self.wake_readers()
+
+    def open_reader(self, from_start=False, device_id=None):
+        """
+        Cria um cursor sem perdas (ver SampleReader) sobre as amostras recebidas.
+        device_id=None lê de todas as luvas; caso contrário, só da luva indicada.
+        """
+        return SampleReader(self._buffer_for(device_id), from_start)
+
+    def wake_readers(self):
+        """ Acorda leitores bloqueados (usado ao parar threads consumidoras). """
+        self.new_data_event.set()
+        self.samples.wake()
+        for device in self.devices.all():
+            device.samples.wake()
 
     def wait_for_data(self, timeout=0.1):
         flag = self.new_data_event.wait(timeout)
@@ -98,9 +376,20 @@ class Communication:
             self.new_data_event.clear()
         return flag
 
-    def get_latest_data(self):
-        with self.data_lock:
-            return self.last_sensor_data.copy()
+    def get_latest_data(self, device_id=None):
+        """ Última amostra como dict (cópia). Para histórico use get_window(). """
+        sample = self._buffer_for(device_id).get_latest()
+        if sample is None:
+            return {}
+        return dict(zip(self.SAMPLE_DTYPE.names, sample.item()))
+
+    def get_latest_sample(self, device_id=None):
+        """ Última amostra como registro NumPy (view, sem cópia). """
+        return self._buffer_for(device_id).get_latest()
+
+    def get_window(self, n, device_id=None):
+        """ View (sem cópia) das últimas n amostras, da mais antiga à mais nova. """
+        return self._buffer_for(device_id).get_window(n)
 
     def get_status_message(self):
         return self.network_status_message
\ No newline at end of file
@@ -0,0 +1,102 @@
+"""
+Trace de diagnóstico da Guitar: valores numéricos por amostra, sem strings.
+
+Com o trace desligado (Guitar.trace = None) o custo no caminho quente é um
+"if ... is not None" por lote. Ligado, cada lote é copiado de uma vez
+para um buffer circular pré-alocado (array estruturado): nada é alocado
+nem formatado por amostra. A formatação só acontece quando a GUI mostra
+as últimas linhas ou quando o trace é exportado.
+
+Campos por amostra (N = número de dedos):
+    t             instante da amostra (s)
+    raw[N]        ativação normalizada (0..1), antes do crosstalk
+    interference  quanto o crosstalk tirou de cada dedo
+    final[N]      ativação após o desacoplamento
+    armed[N]      dedo armado (saída do gatilho)
+"""
+import threading
+
+import numpy as np
+
+
+class GuitarTrace:
+    def __init__(self, n_fingers, capacity=16384):
+        self.n_fingers = n_fingers
+        self.dtype = np.dtype([
+            ("t", "<f8"),
+            ("raw", "<f4", (n_fingers,)),
+            ("interference", "<f4", (n_fingers,)),
+            ("final", "<f4", (n_fingers,)),
+            ("armed", "i1", (n_fingers,)),
+        ])
+        self._buffer = np.zeros(capacity, dtype=self.dtype)
+        self._lock = threading.Lock()
+        self.count = 0  # Total de amostras gravadas (o buffer guarda as últimas 'capacity')
+
+    @property
+    def capacity(self):
+        return len(self._buffer)
+
+    def record(self, times, raw, interference, final, armed):
+        """ Grava um lote (T amostras, arrays T x N) de uma vez. """
+        n = len(raw)
+        if n == 0 or raw.shape[1] != self.n_fingers:
+            return
+        capacity = self.capacity
+        if n > capacity:
+            times, raw, interference, final, armed = (
+                a[-capacity:] for a in (times, raw, interference, final, armed))
+            skipped, n = n - capacity, capacity
+        else:
+            skipped = 0
+        with self._lock:
+            start = (self.count + skipped) % capacity
+            idx = (start + np.arange(n)) % capacity
+            buf = self._buffer
+            buf["t"][idx] = times
+            buf["raw"][idx] = raw
+            buf["interference"][idx] = interference
+            buf["final"][idx] = final
+            buf["armed"][idx] = armed
+            self.count += skipped + n
+
+    def snapshot(self, last=None):
+        """ Cópia das amostras guardadas (ou das 'last' últimas), da mais antiga para a mais nova. """
+        with self._lock:
+            stored = min(self.count, self.capacity)
+            if last is not None:
+                stored = min(stored, last)
+            idx = (self.count - stored + np.arange(stored)) % self.capacity
+            return self._buffer[idx]
+
+    def clear(self):
+        with self._lock:
+            self.count = 0
+
+    def export(self, path, labels=None):
+        """
+        Grava o trace: .npz (array estruturado em 'trace') ou, para qualquer
+        outra extensão, CSV com uma coluna por campo e dedo.
+        """
+        data = self.snapshot()
+        if path.endswith(".npz"):
+            np.savez_compressed(path, trace=data)
+            return
+        labels = labels or [f"dedo{i + 1}" for i in range(self.n_fingers)]
+        header = ["t"] + [f"{field}_{label}" for field in ("raw", "interference", "final", "armed")
+                          for label in labels]
+        columns = [data["t"][:, None]] + [data[field].astype(np.float64)
+                                          for field in ("raw", "interference", "final", "armed")]
+        table = np.hstack(columns) if len(data) else np.zeros((0, len(header)))
+        np.savetxt(path, table, delimiter=",", header=",".join(header), comments="", fmt="%.6g")
+
+    def format_tail(self, last=20):
+        """ Últimas amostras como texto de largura fixa (para a GUI). """
+        lines = []
+        for row in self.snapshot(last):
+            fingers = "  ".join(
+                f"{r:.2f}-{i:.2f}={f:.2f}{'*' if a else ' '}"
+                for r, i, f, a in zip(row["raw"], row["interference"], row["final"], row["armed"])
+            )
+            lines.append(f"{row['t']:.3f}  {fingers}")
+        return "\n".join(lines)
@@ -1,5 +1,9 @@
 from typing import List, Dict, Union
 
+from logger import get_logger
+
+log = get_logger("emulator")
+
 try:
     import vgamepad as vg
     _VGAMEPAD_DISPONIVEL = True
@@ -18,22 +22,35 @@ class Emulator:
 
     # --- Configuração de Mapeamento ---
     # Os indices correspondem à ordem da entrada: [Verde, Vermelho, Amarelo, Azul]
+    # (padrão). Outras configurações via configurar_lanes(), ex.: BOTOES_5_TRASTES.
     BOTOES = ["Verde", "Vermelho", "Amarelo", "Azul"]
+    BOTOES_5_TRASTES = ["Verde", "Vermelho", "Amarelo", "Azul", "Laranja", "Palhetada", "Whammy"]
+    # Layouts oferecidos na GUI: a quantidade de lanes dos instrumentos sai daqui
+    LAYOUTS: Dict[str, List[str]] = {
+        "4 trastes": BOTOES,
+        "5 trastes + palhetada + whammy": BOTOES_5_TRASTES,
+    }
     
-    # Mapeamento do Controle (A, B, Y, X)
+    # Mapeamento do Controle (A, B, Y, X, LB; palhetada no direcional, whammy no RB)
     MAP_CONTROLE: Dict[str, vg.XUSB_BUTTON] = {
         "Verde": vg.XUSB_BUTTON.XUSB_GAMEPAD_A,
         "Vermelho": vg.XUSB_BUTTON.XUSB_GAMEPAD_B,
         "Amarelo": vg.XUSB_BUTTON.XUSB_GAMEPAD_Y,
         "Azul": vg.XUSB_BUTTON.XUSB_GAMEPAD_X,
+        "Laranja": vg.XUSB_BUTTON.XUSB_GAMEPAD_LEFT_SHOULDER,
+        "Palhetada": vg.XUSB_BUTTON.XUSB_GAMEPAD_DPAD_DOWN,
+        "Whammy": vg.XUSB_BUTTON.XUSB_GAMEPAD_RIGHT_SHOULDER,
     }
     
-    # Mapeamento do Teclado (a, s, j, k)
+    # Mapeamento do Teclado (a, s, j, k, l; palhetada na seta, whammy no w)
     MAP_TECLADO: Dict[str, str] = {
         "Verde": "a",
         "Vermelho": "s",
         "Amarelo": "j",
         "Azul": "k",
+        "Laranja": "l",
+        "Palhetada": "down",
+        "Whammy": "w",
     }
     
     # Tipos de emulação aceitos
@@ -52,19 +69,28 @@ class Emulator:
             return
 
         self.tipo_emulacao: str = self.TIPO_CONTROLE
-        self.estado_anterior: List[int] = [0, 0, 0, 0] # [Verde, Vermelho, Amarelo, Azul]
+        self.botoes: List[str] = list(self.BOTOES)
+        # Estado como máscara de bits: bit i = lane i pressionada
+        self.mascara: int = 0
+        self._acoes = self._montar_acoes()
+        # Máscaras com bits além dos botões configurados (cortados, ver atualizar_mascara)
+        self.lanes_ignoradas = 0
+        self._avisou_lanes = False
         
+        # LatencyTracer opcional (latency.py): marca decisão -> saída do botão
+        self.tracer = None
+
         self.gamepad = None
         if _VGAMEPAD_DISPONIVEL:
             try:
                 self.gamepad = vg.VX360Gamepad()
-                print("Gamepad virtual criado (VX360Gamepad).")
+                log.info("Gamepad virtual criado (VX360Gamepad).")
             except Exception as e:
-                print(f"Erro ao inicializar vgamepad: {e}")
+                log.error("Erro ao inicializar vgamepad: %s", e)
                 self.gamepad = None
 
         if not _KEYBOARD_DISPONIVEL:
-            print("Aviso: A biblioteca 'keyboard' não está disponível. Emulação de teclado pode ser limitada.")
+            log.warning("A biblioteca 'keyboard' não está disponível. Emulação de teclado pode ser limitada.")
         self._is_initialized = True
 
     def set_tipo_emulacao(self, tipo: str):
@@ -78,7 +104,34 @@ class Emulator:
         self._reset_botoes_atuais()
         
         self.tipo_emulacao = tipo
-        print(f"\nTipo de emulação alterado para: {self.tipo_emulacao}")
+        self._acoes = self._montar_acoes()
+        log.info("Tipo de emulação alterado para: %s", self.tipo_emulacao)
+
+    def configurar_lanes(self, botoes: List[str]):
+        """ Troca a quantidade/ordem das lanes (nomes de MAP_CONTROLE/MAP_TECLADO). Solta tudo antes. """
+        desconhecidos = [b for b in botoes if b not in self.MAP_CONTROLE or b not in self.MAP_TECLADO]
+        if desconhecidos:
+            raise ValueError(f"Botões sem mapeamento: {desconhecidos}")
+        self._reset_botoes_atuais()
+        self.botoes = list(botoes)
+        self._acoes = self._montar_acoes()
+        self._avisou_lanes = False
+        log.info("Lanes do emulador: %s", self.botoes)
+
+    @property
+    def n_lanes(self) -> int:
+        return len(self.botoes)
+
+    @property
+    def estado_anterior(self) -> List[int]:
+        """ Estado atual como vetor 0/1 (uma posição por lane). """
+        mascara = self.mascara
+        return [(mascara >> i) & 1 for i in range(len(self.botoes))]
+
+    def _montar_acoes(self):
+        """ (nome, ação) por lane no mapeamento ativo: o caminho quente só indexa esta lista. """
+        mapeamento = self._get_mapeamento()
+        return [(nome, mapeamento[nome]) for nome in self.botoes]
 
     def _get_mapeamento(self) -> Dict[str, Union[vg.XUSB_BUTTON, str]]:
         """Retorna o mapeamento ativo (controle ou teclado)."""
@@ -108,51 +161,74 @@ class Emulator:
 
     def _reset_botoes_atuais(self):
         """Libera todos os botões que estavam ativos no estado anterior."""
-        if any(self.estado_anterior): # Verifica se algum botão estava ativo
-            mapeamento_anterior = self._get_mapeamento()
-            for i, nome_botao in enumerate(self.BOTOES):
-                if self.estado_anterior[i] == 1:
-                    acao_emulador = mapeamento_anterior[nome_botao]
-                    self._executar_release(nome_botao, acao_emulador)
+        if self.mascara: # Verifica se algum botão estava ativo
+            mascara = self.mascara
+            while mascara:
+                bit = mascara & -mascara
+                nome_botao, acao_emulador = self._acoes[bit.bit_length() - 1]
+                self._executar_release(nome_botao, acao_emulador)
+                mascara ^= bit
             if self.gamepad and self.tipo_emulacao == self.TIPO_CONTROLE:
                 self.gamepad.update()
-            self.estado_anterior = [0, 0, 0, 0] 
+            self.mascara = 0
 
 
     def atualizar_estado(self, novo_estado: List[int]):
         """
-        Método principal para atualizar o estado de emulação.
+        Método principal para atualizar o estado de emulação: vetor 0/1
+        com uma posição por lane (ver configurar_lanes). Um vetor mais curto
+        que os botões (ex.: os 4 tambores com o layout de 5 trastes) aciona
+        só os primeiros; posições além dos botões são ignoradas.
         """
-        if novo_estado != self.estado_anterior:
-            print(f"\n🎮 [EMULATOR] Estado Anterior: {self.estado_anterior}")
-            print(f"🎮 [EMULATOR] Novo Estado: {novo_estado}")
-            print(f"🎮 [EMULATOR] Tipo Emulação: {self.tipo_emulacao}")
-        if len(novo_estado) != 4:
-            raise ValueError("O novo_estado deve ser um vetor de 4 posições.")
-        if not all(isinstance(x, int) and x in [0, 1] for x in novo_estado):
-            raise ValueError("Os valores do novo_estado devem ser 0 ou 1.")
-
-        mapeamento = self._get_mapeamento()
-        mudanca_detectada = False
- 
-        for i, nome_botao in enumerate(self.BOTOES):
-            estado_atual = novo_estado[i]
-            estado_anterior = self.estado_anterior[i]
-            acao_emulador = mapeamento[nome_botao]
-            # 1. Detetar Pressionamento (0 -> 1)
-            if estado_atual == 1 and estado_anterior == 0:
+        mascara = 0
+        for i, x in enumerate(novo_estado):
+            if x == 1:
+                mascara |= 1 << i
+            elif x != 0:
+                raise ValueError("Os valores do novo_estado devem ser 0 ou 1.")
+        self.atualizar_mascara(mascara)
+
+    def atualizar_mascara(self, mascara: int):
+        """
+        Mesmo que atualizar_estado, com o estado já como máscara de bits
+        (bit i = lane i). Só as lanes que mudaram são visitadas, então o
+        custo não cresce com o número de lanes. Bits além dos botões
+        configurados são cortados (e avisados uma vez por configuração).
+        """
+        tracer = self.tracer
+        if tracer:
+            tracer.mark_decision()
+        acoes = self._acoes
+        if mascara >> len(acoes):
+            self.lanes_ignoradas += 1
+            if not self._avisou_lanes:
+                self._avisou_lanes = True
+                log.warning("Estado com lanes além dos %d botões do emulador (%#x): excedentes ignoradas",
+                            len(acoes), mascara)
+            mascara &= (1 << len(acoes)) - 1
+        mudou = mascara ^ self.mascara
+        if not mudou:
+            return
+        # O log é formatado depois, em outra thread: ints são imutáveis
+        log.debug("Estado %#x -> %#x (%s)", self.mascara, mascara, self.tipo_emulacao)
+
+        while mudou:
+            bit = mudou & -mudou
+            nome_botao, acao_emulador = acoes[bit.bit_length() - 1]
+            if mascara & bit:
+                # 1. Pressionamento (0 -> 1)
                 self._executar_press(nome_botao, acao_emulador)
-                mudanca_detectada = True
-            # 2. Detetar Liberação (1 -> 0)
-            elif estado_atual == 0 and estado_anterior == 1:
+            else:
+                # 2. Liberação (1 -> 0)
                 self._executar_release(nome_botao, acao_emulador)
-                mudanca_detectada = True
+            mudou ^= bit
 
-        if mudanca_detectada:
-            if self.gamepad and self.tipo_emulacao == self.TIPO_CONTROLE:
-                self.gamepad.update() # Atualiza o estado do gamepad virtual
+        if self.gamepad and self.tipo_emulacao == self.TIPO_CONTROLE:
+            self.gamepad.update() # Atualiza o estado do gamepad virtual
+        if tracer:
+            tracer.mark_output()
 
-        self.estado_anterior = novo_estado[:]
+        self.mascara = mascara
 
     def fechar(self):
         """
@@ -162,7 +238,7 @@ class Emulator:
         self._reset_botoes_atuais() # Libera quaisquer botões que possam estar ativos
         if self.gamepad:
             self.gamepad.reset() # Garante que o gamepad virtual resete todos os estados
-        print("Emulator encerrado.")
+        log.info("Emulator encerrado.")
 
 
 class InputData:
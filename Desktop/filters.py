@@ -0,0 +1,259 @@
+"""
+Filtros dos canais dos dedos, com estado por canal em arrays.
+
+Todos recebem um bloco T x N (T amostras, N canais), devolvem o bloco
+filtrado e guardam o estado para o próximo bloco: processar 1 amostra de
+cada vez ou 1000 de uma vez dá o mesmo resultado.
+
+Um canal "sem valor" é uma coluna inteira de NaN (dedo sem sensor): a
+saída é NaN e o estado do canal não muda.
+
+'times' (opcional, um instante em s por amostra) só importa para os
+filtros que dependem do intervalo entre amostras (One Euro, Kalman).
+FILTERS mapeia o nome usado em Guitar.FILTER_TYPE para a classe.
+"""
+import math
+import numpy as np
+
+
+class EMAFilter:
+    """
+    Média móvel exponencial: y[t] = alpha * x[t] + (1 - alpha) * y[t-1].
+    A primeira amostra de cada canal inicializa o filtro (y = x).
+
+    A recorrência é resolvida em forma fechada por trechos, sem laço por
+    amostra:  y[t] = b^(t+1) * (y[-1] + alpha * sum_k b^-(k+1) * x[k]),
+    com b = 1 - alpha. O trecho é curto o bastante para b^-L não perder
+    precisão (b^-L <= MAX_GROWTH).
+    """
+    MAX_GROWTH = 1e6
+
+    def __init__(self, n_channels, alpha=0.4):
+        self.alpha = alpha
+        self.state = np.full(n_channels, np.nan)
+
+    def reset(self, n_channels=None):
+        self.state = np.full(n_channels or len(self.state), np.nan)
+
+    def process(self, x, times=None):
+        x = np.asarray(x, dtype=np.float64)
+        out = np.full(x.shape, np.nan)
+        if len(x) == 0:
+            return out
+        present = ~np.isnan(x).any(axis=0)
+        if not present.any():
+            return out
+
+        cols = np.flatnonzero(present)
+        xs = x[:, cols]
+        prev = self.state[cols]
+        prev = np.where(np.isnan(prev), xs[0], prev)
+
+        alpha = min(max(float(self.alpha), 0.0), 1.0)
+        beta = 1.0 - alpha
+        if beta == 0.0:
+            ys = xs.copy()
+        elif alpha == 0.0:
+            ys = np.broadcast_to(prev, xs.shape).copy()
+        else:
+            chunk = max(1, int(math.log(self.MAX_GROWTH) / -math.log(beta)))
+            ys = np.empty_like(xs)
+            for start in range(0, len(xs), chunk):
+                block = xs[start:start + chunk]
+                k = np.arange(1, len(block) + 1)[:, None]
+                growth = beta ** -k
+                ys[start:start + len(block)] = beta ** k * (prev + alpha * np.cumsum(growth * block, axis=0))
+                prev = ys[start + len(block) - 1]
+
+        out[:, cols] = ys
+        self.state[cols] = ys[-1]
+        return out
+
+    def step(self, row):
+        """
+        Uma amostra (lista de floats, NaN = sem valor) pela recorrência
+        direta, em floats do Python: mesmo estado e resultado de process()
+        com T = 1, sem o custo fixo das chamadas NumPy.
+        """
+        alpha = min(max(float(self.alpha), 0.0), 1.0)
+        beta = 1.0 - alpha
+        state = self.state.tolist()
+        out = []
+        for i, x in enumerate(row):
+            if x != x:  # NaN: canal sem valor, estado não muda
+                out.append(x)
+                continue
+            prev = state[i]
+            y = x if prev != prev else alpha * x + beta * prev
+            state[i] = y
+            out.append(y)
+        self.state = np.array(state)
+        return out
+
+
+def _intervals(times, n, last, rate):
+    """
+    Intervalo dt (s) antes de cada uma das n amostras, por canal: T x N a
+    partir de 'times' (um instante por amostra) e do último instante visto
+    em cada canal ('last', NaN = canal novo). Sem 'times', dt = 1 / rate.
+    """
+    if times is None:
+        return np.full((n, len(last)), 1.0 / rate), None
+    times = np.asarray(times, dtype=np.float64).reshape(-1)
+    previous = np.vstack((last, np.broadcast_to(times[:-1, None], (n - 1, len(last)))))
+    dt = times[:, None] - previous
+    dt = np.where(np.isnan(dt) | (dt <= 0), 1.0 / rate, dt)
+    return dt, times[-1]
+
+
+def _smoothing(dt, cutoff):
+    """ Fator de suavização de um passa-baixa de 1ª ordem com corte 'cutoff' (Hz). """
+    tau = 1.0 / (2.0 * math.pi * cutoff)
+    return 1.0 / (1.0 + tau / dt)
+
+
+class OneEuroFilter:
+    """
+    Filtro "One Euro" (Casiez et al., 2012): passa-baixa cujo corte sobe com
+    a velocidade do sinal. Parado fica liso (corte = min_cutoff); em
+    movimento rápido quase não atrasa (corte += beta * |velocidade|).
+
+    A velocidade vem em unidades do sensor por segundo (V/s nos dedos),
+    então 'beta' depende da escala do sensor. Sem 'times' assume amostras a
+    'rate' Hz. O corte adaptativo não tem forma fechada: o laço é por
+    amostra, vetorizado nos canais.
+    """
+
+    def __init__(self, n_channels, min_cutoff=1.0, beta=0.5, d_cutoff=1.0, rate=100.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.rate = rate
+        self.reset(n_channels)
+
+    def reset(self, n_channels=None):
+        n = n_channels or len(self.state)
+        self.state = np.full(n, np.nan)
+        self.velocity = np.zeros(n)
+        self.last_time = np.full(n, np.nan)
+
+    def process(self, x, times=None):
+        x = np.asarray(x, dtype=np.float64)
+        out = np.full(x.shape, np.nan)
+        if len(x) == 0:
+            return out
+        present = ~np.isnan(x).any(axis=0)
+        if not present.any():
+            return out
+
+        cols = np.flatnonzero(present)
+        xs = x[:, cols]
+        dts, t_last = _intervals(times, len(xs), self.last_time[cols], self.rate)
+        y = self.state[cols]
+        dy = self.velocity[cols]
+        fresh = np.isnan(y)
+        y = np.where(fresh, xs[0], y)
+        min_cutoff = max(float(self.min_cutoff), 1e-3)
+        beta = max(float(self.beta), 0.0)
+        d_cutoff = max(float(self.d_cutoff), 1e-3)
+
+        ys = np.empty_like(xs)
+        for t in range(len(xs)):
+            dt = dts[t]
+            a_d = _smoothing(dt, d_cutoff)
+            dy = a_d * (xs[t] - y) / dt + (1.0 - a_d) * dy
+            a = _smoothing(dt, min_cutoff + beta * np.abs(dy))
+            y = a * xs[t] + (1.0 - a) * y
+            ys[t] = y
+
+        out[:, cols] = ys
+        self.state[cols] = y
+        self.velocity[cols] = dy
+        self.last_time[cols] = t_last if t_last is not None else np.nan
+        return out
+
+
+class KalmanFilter:
+    """
+    Kalman de velocidade constante por canal: estado (posição, velocidade),
+    aceleração como ruído branco de variância 'q' (unidades²/s³) e ruído
+    de medida de variância 'r' (unidades²). Só a razão q/r muda a resposta:
+    maior = segue o sensor mais de perto, menor = mais liso.
+
+    Estimar a velocidade compensa parte do atraso de uma média simples nas
+    rampas de flexão. A covariância 2x2 fica em três arrays (p00, p01, p11).
+    """
+
+    def __init__(self, n_channels, q=1e3, r=1e-4, rate=100.0):
+        self.q = q
+        self.r = r
+        self.rate = rate
+        self.reset(n_channels)
+
+    def reset(self, n_channels=None):
+        n = n_channels or len(self.state)
+        self.state = np.full(n, np.nan)
+        self.velocity = np.zeros(n)
+        self.p00 = np.zeros(n)
+        self.p01 = np.zeros(n)
+        self.p11 = np.zeros(n)
+        self.last_time = np.full(n, np.nan)
+
+    def process(self, x, times=None):
+        x = np.asarray(x, dtype=np.float64)
+        out = np.full(x.shape, np.nan)
+        if len(x) == 0:
+            return out
+        present = ~np.isnan(x).any(axis=0)
+        if not present.any():
+            return out
+
+        cols = np.flatnonzero(present)
+        xs = x[:, cols]
+        dts, t_last = _intervals(times, len(xs), self.last_time[cols], self.rate)
+        pos = self.state[cols]
+        vel = self.velocity[cols]
+        p00, p01, p11 = self.p00[cols], self.p01[cols], self.p11[cols]
+        fresh = np.isnan(pos)
+        # Canal novo: começa na primeira leitura, com a incerteza de uma medida
+        pos = np.where(fresh, xs[0], pos)
+        vel = np.where(fresh, 0.0, vel)
+        r = max(float(self.r), 1e-9)
+        q = max(float(self.q), 0.0)
+        p00 = np.where(fresh, r, p00)
+        p01 = np.where(fresh, 0.0, p01)
+        p11 = np.where(fresh, 0.0, p11)
+
+        ys = np.empty_like(xs)
+        for t in range(len(xs)):
+            dt = dts[t]
+            # Predição
+            pos = pos + vel * dt
+            p00 = p00 + dt * (2.0 * p01 + dt * p11) + q * dt ** 3 / 3.0
+            p01 = p01 + dt * p11 + q * dt ** 2 / 2.0
+            p11 = p11 + q * dt
+            # Correção
+            s = p00 + r
+            k0 = p00 / s
+            k1 = p01 / s
+            innovation = xs[t] - pos
+            pos = pos + k0 * innovation
+            vel = vel + k1 * innovation
+            p11 = p11 - k1 * p01
+            p01 = (1.0 - k0) * p01
+            p00 = (1.0 - k0) * p00
+            ys[t] = pos
+
+        out[:, cols] = ys
+        self.state[cols] = pos
+        self.velocity[cols] = vel
+        self.p00[cols], self.p01[cols], self.p11[cols] = p00, p01, p11
+        self.last_time[cols] = t_last if t_last is not None else np.nan
+        return out
+
+
+FILTERS = {
+    "ema": EMAFilter,
+    "one_euro": OneEuroFilter,
+    "kalman": KalmanFilter,
+}
@@ -0,0 +1,91 @@
+import threading
+
+from sample_buffer import SampleRingBuffer
+from net_stats import LinkStats
+from clock_sync import ClockSync
+
+
+class GloveDevice:
+    """
+    Estado de UMA luva (fonte UDP): buffer de amostras próprio, estatísticas
+    de link, relógio sincronizado com o host e notificação de dado novo
+    (a Condition do próprio buffer).
+
+    Várias luvas na mesma porta não se sobrescrevem: cada uma tem o seu
+    GloveDevice, identificado por endereço ("ip:porta") ou ID de dispositivo.
+    """
+
+    def __init__(self, device_id, dtype, capacity, wire_size=None):
+        self.device_id = device_id
+        self.samples = SampleRingBuffer(dtype, capacity, wire_size)
+        self.stats = LinkStats()
+        self.clock = ClockSync()
+        self.address = None    # Último (ip, porta) de onde chegou pacote
+        self.last_seen = None  # time.monotonic() do último pacote
+
+    def reset_sync(self):
+        """ Recomeça relógio e estatísticas (ex.: um replay que volta ao início da gravação). """
+        self.clock = ClockSync()
+        self.stats.reset()
+
+    def push(self, data, addr, t_host, device_ts, packet_key, t_kernel=0.0, t_source=0.0):
+        """
+        Guarda um pacote já validado (chamado pela thread de recepção).
+        Retorna o instante de amostragem estimado no relógio do host.
+        Com t_kernel (SO_TIMESTAMPNS), relógio e jitter usam a chegada no
+        kernel, sem o atraso da thread de recepção; com t_source (replay),
+        a chegada original da gravação.
+        """
+        t_arrival = t_source or t_kernel or t_host
+        t_sampled = self.clock.update(device_ts, t_arrival)
+        self.samples.write_bytes(data, t_host, t_sampled, t_kernel)
+        self.stats.update(device_ts, t_arrival, packet_key)
+        self.address = addr
+        self.last_seen = t_host
+        return t_sampled
+
+    def push_batch(self, data, count, offset, addr, t_host, seq, device_ts, t_kernel=0.0, t_source=0.0):
+        """
+        Guarda um datagrama em lote (count amostras a partir de 'offset').
+        device_ts: array com o millis() de cada amostra. Retorna o array de
+        instantes de amostragem no relógio do host.
+        """
+        last_ts = int(device_ts[-1])
+        t_arrival = t_source or t_kernel or t_host
+        # Só a última amostra do lote entra no ajuste: foi enviada logo após ser lida
+        self.clock.update(last_ts, t_arrival)
+        t_sampled = self.clock.to_host(device_ts)
+        self.samples.write_batch(data, count, offset, t_host, t_sampled, t_kernel)
+        self.stats.update_batch(seq, count, last_ts, t_arrival)
+        self.address = addr
+        self.last_seen = t_host
+        return t_sampled
+
+
+class DeviceRegistry:
+    """ Dicionário thread-safe de GloveDevice, criado sob demanda. """
+
+    def __init__(self, dtype, capacity, wire_size=None):
+        self.dtype = dtype
+        self.capacity = capacity
+        self.wire_size = wire_size
+        self._devices = {}
+        self._lock = threading.Lock()
+
+    def get(self, device_id, create=True):
+        device = self._devices.get(device_id)
+        if device is None and create:
+            with self._lock:
+                device = self._devices.get(device_id)
+                if device is None:
+                    device = GloveDevice(device_id, self.dtype, self.capacity, self.wire_size)
+                    self._devices[device_id] = device
+        return device
+
+    def ids(self):
+        with self._lock:
+            return sorted(self._devices)
+
+    def all(self):
+        with self._lock:
+            return list(self._devices.values())
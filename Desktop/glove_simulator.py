@@ -0,0 +1,260 @@
+"""
+Simulador local da luva (ESP32) para testes de carga do caminho UDP.
+
+Envia datagramas com o mesmo layout do SensorPacket para a porta 8888,
+como WifiServer::sendDataToClient, mas com taxa configurável (100Hz até
+alguns kHz), curvas de flexão dos dedos, movimento da IMU, perda de
+pacotes e várias luvas simuladas (cada uma com sua porta de origem).
+
+Exemplos:
+    python glove_simulator.py                          # 1 luva, 100Hz, dedos em sequência
+    python glove_simulator.py --rate 2000 --devices 2  # teste de carga
+    python glove_simulator.py --pattern script --script musica.json --imu strum --loss 0.02
+    python glove_simulator.py --rate 1000 --batch 10   # formato em lote: 10 amostras/datagrama
+    python glove_simulator.py --rate 1000 --seq        # v2 com 1 amostra/datagrama (perdas exatas)
+
+Formato do --script (JSON): quadros-chave interpolados linearmente
+    {"loop": true, "keyframes": [[0.0, 0, 0, 0, 0], [0.1, 1, 0, 0, 0], [0.3, 0, 0, 0, 0]]}
+    Cada quadro: [tempo_s, dedo1, dedo2, dedo3, dedo4] com ativação de 0.0 a 1.0.
+"""
+import argparse
+import json
+import math
+import random
+import socket
+import struct
+import threading
+import time
+
+from communication import Communication
+
+N_FINGERS = 4
+
+# Tensões típicas dos sensores flex (V) em repouso e dobrados
+DEFAULT_REST = (1.0, 1.0, 1.0, 1.0)
+DEFAULT_FULL = (2.8, 2.8, 2.8, 2.8)
+ADC_NOISE_V = 0.01
+
+ACCEL_1G = 16384   # MPU6050 em ±2g
+GYRO_STRUM = 20000  # Pico de giro de uma batida (unidades cruas)
+
+
+class FingerPattern:
+    """ Curvas de ativação dos dedos (0.0 = repouso, 1.0 = dobrado). """
+
+    def __init__(self, name="tap", period=1.0, script=None):
+        self.name = name
+        self.period = period
+        self.keyframes = None
+        self.loop = True
+        if name == "script":
+            with open(script) as f:
+                data = json.load(f)
+            self.keyframes = [tuple(k) for k in data["keyframes"]]
+            self.loop = data.get("loop", True)
+
+    def activations(self, t):
+        if self.name == "idle":
+            return [0.0] * N_FINGERS
+        if self.name == "sine":
+            return [0.5 - 0.5 * math.cos(2 * math.pi * t / self.period + i * math.pi / 2)
+                    for i in range(N_FINGERS)]
+        if self.name == "chord":
+            return [self._press(t % self.period, 0.0, self.period / 2)] * N_FINGERS
+        if self.name == "script":
+            return self._interpolate(t)
+        # "tap": um dedo de cada vez, em sequência
+        slot = self.period / N_FINGERS
+        phase = t % self.period
+        return [self._press(phase, i * slot, slot * 0.6) for i in range(N_FINGERS)]
+
+    @staticmethod
+    def _press(phase, start, hold, rise=0.04):
+        """ Pressão com subida/descida suaves de 'rise' segundos (flex real não é degrau). """
+        if phase < start or phase > start + hold + rise:
+            return 0.0
+        if phase < start + rise:
+            return (phase - start) / rise
+        if phase > start + hold:
+            return 1.0 - (phase - start - hold) / rise
+        return 1.0
+
+    def _interpolate(self, t):
+        frames = self.keyframes
+        duration = frames[-1][0]
+        if self.loop and duration > 0:
+            t = t % duration
+        if t <= frames[0][0]:
+            return list(frames[0][1:])
+        for (t0, *a0), (t1, *a1) in zip(frames, frames[1:]):
+            if t <= t1:
+                w = (t - t0) / (t1 - t0) if t1 > t0 else 1.0
+                return [x0 + (x1 - x0) * w for x0, x1 in zip(a0, a1)]
+        return list(frames[-1][1:])
+
+
+class ImuMotion:
+    """ Movimento da IMU mestra/escrava (acelerômetro + giroscópio crus). """
+
+    def __init__(self, name="still", strum_period=0.5):
+        self.name = name
+        self.strum_period = strum_period
+
+    def sample(self, t):
+        acc = [0, 0, ACCEL_1G]
+        gyro = [0, 0, 0]
+        if self.name == "strum":
+            # Pulso gaussiano no eixo Z, alternando batida para baixo/para cima
+            n = int(t / self.strum_period)
+            dt = t - (n + 0.5) * self.strum_period
+            sign = 1 if n % 2 == 0 else -1
+            gyro[2] = int(sign * GYRO_STRUM * math.exp(-(dt / 0.02) ** 2))
+        elif self.name == "shake":
+            acc = [random.randint(-4000, 4000), random.randint(-4000, 4000), ACCEL_1G]
+            gyro = [random.randint(-3000, 3000) for _ in range(3)]
+        acc = [a + random.randint(-50, 50) for a in acc]
+        gyro = [g + random.randint(-20, 20) for g in gyro]
+        return acc, gyro
+
+
+class SimulatedGlove:
+    """ Uma luva simulada: gera e envia pacotes em taxa fixa, numa thread própria. """
+
+    def __init__(self, host, port, rate, fingers, imu, loss=0.0, device_index=0, batch=1, sequenced=False):
+        self.target = (host, port)
+        self.rate = rate
+        self.batch = batch  # >1 usa o formato em lote (v2) com nº de sequência
+        # v2 mesmo com 1 amostra: a taxas altas o millis() (1 ms) não serve para contar perdas
+        self.sequenced = sequenced or batch > 1
+        self.seq = 0
+        self._pending = []
+        self.fingers = fingers
+        self.imu = imu
+        self.loss = loss
+        self.device_index = device_index
+        self.sent = 0
+        self.dropped = 0
+        self.running = False
+        self.thread = None
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("0.0.0.0", 0))  # Porta de origem própria = fonte distinta
+        # Cada ESP32 liga num instante diferente
+        self.millis_offset = random.randint(0, 60000)
+
+    def build_packet(self, t):
+        acts = self.fingers.activations(t)
+        adc = [DEFAULT_REST[i] + acts[i] * (DEFAULT_FULL[i] - DEFAULT_REST[i]) + random.gauss(0, ADC_NOISE_V)
+               for i in range(N_FINGERS)]
+        acc, gyro = self.imu.sample(t)
+        slave_acc, slave_gyro = self.imu.sample(t)
+        millis = (int(t * 1000) + self.millis_offset) & 0xFFFFFFFF
+        return struct.pack(
+            Communication.STRUCT_FORMAT,
+            *acc, *gyro,
+            0, 0, 0, 0.0,      # Magnetômetro + heading
+            *adc,
+            *slave_acc, *slave_gyro,
+            millis
+        )
+
+    def start(self, duration=None):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, args=(duration,), daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=1.0)
+
+    def _emit(self, packet):
+        """ Envia uma amostra (ou acumula até completar o lote). """
+        if self.sequenced:
+            self._pending.append(packet)
+            if len(self._pending) < self.batch:
+                return
+            header = Communication.BATCH_HEADER.pack(
+                Communication.BATCH_MAGIC, Communication.BATCH_VERSION,
+                len(self._pending), self.device_index, self.seq & 0xFFFFFFFF
+            )
+            datagram = header + b"".join(self._pending)
+            self.seq += len(self._pending)
+            self._pending = []
+        else:
+            datagram = packet
+
+        if self.loss > 0 and random.random() < self.loss:
+            self.dropped += 1
+        else:
+            self.sock.sendto(datagram, self.target)
+            self.sent += 1
+
+    def _run(self, duration):
+        period = 1.0 / self.rate
+        t_start = time.perf_counter()
+        next_t = t_start
+        while self.running:
+            now = time.perf_counter()
+            t = now - t_start
+            if duration is not None and t >= duration:
+                break
+
+            self._emit(self.build_packet(t))
+
+            # Agenda absoluta (não acumula atraso); dorme só se sobrar tempo
+            next_t += period
+            remaining = next_t - time.perf_counter()
+            if remaining > 0.002:
+                time.sleep(remaining - 0.001)
+            while time.perf_counter() < next_t:
+                pass
+            if next_t < time.perf_counter() - 0.1:
+                next_t = time.perf_counter()  # Muito atrasado: não tenta "compensar" em rajada
+        self.running = False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=Communication.UDP_PORT)
+    parser.add_argument("--rate", type=float, default=100.0, help="Pacotes por segundo por luva (padrão: 100)")
+    parser.add_argument("--devices", type=int, default=1, help="Quantas luvas simular")
+    parser.add_argument("--duration", type=float, default=None, help="Segundos (padrão: até Ctrl+C)")
+    parser.add_argument("--pattern", default="tap", choices=["tap", "sine", "chord", "idle", "script"])
+    parser.add_argument("--period", type=float, default=1.0, help="Período do padrão de dedos (s)")
+    parser.add_argument("--script", help="Arquivo JSON de quadros-chave (com --pattern script)")
+    parser.add_argument("--imu", default="still", choices=["still", "strum", "shake"])
+    parser.add_argument("--loss", type=float, default=0.0, help="Probabilidade de perder cada pacote (0 a 1)")
+    parser.add_argument("--batch", type=int, default=1,
+                        help=f"Amostras por datagrama (1 = formato legado, até {Communication.MAX_BATCH})")
+    parser.add_argument("--seq", action="store_true",
+                        help="Formato v2 (com nº de sequência) mesmo com --batch 1")
+    args = parser.parse_args()
+
+    gloves = [
+        SimulatedGlove(args.host, args.port, args.rate,
+                       FingerPattern(args.pattern, args.period, args.script),
+                       ImuMotion(args.imu), args.loss, i, args.batch, args.seq)
+        for i in range(args.devices)
+    ]
+    for glove in gloves:
+        glove.start(args.duration)
+    print(f"Simulando {args.devices} luva(s) a {args.rate:g}Hz -> {args.host}:{args.port} (Ctrl+C para parar)")
+
+    t0 = time.perf_counter()
+    try:
+        while any(g.running for g in gloves):
+            time.sleep(0.2)
+    except KeyboardInterrupt:
+        pass
+    for glove in gloves:
+        glove.stop()
+
+    elapsed = time.perf_counter() - t0
+    for i, glove in enumerate(gloves):
+        print(f"Luva {i}: {glove.sent} datagramas enviados ({glove.sent / elapsed:.0f}/s), "
+              f"{glove.dropped} descartados (perda simulada)")
+
+
+if __name__ == "__main__":
+    main()
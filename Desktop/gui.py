@@ -11,7 +11,8 @@ from PyQt5.QtWidgets import (
     QPushButton, QComboBox, QTextEdit, QSlider,
     QCheckBox, QStackedWidget, QFormLayout,
     QScrollArea, QLineEdit, QMessageBox,
-    QGroupBox, QFrame, QTabWidget, QMainWindow, QApplication, QGridLayout
+    QGroupBox, QFrame, QTabWidget, QMainWindow, QApplication, QGridLayout,
+    QFileDialog
 )
 from PyQt5.QtCore import QTimer, Qt, pyqtSlot, pyqtSignal
 
@@ -20,7 +21,9 @@ from communication import Communication
 from emulator import Emulator
 from instruments import Guitar, Drum
 from worker import InstrumentWorker
-from camera import CameraProcessor
+from camera import CameraPipeline
+from calibration import CAPTURE_SECONDS, SampleWindow, finger_mapping, fit_poses
+import logger
 
 import pyqtgraph as pg
 from collections import deque
@@ -87,8 +90,8 @@ class SensorVisualizer3D(QWidget):
         self.adc_curves = []
         self.threshold_lines = []
         
+        # Histórico lido direto do ring buffer da Communication (sem deque próprio)
         self.buffer_size = 100
-        self.adc_data = [deque([0]*self.buffer_size, maxlen=self.buffer_size) for _ in range(4)]
 
         for i, config in enumerate(self.finger_configs):
             plot = pg.PlotWidget(title=config["label"])
@@ -138,20 +141,22 @@ class SensorVisualizer3D(QWidget):
         return np.column_stack((xs, ys, zs)).astype(np.float32)
 
     def update_visuals(self):
-        raw = self.main_app.communication.get_latest_data()
-        if not raw: return
+        # View (sem cópia) das últimas amostras recebidas
+        window = self.main_app.communication.get_window(self.buffer_size, self.main_app.worker.device_id)
+        if len(window) == 0: return
+        raw = window[-1]
         mappings = self.main_app.sensor_mappings
 
         scale = 0.5 
         
         # --- MESTRA (Live) ---
-        mx, my, mz = raw.get('gyro_ax', 0), raw.get('gyro_ay', 0), raw.get('gyro_az', 0)
+        mx, my, mz = float(raw['gyro_ax']), float(raw['gyro_ay']), float(raw['gyro_az'])
         self.master_line.setData(pos=np.array([[0, 0, 0], [mx*scale, my*scale, mz*scale]]))
 
         # --- ESCRAVA (Live) ---
-        sx = raw.get('slave_ax', 0) 
-        sy = raw.get('slave_ay', 0)
-        sz = raw.get('slave_az', 0)
+        sx = float(raw['slave_ax'])
+        sy = float(raw['slave_ay'])
+        sz = float(raw['slave_az'])
         self.slave_line.setData(pos=np.array([[0, 0, 0], [sx*scale, sy*scale, sz*scale]]))
 
         # --- CALIBRAÇÃO (Pontilhada) ---
@@ -189,9 +194,7 @@ class SensorVisualizer3D(QWidget):
 
         # --- GRÁFICOS 2D ---
         for i, curve in enumerate(self.adc_curves):
-            val = raw.get(f'adc_v{i+32}', 0) 
-            self.adc_data[i].append(val)
-            curve.setData(self.adc_data[i])
+            curve.setData(window[f'adc_v{i+32}'])
 
             finger_name = self.finger_configs[i]["name"]
             if finger_name in mappings:
@@ -217,13 +220,19 @@ class MainApplication(QMainWindow):
         self.setWindowTitle("Air Band 🤘 (Multi-Thread + Slave)")
         self.setGeometry(300, 200, 800, 700)
 
+        # Log em buffer + thread de descarga: o worker nunca escreve no console
+        logger.setup_logging("INFO")
+
         self.sensor_mappings = {}
         self.load_mappings_from_file()
 
         # --- 1. Instancia a Lógica (Shared Resources) ---
-        self.communication = Communication() # Thread de rede inicia internamente
+        # Thread de rede inicia internamente; timestamps do kernel separam a
+        # fila do socket da espera pelo GIL (só Linux, ignorado nos demais)
+        self.communication = Communication(rcvbuf=1 << 20, kernel_timestamps=True)
         self.emulator = Emulator()           # Singleton
-        self.guitar = Guitar()
+        # Lanes da guitarra = botões do emulador (trocados juntos em set_lane_layout)
+        self.guitar = Guitar(Guitar.actions_for(self.emulator.botoes))
         self.drum = Drum()
 
         # --- 2. Instancia e Inicia o WORKER (Thread de Processamento) ---
@@ -311,6 +320,20 @@ class MainApplication(QMainWindow):
         except Exception as e:
             print(f"Erro ao salvar mapeamentos: {e}")
 
+    def set_lane_layout(self, name):
+        """
+        Troca o layout de lanes (Emulator.LAYOUTS): emulador, guitarra, plano
+        do worker e tela de calibração mudam juntos, então a quantidade de
+        lanes nunca diverge entre eles.
+        """
+        botoes = Emulator.LAYOUTS[name]
+        if list(botoes) == self.emulator.botoes:
+            return
+        self.emulator.configurar_lanes(botoes)
+        self.guitar.set_finger_actions(Guitar.actions_for(botoes))
+        self.worker.update_mappings(self.sensor_mappings)
+        self.calibration_tab.rebuild_action_rows()
+
     def toggle_glove_connection(self):
         # A comunicação roda em thread própria, só chamamos o método
         self.communication.toggle_connection()
@@ -319,6 +342,12 @@ class MainApplication(QMainWindow):
         status = self.communication.get_status_message()
         is_connected = self.communication.connected
         self.main_menu_tab.update_connection_status(is_connected, status)
+        self.main_menu_tab.update_device_list(self.communication.list_devices())
+        self.main_menu_tab.update_stream_stats(self.worker.get_stream_stats())
+        self.main_menu_tab.update_link_stats(self.communication.get_link_stats())
+        self.main_menu_tab.update_latency_stats(self.worker.get_latency_stats())
+        self.main_menu_tab.update_log_view()
+        self.main_menu_tab.update_trace_view()
 
     def update_ui_visuals(self):
         """ 
@@ -327,10 +356,11 @@ class MainApplication(QMainWindow):
         agora ocorre dentro de 'self.worker'.
         """
         # Obtém cópia thread-safe dos dados apenas para mostrar na tela
-        raw_data = self.communication.get_latest_data()
+        raw_data = self.communication.get_latest_data(self.worker.device_id)
 
         # Passa dados para o terminal na aba "Controle"
         self.main_menu_tab.update_sensor_data(raw_data)
+        self.main_menu_tab.poll_camera_data()
 
         # 1. Se o instrumento selecionado é Guitarra (Luva)
         # if self.main_menu_tab.get_selected_instrument() == "Guitarra (Luva)":
@@ -367,6 +397,7 @@ class MainApplication(QMainWindow):
             self.worker.stop() # Para a thread de lógica
         self.communication.connected = False # Para a thread de rede
         self.emulator.fechar() # Reseta controle virtual
+        logger.shutdown() # Descarrega o que ainda estiver no buffer de log
         event.accept()
 
 
@@ -437,10 +468,13 @@ class CalibrationScreen(QWidget):
         self.current_calibration_action = None
         self.current_calibration_step = 0
         self.temp_snapshots = {}
+        # Janelas de amostras por pose (ver calibration.py), acumuladas na sessão
+        self.capture = None                      # SampleWindow em andamento
+        self.rest_windows = deque(maxlen=4)      # Repousos mais recentes
+        self.full_windows = {}                   # Dedo -> janela "só este dedo dobrado"
         
-        self.logical_actions = [
-            "Dedo 1 (Indicador)", "Dedo 2 (Médio)", 
-            "Dedo 3 (Anelar)", "Dedo 4 (Mindinho)",
+        # Uma entrada por lane da guitarra (qualquer quantidade) + as batidas
+        self.logical_actions = list(self.main_app.guitar.finger_actions) + [
             "Batida (Mestra)", "Batida (Escrava)"
         ]
 
@@ -475,19 +509,10 @@ class CalibrationScreen(QWidget):
 
         # --- Área de Calibração (Botões) ---
         calib_group = QGroupBox("Calibração de Sensores")
-        calib_layout = QVBoxLayout()
-        calib_group.setLayout(calib_layout)
-
+        self.calib_layout = QVBoxLayout()
+        calib_group.setLayout(self.calib_layout)
         self.action_labels = {}
-        for action in self.logical_actions:
-            hbox = QHBoxLayout()
-            label = QLabel(f"<b>{action}:</b> --")
-            self.action_labels[action] = label
-            btn = QPushButton(f"Calibrar")
-            btn.clicked.connect(lambda _, a=action: self.start_calibration_wizard(a))
-            hbox.addWidget(label)
-            hbox.addWidget(btn)
-            calib_layout.addLayout(hbox)
+        self._build_action_rows()
         
         layout.addWidget(calib_group)
 
@@ -523,6 +548,54 @@ class CalibrationScreen(QWidget):
         settings_layout.addWidget(self.lbl_cross)
         settings_layout.addWidget(self.slider_cross)
 
+        # 4. Tipo de filtro dos dedos
+        self.filter_types = [("EMA (alpha fixo)", "ema"), ("One Euro (adaptativo)", "one_euro"), ("Kalman", "kalman")]
+        self.filter_combo = QComboBox()
+        for label, _ in self.filter_types:
+            self.filter_combo.addItem(label)
+        self.filter_combo.currentIndexChanged.connect(self.update_guitar_params)
+        settings_layout.addWidget(QLabel("Filtro dos Dedos"))
+        settings_layout.addWidget(self.filter_combo)
+
+        # 5. One Euro: corte mínimo (dedo parado)
+        self.lbl_mincutoff = QLabel("One Euro - Corte Mínimo (1.0 Hz)")
+        self.slider_mincutoff = QSlider(Qt.Horizontal)
+        self.slider_mincutoff.setRange(1, 100) # 0.1 a 10.0 Hz
+        self.slider_mincutoff.setValue(10)     # Default 1.0 Hz
+        self.slider_mincutoff.valueChanged.connect(self.update_guitar_params)
+        settings_layout.addWidget(self.lbl_mincutoff)
+        settings_layout.addWidget(self.slider_mincutoff)
+
+        # 6. One Euro: beta (quanto a velocidade abre o filtro)
+        self.lbl_beta = QLabel("One Euro - Beta (0.50)")
+        self.slider_beta = QSlider(Qt.Horizontal)
+        self.slider_beta.setRange(0, 200) # 0.00 a 2.00
+        self.slider_beta.setValue(50)     # Default 0.50
+        self.slider_beta.valueChanged.connect(self.update_guitar_params)
+        settings_layout.addWidget(self.lbl_beta)
+        settings_layout.addWidget(self.slider_beta)
+
+        # 7. Kalman: ruído de processo (escala log, R fixo)
+        self.lbl_kalman = QLabel("Kalman - Ruído de Processo (1e3)")
+        self.slider_kalman = QSlider(Qt.Horizontal)
+        self.slider_kalman.setRange(-10, 50) # 10^-1 a 10^5
+        self.slider_kalman.setValue(30)      # Default 10^3
+        self.slider_kalman.valueChanged.connect(self.update_guitar_params)
+        settings_layout.addWidget(self.lbl_kalman)
+        settings_layout.addWidget(self.slider_kalman)
+
+        # 8. Disparo antecipado pela inclinação do sensor
+        self.predict_check = QCheckBox("Disparo antecipado (prevê o cruzamento do limiar)")
+        self.predict_check.toggled.connect(self.update_guitar_params)
+        settings_layout.addWidget(self.predict_check)
+        self.lbl_lead = QLabel("Antecipação (25 ms)")
+        self.slider_lead = QSlider(Qt.Horizontal)
+        self.slider_lead.setRange(5, 60) # 5 a 60 ms
+        self.slider_lead.setValue(25)    # Default 25 ms
+        self.slider_lead.valueChanged.connect(self.update_guitar_params)
+        settings_layout.addWidget(self.lbl_lead)
+        settings_layout.addWidget(self.slider_lead)
+
         layout.addWidget(settings_group)
 
         layout.addStretch()
@@ -537,11 +610,20 @@ class CalibrationScreen(QWidget):
         thresh_val = self.slider_thresh.value() / 100.0
         alpha_val = self.slider_alpha.value() / 100.0
         cross_val = self.slider_cross.value() / 100.0
+        filter_type = self.filter_types[self.filter_combo.currentIndex()][1]
+        mincutoff_val = self.slider_mincutoff.value() / 10.0
+        beta_val = self.slider_beta.value() / 100.0
+        kalman_q = 10 ** (self.slider_kalman.value() / 10.0)
+        lead_ms = self.slider_lead.value()
 
         # Atualiza Labels
         self.lbl_thresh.setText(f"Limiar de Disparo: <b>{thresh_val:.2f}</b> (Baixo=Sensível, Alto=Duro)")
         self.lbl_alpha.setText(f"Suavização (Alpha): <b>{alpha_val:.2f}</b> (Baixo=Lento/Liso, Alto=Rápido/Tremido)")
         self.lbl_cross.setText(f"Força Crosstalk: <b>{cross_val:.2f}</b> (1.0=Padrão)")
+        self.lbl_mincutoff.setText(f"One Euro - Corte Mínimo: <b>{mincutoff_val:.1f} Hz</b> (Baixo=Liso parado, Alto=Tremido)")
+        self.lbl_beta.setText(f"One Euro - Beta: <b>{beta_val:.2f}</b> (Alto=Menos atraso em movimento)")
+        self.lbl_kalman.setText(f"Kalman - Ruído de Processo: <b>{kalman_q:.0e}</b> (Baixo=Liso, Alto=Rápido)")
+        self.lbl_lead.setText(f"Antecipação: <b>{lead_ms} ms</b> (Alto=Mais cedo, risco de falsos)")
 
         # Injeta diretamente na classe Guitar (via Worker)
         if hasattr(self.main_app, 'worker') and self.main_app.worker and self.main_app.worker.guitar:
@@ -549,8 +631,43 @@ class CalibrationScreen(QWidget):
             guitar.TRIGGER_THRESHOLD = thresh_val
             guitar.FILTER_ALPHA = alpha_val
             guitar.CROSSTALK_GAIN = cross_val
+            guitar.FILTER_TYPE = filter_type
+            guitar.ONE_EURO_MIN_CUTOFF = mincutoff_val
+            guitar.ONE_EURO_BETA = beta_val
+            guitar.KALMAN_Q = kalman_q
+            guitar.PREDICTIVE_ONSET = self.predict_check.isChecked()
+            guitar.PREDICT_LEAD_TIME = lead_ms / 1000.0
             # print(f"Params atualizados: T={thresh_val}, A={alpha_val}, C={cross_val}")
 
+    def _build_action_rows(self):
+        """ Uma linha (status + botão Calibrar) por ação em self.logical_actions. """
+        for action in self.logical_actions:
+            row = QWidget()
+            hbox = QHBoxLayout(row)
+            hbox.setContentsMargins(0, 0, 0, 0)
+            label = QLabel(f"<b>{action}:</b> --")
+            self.action_labels[action] = label
+            btn = QPushButton(f"Calibrar")
+            btn.clicked.connect(lambda _, a=action: self.start_calibration_wizard(a))
+            hbox.addWidget(label)
+            hbox.addWidget(btn)
+            self.calib_layout.addWidget(row)
+
+    def rebuild_action_rows(self):
+        """ Layout de lanes trocado: refaz as linhas com as ações da guitarra atual. """
+        self.cancel_wizard()
+        while self.calib_layout.count():
+            item = self.calib_layout.takeAt(0)
+            if item.widget():
+                item.widget().deleteLater()
+        self.logical_actions = list(self.main_app.guitar.finger_actions) + [
+            "Batida (Mestra)", "Batida (Escrava)"
+        ]
+        self.action_labels = {}
+        self.full_windows = {}
+        self._build_action_rows()
+        self.update_calibration_status_labels()
+
     def _create_wizard_widget(self):
         widget = QWidget()
         layout = QVBoxLayout(widget)
@@ -578,7 +695,8 @@ class CalibrationScreen(QWidget):
         return widget
 
     def update_sensor_data(self):
-        raw_data = self.main_app.communication.get_latest_data()
+        self.poll_capture()
+        raw_data = self.main_app.communication.get_latest_data(self.main_app.worker.device_id)
         if not raw_data: return
         
         if self.sensor_selector.count() == 0:
@@ -636,16 +754,37 @@ class CalibrationScreen(QWidget):
             self.update_wizard_ui()
             return
 
-        snapshot = self.main_app.communication.get_latest_data()
-        
+        # Captura uma janela da pose em vez de uma leitura só (termina em poll_capture)
+        reader = self.main_app.communication.open_reader(device_id=self.main_app.worker.device_id)
+        self.capture = SampleWindow(reader)
+        self.wizard_capture_btn.setEnabled(False)
+        self.wizard_capture_btn.setText(f"Capturando ({CAPTURE_SECONDS:.0f} s)... mantenha a pose")
+
+    def poll_capture(self):
+        """ Chamado pelo timer da tela: termina a janela de captura em andamento. """
+        capture = self.capture
+        if capture is None or not capture.poll():
+            return
+        self.capture = None
+        self.wizard_capture_btn.setEnabled(True)
+        samples = capture.samples()
+        if samples is None:
+            QMessageBox.warning(self, "Erro", "Nenhuma amostra recebida durante a captura. A luva está conectada?")
+            self.update_wizard_ui()
+            return
+
+        step = self.current_calibration_step
+        snapshot = self.main_app.communication.get_latest_data(self.main_app.worker.device_id)
         if step == 1:
             self.temp_snapshots["rest"] = snapshot
+            self.rest_windows.append(samples)
             self.current_calibration_step = 2
             self.update_wizard_ui()
             
         elif step == 2:
             self.temp_snapshots["full"] = snapshot
-            if "Dedo" in self.current_calibration_action:
+            if self.current_calibration_action in self.main_app.guitar.finger_actions:
+                self.full_windows[self.current_calibration_action] = samples
                 self.finish_finger_calibration_manual()
             else:
                 self.finish_generic_calibration()
@@ -653,35 +792,43 @@ class CalibrationScreen(QWidget):
     def finish_finger_calibration_manual(self):
         action = self.current_calibration_action
         chosen_key = self.sensor_selector.currentText() 
-        
-        rest_snapshot = self.temp_snapshots["rest"]
-        full_snapshot = self.temp_snapshots["full"]
-        
-        val_rest = rest_snapshot.get(chosen_key, 0)
-        val_full = full_snapshot.get(chosen_key, 0)
-        
-        interference_profile = {}
-        for k, v in full_snapshot.items():
-            if "adc" in k and k != chosen_key:
-                interference_profile[k] = v
-
-        mapping = {
-            "key": chosen_key,
-            "rest": val_rest,
-            "full": val_full,
-            "crosstalk_ref": interference_profile 
-        }
+        guitar = self.main_app.guitar
+
+        # Mínimos quadrados sobre todas as janelas da sessão: repousos + cada dedo dobrado
+        names = self.main_app.communication.SAMPLE_DTYPE.names
+        sensors = [k for k in names if "adc" in k]
+        if chosen_key not in sensors:
+            sensors.append(chosen_key)
+        windows = [(None, w) for w in self.rest_windows] + list(self.full_windows.items())
+        try:
+            fit = fit_poses(windows, sensors, guitar.finger_actions)
+            mapping = finger_mapping(fit, sensors, guitar.finger_actions, action, chosen_key)
+        except (ValueError, np.linalg.LinAlgError) as e:
+            QMessageBox.warning(self, "Erro", f"Não foi possível ajustar a calibração: {e}")
+            self.cancel_wizard()
+            return
         
         self.main_app.sensor_mappings[action] = mapping
         self.main_app.save_mappings_to_file()
         
-        QMessageBox.information(self, "Sucesso", f"Calibrado!\nSensor: {chosen_key}\nPerfil de interferência salvo.")
+        QMessageBox.information(
+            self, "Sucesso",
+            f"Calibrado!\nSensor: {chosen_key}\n"
+            f"Repouso {mapping['rest']:.3f} | Full {mapping['full']:.3f}\n"
+            f"Ruído: {mapping['noise'] * 1000:.1f} mV ({mapping['noise_activation'] * 100:.1f}% da faixa)\n"
+            f"Histerese mínima pelo ruído: {mapping['hysteresis']:.2f} "
+            f"(soltura em {guitar.release_threshold(mapping['hysteresis']):.2f}"
+            f" com o limiar atual)\n"
+            f"Perfil de interferência salvo."
+        )
         self.cancel_wizard()
 
     def finish_generic_calibration(self):
         self.cancel_wizard()
 
     def cancel_wizard(self):
+        self.capture = None
+        self.wizard_capture_btn.setEnabled(True)
         self.stack.setCurrentWidget(self.main_menu_widget)
 
     def start_timer(self):
@@ -690,9 +837,29 @@ class CalibrationScreen(QWidget):
         # Sincroniza sliders com valores atuais da Guitarra ao abrir a tela
         if hasattr(self.main_app, 'worker') and self.main_app.worker and self.main_app.worker.guitar:
              g = self.main_app.worker.guitar
-             self.slider_thresh.setValue(int(g.TRIGGER_THRESHOLD * 100))
-             self.slider_alpha.setValue(int(g.FILTER_ALPHA * 100))
-             self.slider_cross.setValue(int(g.CROSSTALK_GAIN * 100))
+             # Lê tudo antes: cada setValue reenvia todos os sliders para a Guitarra
+             types = [t for _, t in self.filter_types]
+             values = [
+                 (self.slider_thresh, int(g.TRIGGER_THRESHOLD * 100)),
+                 (self.slider_alpha, int(g.FILTER_ALPHA * 100)),
+                 (self.slider_cross, int(g.CROSSTALK_GAIN * 100)),
+                 (self.filter_combo, types.index(g.FILTER_TYPE) if g.FILTER_TYPE in types else 0),
+                 (self.slider_mincutoff, int(round(g.ONE_EURO_MIN_CUTOFF * 10))),
+                 (self.slider_beta, int(round(g.ONE_EURO_BETA * 100))),
+                 (self.slider_kalman, int(round(math.log10(max(g.KALMAN_Q, 1e-9)) * 10))),
+                 (self.predict_check, g.PREDICTIVE_ONSET),
+                 (self.slider_lead, int(round(g.PREDICT_LEAD_TIME * 1000))),
+             ]
+             for widget, value in values:
+                 widget.blockSignals(True)
+                 if widget is self.filter_combo:
+                     widget.setCurrentIndex(value)
+                 elif widget is self.predict_check:
+                     widget.setChecked(value)
+                 else:
+                     widget.setValue(value)
+                 widget.blockSignals(False)
+             self.update_guitar_params()
 
     def stop_timer(self):
         self.timer.stop()
@@ -737,6 +904,14 @@ class MainMenuScreen(Screen):
         self.output_combo.currentTextChanged.connect(self.change_emulator_type)
         config_layout.addRow(QLabel("<b>Saída:</b>"), self.output_combo)
 
+        self.layout_combo = QComboBox()
+        self.layout_combo.addItems(list(Emulator.LAYOUTS))
+        for name, botoes in Emulator.LAYOUTS.items():
+            if list(botoes) == self.main_app.emulator.botoes:
+                self.layout_combo.setCurrentText(name)
+        self.layout_combo.currentTextChanged.connect(self.main_app.set_lane_layout)
+        config_layout.addRow(QLabel("<b>Lanes:</b>"), self.layout_combo)
+
         left_column.addWidget(config_group)
 
         # --- Bloco de Controles da Guitarra ---
@@ -757,8 +932,77 @@ class MainMenuScreen(Screen):
         self.status_label = QLabel("Status Luva: Desconectado")
         guitar_layout.addWidget(self.status_label)
 
+        # Qual luva controla a guitarra (várias luvas na mesma porta)
+        self.device_combo = QComboBox()
+        self.device_combo.addItem("Automático (primeira luva ativa)", None)
+        self.device_combo.currentIndexChanged.connect(self.on_device_changed)
+        guitar_layout.addWidget(self.device_combo)
+
+        # Modo batida: as notas só saem quando o giroscópio detecta a palhetada
+        self.strum_check = QCheckBox("Modo batida (palhetada com o giroscópio)")
+        self.strum_check.toggled.connect(self.main_app.guitar.set_strumming_mode)
+        guitar_layout.addWidget(self.strum_check)
+
+        # Contadores do fluxo luva -> worker (perdas sob carga)
+        self.stream_label = QLabel("Fila: --")
+        guitar_layout.addWidget(self.stream_label)
+
         left_column.addWidget(guitar_group)
 
+        # --- Bloco de Estatísticas de Rede (por luva/fonte) ---
+        net_group = QGroupBox("Rede Wi-Fi 📶")
+        net_layout = QVBoxLayout(net_group)
+
+        self.link_stats_label = QLabel("Sem pacotes recebidos.")
+        self.link_stats_label.setTextFormat(Qt.RichText)
+        net_layout.addWidget(self.link_stats_label)
+
+        net_buttons = QHBoxLayout()
+        self.export_stats_btn = QPushButton("Exportar")
+        self.export_stats_btn.clicked.connect(self.export_link_stats)
+        net_buttons.addWidget(self.export_stats_btn)
+        self.reset_stats_btn = QPushButton("Zerar")
+        self.reset_stats_btn.clicked.connect(self.main_app.communication.reset_link_stats)
+        net_buttons.addWidget(self.reset_stats_btn)
+        net_layout.addLayout(net_buttons)
+
+        # Gravação / Replay de sessões (reproduzir problemas sem a luva)
+        session_buttons = QHBoxLayout()
+        self.record_btn = QPushButton("Gravar Sessão ⏺")
+        self.record_btn.setCheckable(True)
+        self.record_btn.clicked.connect(self.toggle_recording)
+        session_buttons.addWidget(self.record_btn)
+
+        self.replay_speed_combo = QComboBox()
+        self.replay_speed_combo.addItems(["1x", "2x", "4x", "10x", "Máx"])
+        session_buttons.addWidget(self.replay_speed_combo)
+
+        self.replay_btn = QPushButton("Replay ▶")
+        self.replay_btn.clicked.connect(self.start_replay)
+        session_buttons.addWidget(self.replay_btn)
+        net_layout.addLayout(session_buttons)
+
+        left_column.addWidget(net_group)
+
+        # --- Bloco de Latência (recepção -> worker -> decisão -> emulador) ---
+        latency_group = QGroupBox("Latência ⏱")
+        latency_layout = QVBoxLayout(latency_group)
+
+        self.latency_label = QLabel("Sem medições.")
+        self.latency_label.setTextFormat(Qt.RichText)
+        latency_layout.addWidget(self.latency_label)
+
+        latency_buttons = QHBoxLayout()
+        self.export_latency_btn = QPushButton("Exportar")
+        self.export_latency_btn.clicked.connect(self.export_latency_stats)
+        latency_buttons.addWidget(self.export_latency_btn)
+        self.reset_latency_btn = QPushButton("Zerar")
+        self.reset_latency_btn.clicked.connect(self.main_app.worker.tracer.reset)
+        latency_buttons.addWidget(self.reset_latency_btn)
+        latency_layout.addLayout(latency_buttons)
+
+        left_column.addWidget(latency_group)
+
         # --- Bloco de Controles da Bateria ---
         drum_group = QGroupBox("Controles da Bateria 🥁")
         drum_layout = QVBoxLayout(drum_group)
@@ -809,12 +1053,48 @@ class MainMenuScreen(Screen):
 
         right_column.addWidget(self.debug_group)
 
+        # --- Log (últimas linhas do buffer do logger) ---
+        self.log_group = QGroupBox("Log 📜")
+        self.log_group.setCheckable(True)
+        self.log_group.setChecked(False)
+        log_layout = QVBoxLayout(self.log_group)
+
+        self.log_level_combo = QComboBox()
+        self.log_level_combo.addItems(list(logger.LEVELS))
+        self.log_level_combo.setCurrentText("INFO")
+        self.log_level_combo.currentTextChanged.connect(logger.set_level)
+        log_layout.addWidget(self.log_level_combo)
+
+        self.log_output = QTextEdit()
+        self.log_output.setReadOnly(True)
+        log_layout.addWidget(self.log_output)
+
+        right_column.addWidget(self.log_group)
+
+        # --- Trace numérico da Guitarra (bruto / interferência / final / armado por dedo) ---
+        self.trace_group = QGroupBox("Trace da Guitarra 🔬")
+        self.trace_group.setCheckable(True)
+        self.trace_group.setChecked(False)
+        self.trace_group.toggled.connect(self.main_app.guitar.set_tracing)
+        trace_layout = QVBoxLayout(self.trace_group)
+
+        self.trace_output = QTextEdit()
+        self.trace_output.setReadOnly(True)
+        self.trace_output.setStyleSheet("font-family: monospace;")
+        trace_layout.addWidget(self.trace_output)
+
+        self.export_trace_btn = QPushButton("Exportar (CSV/NPZ)")
+        self.export_trace_btn.clicked.connect(self.export_trace)
+        trace_layout.addWidget(self.export_trace_btn)
+
+        right_column.addWidget(self.trace_group)
+
         # --- CÂMERA WIDGET ---
         self.camera_widget = CameraWidget(self) 
-        # Conecta sinal para atualizar dados locais e debug
-        self.camera_widget.camera_data_signal.connect(self.update_camera_data)
-        # ✅ NOVO: Conecta também ao worker
-        self.camera_widget.camera_data_signal.connect(self.main_app.worker.update_camera_data)
+        # Resultados vão direto da thread de inferência para o worker (sem passar pelo Qt);
+        # o debug local só consulta o último resultado (poll_camera_data)
+        self.camera_widget.pipeline.result_callbacks.append(self.main_app.worker.update_camera_data)
+        self._camera_seq = 0
         
         # Inicia Câmera IMEDIATAMENTE (para detecção em background)
         self.camera_widget.start_camera()
@@ -848,8 +1128,156 @@ class MainMenuScreen(Screen):
                 texto += f"<span style='color:#00FF00;'>{key}:</span> {value}\n"
         self.sensor_output.setHtml(texto)
 
+    def update_log_view(self):
+        """ Mostra o fim do buffer de log (só com o painel aberto). """
+        if not self.log_group.isChecked():
+            return
+        lines = logger.get_tail(200)
+        dropped = logger.get_dropped()
+        if dropped:
+            lines.append(f"({dropped} registros descartados: buffer de log cheio)")
+        self.log_output.setPlainText("\n".join(lines))
+        self.log_output.verticalScrollBar().setValue(self.log_output.verticalScrollBar().maximum())
+
+    def update_trace_view(self):
+        """ Últimas amostras do trace: bruto-interferência=final por dedo (* = armado). """
+        trace = self.main_app.guitar.trace
+        if trace is None:
+            return
+        self.trace_output.setPlainText(f"{trace.count} amostras\n" + trace.format_tail(20))
+
+    def export_trace(self):
+        trace = self.main_app.guitar.trace
+        if trace is None:
+            QMessageBox.information(self, "Trace", "Ligue o trace antes de exportar.")
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Exportar Trace", "trace.csv", "CSV (*.csv);;NumPy (*.npz)")
+        if not path:
+            return
+        try:
+            trace.export(path, self.main_app.guitar.finger_actions)
+        except OSError as e:
+            QMessageBox.warning(self, "Erro", f"Não foi possível exportar: {e}")
+
+    def update_device_list(self, device_ids):
+        """ Adiciona ao combobox as luvas que começaram a enviar pacotes. """
+        known = {self.device_combo.itemData(i) for i in range(self.device_combo.count())}
+        for device_id in device_ids:
+            if device_id not in known:
+                self.device_combo.addItem(f"Luva {device_id}", device_id)
+
+    def on_device_changed(self, index):
+        self.main_app.worker.bind_device(self.device_combo.itemData(index))
+
+    def update_stream_stats(self, stats):
+        self.stream_label.setText(
+            f"Fila: atraso {stats['lag']} (máx {stats['max_lag']}) | "
+            f"lote máx {stats['max_batch']} | perdidas {stats['dropped']} | "
+            f"trocas suprimidas {stats.get('suppressed', 0)}"
+        )
+
+    def update_link_stats(self, link_stats):
+        """ Mostra taxa, perdas e jitter de cada fonte UDP. """
+        if not link_stats:
+            self.link_stats_label.setText("Sem pacotes recebidos.")
+            return
+        texto = ""
+        for source, st in link_stats.items():
+            texto += (
+                f"<b>{source}</b>: {st['rate_hz']:.0f} Hz | "
+                f"perdidos {st['lost']} ({st['loss_pct']:.1f}%"
+                f"{'' if st['loss_reliable'] else ', estimado pelo millis: impreciso nesta taxa'}) | "
+                f"dup {st['duplicates']} | fora de ordem {st['out_of_order']}<br>"
+                f"&nbsp;&nbsp;jitter {st['jitter_ms']:.1f} ms"
+            )
+            if "interarrival_p95_ms" in st:
+                texto += (
+                    f" | intervalo p50/p95/p99: {st['interarrival_p50_ms']:.1f}/"
+                    f"{st['interarrival_p95_ms']:.1f}/{st['interarrival_p99_ms']:.1f} ms"
+                )
+            texto += (
+                f"<br>&nbsp;&nbsp;relógio: deriva {st['clock_drift_ppm']:+.0f} ppm | "
+                f"fila típica {st['clock_queue_ms']:.1f} ms"
+            )
+            texto += "<br>"
+        self.link_stats_label.setText(texto)
+
+    def export_link_stats(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Exportar Estatísticas de Rede", "link_stats.json", "JSON (*.json)")
+        if not path:
+            return
+        try:
+            self.main_app.communication.export_link_stats(path)
+        except OSError as e:
+            QMessageBox.warning(self, "Erro", f"Não foi possível exportar: {e}")
+
+    LATENCY_LABELS = {
+        "sample_to_recv": "Amostragem → Recepção (fila)",
+        "kernel_to_recv": "Kernel → Thread de Recepção",
+        "recv_to_worker": "Recepção → Worker",
+        "worker_to_decision": "Worker → Decisão",
+        "decision_to_output": "Decisão → Botão",
+        "recv_to_output": "Total (Recepção → Botão)",
+    }
+
+    def update_latency_stats(self, latency_stats):
+        """ Percentis p50/p95/p99 de cada estágio do caminho luva -> jogo. """
+        texto = ""
+        for stage, st in latency_stats.items():
+            if st["count"] == 0:
+                continue
+            texto += (
+                f"<b>{self.LATENCY_LABELS.get(stage, stage)}</b>: "
+                f"p50 {st['p50_ms']:.2f} | p95 {st['p95_ms']:.2f} | p99 {st['p99_ms']:.2f} | "
+                f"máx {st['max_ms']:.1f} ms ({st['count']})<br>"
+            )
+        self.latency_label.setText(texto or "Sem medições.")
+
+    def export_latency_stats(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Exportar Latências", "latency.json", "JSON (*.json)")
+        if not path:
+            return
+        try:
+            self.main_app.worker.tracer.dump(path)
+        except OSError as e:
+            QMessageBox.warning(self, "Erro", f"Não foi possível exportar: {e}")
+
+    def toggle_recording(self, checked: bool):
+        comm = self.main_app.communication
+        if checked:
+            path, _ = QFileDialog.getSaveFileName(self, "Gravar Sessão", "sessao.airrec", "Gravação AirBand (*.airrec)")
+            if not path:
+                self.record_btn.setChecked(False)
+                return
+            try:
+                comm.start_recording(path)
+            except (OSError, ValueError) as e:
+                QMessageBox.warning(self, "Erro", f"Não foi possível gravar: {e}")
+                self.record_btn.setChecked(False)
+                return
+            self.record_btn.setText("Parar Gravação ⏹")
+        else:
+            comm.stop_recording()
+            self.record_btn.setText("Gravar Sessão ⏺")
+
+    def start_replay(self):
+        comm = self.main_app.communication
+        if comm.is_replaying():
+            comm.stop_replay()
+            return
+        path, _ = QFileDialog.getOpenFileName(self, "Reproduzir Sessão", "", "Gravação AirBand (*.airrec)")
+        if not path:
+            return
+        text = self.replay_speed_combo.currentText()
+        speed = None if text == "Máx" else float(text.rstrip("x"))
+        try:
+            comm.start_replay(path, speed)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "Erro", f"Não foi possível reproduzir: {e}")
+
     def update_connection_status(self, is_connected, status_message):
         self.status_label.setText(f"Status Luva: {status_message}")
+        self.replay_btn.setText("Parar Replay ⏹" if self.main_app.communication.is_replaying() else "Replay ▶")
         if is_connected:
             self.connect_glove_btn.setText("Desconectar Luva")
             if self.debug_group.isChecked():
@@ -865,7 +1293,7 @@ class MainMenuScreen(Screen):
         """ Alterna entre mostrar o vídeo ou deixar rodando escondido. """
         
         # 1. Se a câmera caiu por algum motivo (erro de USB), tenta reiniciar
-        if not self.camera_widget.processor.is_active():
+        if not self.camera_widget.pipeline.is_active():
              self.camera_widget.start_camera()
 
         # 2. Verifica se estamos MOSTRANDO o vídeo atualmente
@@ -881,6 +1309,14 @@ class MainMenuScreen(Screen):
             self.camera_widget.set_feedback_visible(True)
             self.camera_feedback_btn.setText("Parar Retorno da Câmera (Bateria)")
 
+    def poll_camera_data(self):
+        """ Timer da GUI: mostra o último resultado da câmera, se for novo. """
+        pipeline = self.camera_widget.pipeline
+        if pipeline.data_seq == self._camera_seq or pipeline.latest_data is None:
+            return
+        self._camera_seq = pipeline.data_seq
+        self.update_camera_data(pipeline.latest_data)
+
     def update_camera_data(self, data):
         """ Recebe os dados da câmera, atualiza vetor e debug. """
         
@@ -961,15 +1397,22 @@ class MainMenuScreen(Screen):
 class CameraWidget(QWidget):
     """
     Widget PyQt que gerencia a exibição da imagem.
-    Delega todo o processamento pesado para a classe CameraProcessor.
+    Captura e inferência rodam nas threads do CameraPipeline (camera.py);
+    os resultados vão direto para o worker. Para o Qt só vem a prévia,
+    e só enquanto ela está visível.
     """
-    camera_data_signal = pyqtSignal(dict)
+    preview_signal = pyqtSignal()
 
     def __init__(self, parent=None):
         super().__init__(parent)
         
-        # Instancia a lógica separada
-        self.processor = CameraProcessor()
+        # Instancia a lógica separada (threads próprias, fora da GUI)
+        self.pipeline = CameraPipeline()
+        self.processor = self.pipeline.processor
+        self.pipeline.preview_callback = self._on_preview
+        self._pending_image = None
+        self._preview_queued = False
+        self.preview_signal.connect(self.show_preview)
         
         self.w, self.h = 640, 480
         self.setFixedSize(self.w, self.h)
@@ -984,49 +1427,48 @@ class CameraWidget(QWidget):
         self.video_label.setStyleSheet("background-color: #111; color: #555;")
         layout.addWidget(self.video_label)
         
-        # Timer de Atualização (30 FPS)
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.update_frame)
-
     def start_camera(self):
-        """ Liga a câmera e o timer. """
-        if self.processor.start():
-            self.timer.start(30)
+        """ Liga a câmera e as threads de captura/inferência. """
+        if self.pipeline.start():
             self.set_feedback_visible(False) 
         else:
             self.video_label.setText("Erro ao abrir câmera!")
 
     def stop_camera(self):
         """ Para tudo e libera recursos. """
-        self.timer.stop()
-        self.processor.stop()
+        self.pipeline.stop()
         self.video_label.setText("Câmera Desligada")
         self.video_label.clear()
 
     def set_feedback_visible(self, visible):
         """ Liga/Desliga apenas a renderização visual na tela. """
         self.show_video_feed = visible
+        self.pipeline.preview_enabled = visible
         if visible:
             self.video_label.setText("Carregando feed...")
         else:
             self.video_label.clear()
             self.video_label.setText("Câmera rodando em background...")
 
+    def _on_preview(self, frame_rgb):
+        """
+        Thread de inferência: guarda só a prévia mais recente e avisa o Qt
+        uma vez; se a GUI atrasar, frames antigos são trocados, não enfileirados.
+        """
+        self._pending_image = frame_rgb
+        if not self._preview_queued:
+            self._preview_queued = True
+            self.preview_signal.emit()
+
     @pyqtSlot()
-    def update_frame(self):
-        """ Loop principal chamado pelo Timer. """
-        # 1. Pede para o processador fazer a mágica
-        frame_rgb, data = self.processor.process_frame()
-        
-        if frame_rgb is None: 
-            # Se retornou None, a câmera caiu ou foi fechada
-            # self.stop_camera() # Opcional: parar se cair
+    def show_preview(self):
+        """ Thread da GUI: desenha a prévia mais recente. """
+        self._preview_queued = False
+        frame_rgb, self._pending_image = self._pending_image, None
+        if frame_rgb is None:
             return
 
-        # 2. Emite os dados lógicos (vetor de bateria, ângulos)
-        self.camera_data_signal.emit(data)
-
-        # 3. Atualiza a tela APENAS se o usuário quiser ver (Feedback)
+        # Atualiza a tela APENAS se o usuário quiser ver (Feedback)
         if self.show_video_feed:
             h, w, ch = frame_rgb.shape
             bytes_per_line = ch * w
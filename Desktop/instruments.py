@@ -1,5 +1,16 @@
 import math
 import time
+import numpy as np
+
+from debug_trace import GuitarTrace
+from filters import FILTERS, EMAFilter, KalmanFilter, OneEuroFilter
+from mapping_plan import MappingPlan
+from strum import StrumDetector
+from trigger import OnsetPredictor, TriggerGate
+
+from logger import get_logger
+
+log = get_logger("instruments")
 
 class InputData:
     """ Interface base. """
@@ -7,185 +18,442 @@ class InputData:
         pass
 
 class Instrument(InputData):
-    def __init__(self):
-        self.lanes_vector = [0, 0, 0, 0]
+    def __init__(self, n_lanes=4):
+        # Estado das lanes em array de tamanho fixo (0/1 por lane)
+        self.lanes = np.zeros(n_lanes, dtype=np.int8)
+
+    @property
+    def n_lanes(self):
+        return len(self.lanes)
+
+    @property
+    def lanes_vector(self):
+        """ Estado das lanes como lista (formato do Emulator.atualizar_estado). """
+        return self.lanes.tolist()
+
+    @property
+    def mascara(self):
+        """ Estado das lanes como máscara de bits (formato do Emulator.atualizar_mascara). """
+        return int(self.lanes.astype(np.int64) @ (np.int64(1) << np.arange(len(self.lanes), dtype=np.int64)))
 
 class Drum(Instrument):
-    def __init__(self):
+    def __init__(self, n_lanes=4):
         self.last_strum_time = {} 
         self.STRUM_COOLDOWN = 0.2
-        super().__init__()
+        super().__init__(n_lanes)
 
     def process_data(self, logical_data, camera_data, mappings, emulator):
         """
         Processamento exclusivo da CÂMERA para Bateria.
         Ignora o giroscópio.
         """
-        print("🥁 Processando dados da bateria (CÂMERA)...")
-        
         # ✅ NOVO: Enviar o vetor da câmera diretamente para o emulador
         if camera_data:
             # camera_data é o Drum_Vector [0, 1, 0, 0] da câmera
-            print(f"🥁 [DRUM] Recebeu camera_data: {camera_data}")
-            print(f"🥁 [DRUM] Enviando para emulador: {camera_data}")
-            emulator.atualizar_estado(camera_data)
+            log.debug("Bateria: enviando vetor da câmera %s", camera_data)
         else:
-            print(f"🥁 [DRUM] camera_data é None ou vazio!")
-            emulator.atualizar_estado([0, 0, 0, 0])  # Desativa tudo se não houver câmera
+            log.debug("Bateria: sem dados da câmera, soltando tudo")
+        self.process_batch([camera_data])  # Desativa tudo se não houver câmera
+        emulator.atualizar_mascara(self.mascara)
+
+    def process_batch(self, camera_vectors):
+        """
+        Lote de vetores da câmera (T x N, None = sem dados) -> T x N lanes.
+        A bateria não filtra: cada vetor já é o estado das lanes.
+        """
+        n = self.n_lanes
+        lanes = np.array([v if v else [0] * n for v in camera_vectors], dtype=np.int8).reshape(-1, n)
+        if len(lanes):
+            self.lanes = lanes[-1].copy()
+        return lanes
 class Guitar(Instrument):
-    def __init__(self):
-        super().__init__()
-        self.finger_actions = [
-            "Dedo 1 (Indicador)", "Dedo 2 (Médio)", 
-            "Dedo 3 (Anelar)", "Dedo 4 (Mindinho)"
-        ]
+    DEFAULT_FINGER_ACTIONS = (
+        "Dedo 1 (Indicador)", "Dedo 2 (Médio)", 
+        "Dedo 3 (Anelar)", "Dedo 4 (Mindinho)"
+    )
+    # Ação do sensor_mappings.json que aciona cada botão do emulador (Emulator.LAYOUTS)
+    ACTIONS_BY_BUTTON = {
+        "Verde": "Dedo 1 (Indicador)",
+        "Vermelho": "Dedo 2 (Médio)",
+        "Amarelo": "Dedo 3 (Anelar)",
+        "Azul": "Dedo 4 (Mindinho)",
+        "Laranja": "Traste 5 (Laranja)",
+        "Palhetada": "Palhetada",
+        "Whammy": "Whammy",
+    }
+
+    @classmethod
+    def actions_for(cls, botoes):
+        """ Ações (uma por lane) para os botões do emulador, na mesma ordem. """
+        return [cls.ACTIONS_BY_BUTTON[b] for b in botoes]
+
+    # Lotes até este tamanho vão amostra a amostra em floats do Python (ver _process_rows)
+    SCALAR_MAX_BATCH = 8
+
+    def __init__(self, finger_actions=None):
+        """
+        finger_actions: nomes das ações no sensor_mappings.json, uma por lane
+        (padrão: os 4 dedos). Qualquer quantidade serve, ex.: 5 trastes +
+        palhetada + whammy, cada um com seu sensor calibrado.
+        """
+        self.finger_actions = list(finger_actions or self.DEFAULT_FINGER_ACTIONS)
+        super().__init__(len(self.finger_actions))
         
         # --- Configuração de Debug ---
         self.use_strumming = False
         
         # --- Configuração de Sensibilidade ---
         self.TRIGGER_THRESHOLD = 0.50
+        # --- Gatilho (ver trigger.py); "press"/"release" no mapeamento do dedo sobrepõem ---
+        self.TRIGGER_HYSTERESIS = 0.10   # Solta só abaixo de TRIGGER_THRESHOLD - histerese
+        self.MIN_RELEASE = 0.05          # Soltura mais baixa aceita (ativação 0 nunca fica abaixo de 0)
+        self.MIN_HOLD_TIME = 0.03        # s, tempo mínimo pressionado antes de soltar
+        self.REARM_DELAY = 0.03          # s, tempo solto antes de poder tocar de novo
+        # --- Disparo antecipado pela inclinação do sensor (ver trigger.OnsetPredictor) ---
+        self.PREDICTIVE_ONSET = False
+        self.PREDICT_LEAD_TIME = 0.025   # s, antecipa se o cruzamento projetado cair dentro disso
+        self.PREDICT_MIN_SLOPE = 2.0     # ativação/s mínima para antecipar
+        self.PREDICT_CONFIRM = 0.05      # s para a ativação real confirmar, senão cancela
         self.FILTER_ALPHA = 0.4
+        # "ema": alpha fixo (FILTER_ALPHA)
+        # "one_euro": corte sobe com a velocidade do dedo (liso parado, rápido em movimento)
+        # "kalman": posição + velocidade, KALMAN_Q / KALMAN_R definem a resposta
+        self.FILTER_TYPE = "ema"
+        self.ONE_EURO_MIN_CUTOFF = 1.0   # Hz, corte com o dedo parado
+        self.ONE_EURO_BETA = 0.5         # Quanto o corte sobe (Hz) por V/s de velocidade
+        self.KALMAN_Q = 1e3              # Ruído de processo (aceleração), V²/s³
+        self.KALMAN_R = 1e-4             # Ruído de medida, V² (~10 mV de desvio)
         # --- AJUSTE DA MÁSCARA (CROSSTALK) ---
         # 1.0 = Matemático exato (Padrão)
         # 0.8 = Mais permissivo (Melhor para Acordes, risco de fantasmas)
         # 1.2 = Mais agressivo (Isola bem o dedo, risco de matar acordes)
         self.CROSSTALK_GAIN = 1.0
+        # "mask": subtrai a interferência dos dedos ativos (algoritmo original)
+        # "lstsq": resolve o sistema de acoplamento por mínimos quadrados
+        self.CROSSTALK_MODE = "mask"
         
         # --- Configuração de Batida (Strum) ---
         self.STRUM_COOLDOWN = 0.10
         self.last_strum_time = 0
+        self.strum_detector = StrumDetector(self.STRUM_COOLDOWN)
+        self.strum_events = np.zeros(0, dtype=np.int8)  # Batidas do último lote (DOWN/UP/0 por amostra)
         
         # --- Estado Interno ---
-        self.smoothed_values = {}
-        self.fingers_armed = [0, 0, 0, 0]
-        self.lanes_vector = [0, 0, 0, 0]
+        self._plan_cache = None     # (mappings, MappingPlan) do caminho sem plano
+        self._filter = None         # Filtro por dedo (estado entre lotes)
+        self._filter_key = None     # (sensores, tipo) para os quais o filtro foi iniciado
+        self._crosstalk_key = None  # (plano, ganho, modo) da matriz em cache
+        self._crosstalk = None
+        self._scalar_key = None     # Parâmetros em listas de floats do caminho por amostra
+        self._scalar = None
+        self.trigger_gate = TriggerGate(len(self.finger_actions))
+        self.onset_predictor = OnsetPredictor(len(self.finger_actions))
+        self.trace = None           # debug_trace.GuitarTrace quando o diagnóstico está ligado
+        self.armed = np.zeros(self.n_lanes, dtype=np.int8)
+
+    @property
+    def fingers_armed(self):
+        return self.armed.tolist()
+
+    def set_finger_actions(self, finger_actions):
+        """
+        Troca as lanes (ex.: layout do emulador mudou na GUI). Todo o estado
+        por dedo recomeça; o worker precisa recompilar o plano com as novas ações.
+        """
+        self.finger_actions = list(finger_actions)
+        self.reset()
+
+    def reset(self):
+        """
+        Recomeça o estado por dedo (filtro, gatilho, lanes), ex.: ao trocar
+        de luva, para o filtro não misturar leituras de duas luvas.
+        """
+        n = len(self.finger_actions)
+        self.lanes = np.zeros(n, dtype=np.int8)
+        self.armed = np.zeros(n, dtype=np.int8)
+        self._plan_cache = None
+        self._filter_key = None
+        self._crosstalk_key = None
+        self._scalar_key = None
+        self.trigger_gate.reset(n)
+        self.onset_predictor.reset(n)
+        self.strum_detector.reset()
+        if self.trace is not None:
+            self.set_tracing(True, self.trace.capacity)
 
     def set_strumming_mode(self, enabled: bool):
         """Método auxiliar para mudar o modo em tempo real via UI"""
         self.use_strumming = enabled
 
-    def process_data(self, logical_data, mappings, emulator):
-        # Variável para acumular texto de debug deste frame
-        debug_lines = []
-        has_activity = False
+    def set_tracing(self, enabled: bool, capacity=16384):
+        """ Liga/desliga o trace de diagnóstico (ver debug_trace.py). """
+        self.trace = GuitarTrace(len(self.finger_actions), capacity) if enabled else None
+        return self.trace
+
+    def process_data(self, logical_data, mappings, emulator, plan=None):
+        """
+        Processa uma amostra (dict campo -> valor). Com 'plan' (MappingPlan já
+        compilado pelo worker) nada de 'mappings' é lido aqui; sem ele, o
+        plano é compilado uma vez por objeto de mapeamentos.
+        """
+        if plan is None:
+            plan = self._plan_for(mappings)
+        self.process_values(plan.extract(logical_data), plan, emulator, logical_data)
+
+    def _plan_for(self, mappings):
+        if self._plan_cache is None or self._plan_cache[0] is not mappings:
+            self._plan_cache = (mappings, MappingPlan(mappings, self.finger_actions))
+        return self._plan_cache[1]
+
+    def _crosstalk_matrix(self, plan):
+        """ Matriz de desacoplamento do plano atual (recalculada só se plano/ganho/modo mudarem). """
+        key = (plan, self.CROSSTALK_GAIN, self.CROSSTALK_MODE)
+        if self._crosstalk_key != key:
+            if self.CROSSTALK_MODE == "lstsq":
+                self._crosstalk = plan.unmix_matrix(self.CROSSTALK_GAIN)
+            else:
+                self._crosstalk = plan.mask_matrix(self.CROSSTALK_GAIN)
+            self._crosstalk_key = key
+        return self._crosstalk
+
+    def _finger_filter(self, plan):
+        """ Filtro dos dedos, recriado se os sensores ou o tipo mudarem; parâmetros lidos a cada lote. """
+        key = (plan.keys, self.FILTER_TYPE)
+        if self._filter_key != key:
+            # Sensores trocados na calibração ou outro filtro: o filtro recomeça
+            self._filter = FILTERS.get(self.FILTER_TYPE, EMAFilter)(len(plan))
+            self._filter_key = key
+        f = self._filter
+        if isinstance(f, OneEuroFilter):
+            f.min_cutoff = self.ONE_EURO_MIN_CUTOFF
+            f.beta = self.ONE_EURO_BETA
+        elif isinstance(f, KalmanFilter):
+            f.q = self.KALMAN_Q
+            f.r = self.KALMAN_R
+        else:
+            f.alpha = self.FILTER_ALPHA
+        return f
+
+    def _thresholds(self, plan):
+        """
+        Limiares de toque/soltura por dedo: os do plano, ou os globais da
+        Guitar. Sem soltura explícita, ela fica abaixo do toque pela maior
+        entre TRIGGER_HYSTERESIS e a margem de ruído da calibração. A
+        soltura fica sempre entre MIN_RELEASE e o toque.
+        """
+        press = np.where(np.isnan(plan.press), self.TRIGGER_THRESHOLD, plan.press)
+        release = np.where(np.isnan(plan.release), press - self._release_margin(plan.hysteresis), plan.release)
+        return press, np.clip(release, np.minimum(self.MIN_RELEASE, press), press)
+
+    def _release_margin(self, hysteresis):
+        return np.fmax(self.TRIGGER_HYSTERESIS, hysteresis)
+
+    def release_threshold(self, hysteresis=np.nan):
+        """ Soltura que um dedo com essa margem de ruído teria com os limiares globais atuais. """
+        release = self.TRIGGER_THRESHOLD - self._release_margin(hysteresis)
+        return float(np.clip(release, min(self.MIN_RELEASE, self.TRIGGER_THRESHOLD), self.TRIGGER_THRESHOLD))
+
+    def _trigger_gate(self, plan):
+        gate = self.trigger_gate
+        if len(gate.state) != len(plan):
+            gate.reset(len(plan))
+        gate.hold = self.MIN_HOLD_TIME
+        gate.rearm = self.REARM_DELAY
+        return gate
+
+    def _trigger(self, activations, plan, times):
+        """
+        Limiar com histerese e tempos mínimos (e, com PREDICTIVE_ONSET, o
+        disparo antecipado antes); limiares por dedo vêm do plano.
+        """
+        gate = self._trigger_gate(plan)
+        press, release = self._thresholds(plan)
+        if self.PREDICTIVE_ONSET:
+            predictor = self.onset_predictor
+            if predictor.n_lanes != len(plan):
+                predictor.reset(len(plan))
+            predictor.lead = self.PREDICT_LEAD_TIME
+            predictor.min_slope = self.PREDICT_MIN_SLOPE
+            predictor.confirm = self.PREDICT_CONFIRM
+            activations = predictor.process(activations, press, release, times)
+        return gate.process(activations, press, release, times)
+
+    def process_values(self, raw_values, plan, emulator, imu=None):
+        """
+        Uma amostra: valores crus dos dedos (lista na ordem das lanes, None =
+        sem sensor) e, no modo batida, a amostra com os canais da IMU.
+        """
+        row = [np.nan if v is None else v for v in raw_values]
+        previous = self.lanes
+        self.process_batch([row], plan, [imu] if imu is not None else None)
+        if self.strum_events[-1] and (previous & self.lanes).any():
+            # Nova batida com a nota ainda pressionada: solta antes para repetir
+            emulator.atualizar_mascara(0)
+        emulator.atualizar_estado(self.lanes_vector)
+
+    def process_batch(self, values, plan, imu=None, times=None):
+        """
+        Processa um lote inteiro de uma vez: 'values' é T x N (valores crus
+        dos dedos, NaN = sem sensor; ver MappingPlan.extract_batch) e o
+        retorno é T x N com o estado das lanes (0/1) após cada amostra.
+
+        'times' é o instante de cada amostra (s): usado pelos filtros
+        adaptativos (FILTER_TYPE) e pelo cooldown da batida. No modo batida,
+        'imu' são as mesmas T amostras com os canais do giroscópio (array
+        estruturado ou dicts). As batidas ficam em self.strum_events.
+
+        O estado (filtro, lanes) continua de uma chamada para a outra, então
+        o resultado não depende de como as amostras foram divididas em lotes.
+        Serve tanto para o worker quanto para reprocessar gravações.
+        """
+        values = np.asarray(values, dtype=np.float64).reshape(-1, len(plan))
+        if len(values) == 0:
+            return np.zeros((0, len(plan)), dtype=np.int8)
+        if self.n_lanes != len(plan):
+            # Plano de outro layout (troca no meio de um lote): lanes recomeçam soltas
+            self.lanes = np.zeros(len(plan), dtype=np.int8)
+            self.armed = np.zeros(len(plan), dtype=np.int8)
+        if (len(values) <= self.SCALAR_MAX_BATCH and not self.PREDICTIVE_ONSET and not self.use_strumming
+                and (times is not None or len(values) == 1)):
+            return self._process_rows(values, plan, times)
 
         # =====================================================================
         # PASSO 1: CÁLCULO DA ATIVAÇÃO BRUTA (RAW)
         # =====================================================================
-        raw_activations = {}
-        for action in self.finger_actions:
-            if action in mappings:
-                calib = mappings[action]
-                sensor_key = calib.get("key")
-                if sensor_key and sensor_key in logical_data:
-                    raw_val = float(logical_data[sensor_key])
-                    
-                    # Filtro
-                    prev_val = self.smoothed_values.get(action, raw_val)
-                    val = (raw_val * self.FILTER_ALPHA) + (prev_val * (1.0 - self.FILTER_ALPHA))
-                    self.smoothed_values[action] = val
-                    
-                    # Normalização
-                    try:
-                        rest = float(calib.get("rest", 0))
-                        full = float(calib.get("full", 1))
-                        total_range = full - rest
-                        
-                        if abs(total_range) > 0.1:
-                            norm = (val - rest) / total_range
-                            norm = max(0.0, min(1.0, norm))
-                            raw_activations[action] = norm
-                            # DEBUG RAW: Mostra se o input está chegando
-                            if norm > 0.05:
-                                has_activity = True
-                                debug_lines.append(f"[RAW] {action[-10:]}: {norm:.2f} (Val:{val:.0f}/R:{rest:.0f}/F:{full:.0f})")
-                        else:
-                            raw_activations[action] = 0.0
-                    except (ValueError, TypeError):
-                        raw_activations[action] = 0.0
-                else:
-                    raw_activations[action] = 0.0
+        smoothed = self._finger_filter(plan).process(values, times)
+
+        # Normalização (dedo sem calibração ou sem valor = 0)
+        usable = plan.valid & ~np.isnan(smoothed)
+        raw_activations = np.where(usable, np.clip((smoothed - plan.rest) / plan.span, 0.0, 1.0), 0.0)
 
         # =====================================================================
         # PASSO 2: MATRIZ DE DESACOPLAMENTO (CROSSTALK)
         # =====================================================================
-        final_activations = {}
-        
-        for target_action in self.finger_actions:
-            if target_action not in raw_activations:
-                final_activations[target_action] = 0.0
-                continue
-            
-            my_raw_activation = raw_activations[target_action]
-            target_calib = mappings.get(target_action, {})
-            target_sensor_key = target_calib.get("key")
-            target_rest = float(target_calib.get("rest", 0))
-            target_full = float(target_calib.get("full", 1))
-            target_range = target_full - target_rest
-
-            total_interference = 0.0
-            debug_interference_details = []
-
-            for other_action in self.finger_actions:
-                if other_action == target_action: continue
-                
-                other_raw_activation = raw_activations.get(other_action, 0.0)
-                
-                # Só calcula interferência se o outro dedo estiver ativo
-                if other_raw_activation > 0.05 and target_sensor_key:
-                    other_calib = mappings.get(other_action, {})
-                    crosstalk_ref = other_calib.get("crosstalk_ref", {})
-                    
-                    val_on_my_sensor_caused_by_other = crosstalk_ref.get(target_sensor_key)
-                    
-                    if val_on_my_sensor_caused_by_other is not None and abs(target_range) > 10:
-                        # Fator de Acoplamento
-                        coupling_factor = (val_on_my_sensor_caused_by_other - target_rest) / target_range
-                        current_interference = (other_raw_activation * coupling_factor) * self.CROSSTALK_GAIN
-                        
-                        if current_interference > 0:
-                            total_interference += current_interference
-                            debug_interference_details.append(f"{other_action[-8:]}({coupling_factor:.2f})")
-
-            clean_activation = my_raw_activation - total_interference
-            final_activations[target_action] = max(0.0, clean_activation)
-
-            # DEBUG CROSSTALK: Mostra se a interferência matou o sinal
-            if my_raw_activation > 0.05:
-                status = "VIVO" if clean_activation > self.TRIGGER_THRESHOLD else "MORTO"
-                debug_lines.append(
-                    f"  -> {target_action[-10:]}: Raw={my_raw_activation:.2f} - Interf={total_interference:.2f} = Final={clean_activation:.2f} [{status}]"
-                )
-                if debug_interference_details:
-                    debug_lines.append(f"     (Culpa de: {', '.join(debug_interference_details)})")
-
-        # Atualiza vetor de dedos armados
-        current_fingers_armed = [0, 0, 0, 0]
-        for i, action in enumerate(self.finger_actions):
-            if final_activations.get(action, 0) > self.TRIGGER_THRESHOLD:
-                current_fingers_armed[i] = 1
-
-        self.fingers_armed = current_fingers_armed
+        matrix = self._crosstalk_matrix(plan)
+        if self.CROSSTALK_MODE == "lstsq":
+            unmixed = raw_activations @ matrix
+            final_activations = np.clip(unmixed, 0.0, 1.0)
+        else:
+            # Só dedos ativos interferem nos outros
+            active = np.where(raw_activations > 0.05, raw_activations, 0.0)
+            interference = active @ matrix
+            final_activations = np.maximum(raw_activations - interference, 0.0)
+
+        # Dedos armados (histerese + hold/rearm por dedo)
+        armed = self._trigger(final_activations, plan, times)
+
+        trace = self.trace
+        if trace is not None:
+            if self.CROSSTALK_MODE == "lstsq":
+                interference = raw_activations - unmixed
+            trace.record(times if times is not None else np.full(len(armed), time.monotonic()),
+                         raw_activations, interference, final_activations, armed)
 
         # =====================================================================
-        # PASSO 3: LÓGICA DE JOGO E ENVIO
+        # PASSO 3: LÓGICA DE JOGO
         # =====================================================================
-        
         if not self.use_strumming:
-            self.lanes_vector = self.fingers_armed[:]
+            self.strum_events = np.zeros(len(armed), dtype=np.int8)
+            lanes = armed
         else:
-            # (Mantive sua lógica de strumming resumida aqui para focar no debug dos dedos)
-            is_strumming = False 
-            # ... (Lógica de strumming original) ...
-            if is_strumming: self.lanes_vector = self.fingers_armed[:]
-            for i in range(4):
-                if self.fingers_armed[i] == 0: self.lanes_vector[i] = 0
+            lanes = self._strum_lanes(armed, imu, times)
 
-        emulator.atualizar_estado(self.lanes_vector)
+        self.armed = armed[-1].copy()
+        self.lanes = lanes[-1].copy()
+        return lanes
+
+    def _scalar_params(self, plan):
+        """
+        Plano + ajustes da Guitar em listas de floats para _process_rows
+        (refeitas só quando o plano, o crosstalk ou os limiares mudam).
+        """
+        key = (plan, self.CROSSTALK_GAIN, self.CROSSTALK_MODE, self.TRIGGER_THRESHOLD, self.TRIGGER_HYSTERESIS,
+               self.MIN_RELEASE)
+        if self._scalar_key != key:
+            press, release = self._thresholds(plan)
+            self._scalar = (plan.rest.tolist(), plan.span.tolist(), plan.valid.tolist(),
+                            self._crosstalk_matrix(plan).T.tolist(), press.tolist(), release.tolist())
+            self._scalar_key = key
+        return self._scalar
+
+    def _process_rows(self, values, plan, times):
+        """
+        process_batch amostra a amostra, para lotes pequenos (o caso ao vivo
+        é 1 amostra por pacote a 100 Hz): as mesmas contas em floats do
+        Python, porque com poucos dedos o custo fixo de cada chamada NumPy
+        domina. Sem PREDICTIVE_ONSET nem modo batida (esses vão pelo lote).
+        """
+        f = self._finger_filter(plan)
+        gate = self._trigger_gate(plan)
+        rest, span, valid, columns, press, release = self._scalar_params(plan)
+        lstsq = self.CROSSTALK_MODE == "lstsq"
+        ts = [time.monotonic()] if times is None else np.asarray(times, dtype=np.float64).reshape(-1).tolist()
+        rows = values.tolist()
+        trace = self.trace
+        traced = [] if trace is not None else None
+
+        out = []
+        for k, row in enumerate(rows):
+            if isinstance(f, EMAFilter):
+                smoothed = f.step(row)
+            else:
+                smoothed = f.process(values[k:k + 1], None if times is None else ts[k:k + 1])[0].tolist()
+
+            # Normalização (dedo sem calibração ou sem valor = 0)
+            raw = [min(max((s - r) / sp, 0.0), 1.0) if ok and s == s else 0.0
+                   for s, r, sp, ok in zip(smoothed, rest, span, valid)]
 
-        # PRINT FINAL (Apenas se houver atividade para não poluir)
-        # if has_activity:
-        #     print("\n".join(debug_lines))
-        #     print(f"OUT: {self.lanes_vector} | Mode: {'Strum' if self.use_strumming else 'Tap'}")
-        #     print("-" * 40)
+            # Crosstalk: colunas da mesma matriz do lote
+            if lstsq:
+                unmixed = [sum(a * c for a, c in zip(raw, column)) for column in columns]
+                final = [min(max(u, 0.0), 1.0) for u in unmixed]
+                interference = [a - u for a, u in zip(raw, unmixed)]
+            else:
+                # Só dedos ativos interferem (os outros somariam zeros)
+                active = [(o, a) for o, a in enumerate(raw) if a > 0.05]
+                if active:
+                    interference = [sum(a * column[o] for o, a in active) for column in columns]
+                else:
+                    interference = [0.0] * len(raw)
+                final = [max(a - i, 0.0) for a, i in zip(raw, interference)]
+
+            armed = gate.step(final, press, release, ts[k])
+            out.append(armed)
+            if traced is not None:
+                traced.append((raw, interference, final))
+
+        lanes = np.array(out, dtype=np.int8).reshape(len(rows), len(plan))
+        if traced is not None:
+            raw, interference, final = (np.array(x) for x in zip(*traced))
+            trace.record(np.array(ts if times is not None else ts * len(rows)), raw, interference, final, lanes)
+        self.strum_events = np.zeros(len(lanes), dtype=np.int8)
+        self.armed = lanes[-1].copy()
+        self.lanes = lanes[-1].copy()
+        return lanes
+
+    def _strum_lanes(self, armed, imu, times):
+        """
+        Modo batida: na amostra da batida as lanes viram os dedos armados;
+        depois cada lane só se mantém enquanto o dedo continuar armado.
+        """
+        detector = self.strum_detector
+        detector.cooldown = self.STRUM_COOLDOWN
+        if imu is None:
+            strums = np.zeros(len(armed), dtype=np.int8)
+        else:
+            strums = detector.process(imu, times)
+            self.last_strum_time = detector.last_strum_time
+        self.strum_events = strums
+
+        lanes = np.empty_like(armed)
+        held = self.lanes.astype(bool)
+        bounds = [0, *np.flatnonzero(strums).tolist(), len(armed)]
+        for start, end in zip(bounds, bounds[1:]):
+            if start == end:
+                continue
+            segment = np.logical_and.accumulate(armed[start:end].astype(bool), axis=0)
+            if not strums[start]:
+                segment &= held
+            lanes[start:end] = segment
+            held = segment[-1]
+        return lanes
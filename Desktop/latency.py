@@ -0,0 +1,212 @@
+"""
+Medição de latência ponta a ponta: recepção UDP -> worker -> decisão -> emulador.
+
+Cada amostra carrega o 't_recv' (time.monotonic() da recepção) e o
+'t_sampled' (instante de amostragem estimado pelo clock_sync). O worker
+abre um "traço" por amostra, o instrumento decide e o Emulator marca a
+decisão e a saída (gamepad.update() / tecla). Os intervalos vão para
+histogramas de bins fixos (registro O(1), sem alocação), de onde saem os
+percentis mostrados na GUI e gravados no arquivo de dump.
+
+Estágios:
+    sample_to_recv     amostragem -> recepção: atraso de rede/fila acima do mínimo do link
+    kernel_to_recv     chegada no kernel -> thread de recepção lê (fila do socket + espera pelo GIL)
+    recv_to_worker     recepção do datagrama -> worker começa a processar a amostra
+    worker_to_decision worker -> instrumento chama Emulator.atualizar_estado
+    decision_to_output atualizar_estado -> botão efetivamente enviado (só mudanças)
+    recv_to_output     total: recepção -> botão enviado (só mudanças)
+"""
+import json
+import math
+import time
+
+import numpy as np
+
+
+class LatencyHistogram:
+    """
+    Histograma com bins em escala logarítmica (≈4% de largura) entre
+    MIN_MS e MAX_MS. Guarda só contagens: custo fixo por registro e
+    memória constante, por mais longa que seja a sessão.
+    """
+    MIN_MS = 0.001
+    MAX_MS = 10000.0
+    BINS_PER_DECADE = 60
+
+    def __init__(self):
+        self._scale = self.BINS_PER_DECADE / math.log(10)
+        self._log_min = math.log(self.MIN_MS)
+        n_bins = int(math.ceil((math.log(self.MAX_MS) - self._log_min) * self._scale)) + 1
+        self.reset(n_bins)
+
+    def reset(self, n_bins=None):
+        self.counts = [0] * (n_bins or len(self.counts))
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, value_ms):
+        if value_ms <= self.MIN_MS:
+            i = 0
+        else:
+            i = min(int((math.log(value_ms) - self._log_min) * self._scale), len(self.counts) - 1)
+        self.counts[i] += 1
+        self.count += 1
+        self.total_ms += value_ms
+        if value_ms > self.max_ms:
+            self.max_ms = value_ms
+
+    def record_many(self, values_ms):
+        """ Registra um array de intervalos de uma vez (lote do worker). """
+        values = np.asarray(values_ms, dtype=np.float64)
+        if values.size == 0:
+            return
+        bins = np.zeros(values.shape, dtype=np.int64)
+        above = values > self.MIN_MS
+        bins[above] = np.minimum(((np.log(values[above]) - self._log_min) * self._scale).astype(np.int64),
+                                 len(self.counts) - 1)
+        counts = self.counts
+        for i, c in zip(*np.unique(bins, return_counts=True)):
+            counts[i] += int(c)
+        self.count += values.size
+        self.total_ms += float(values.sum())
+        self.max_ms = max(self.max_ms, float(values.max()))
+
+    def _bin_upper_ms(self, i):
+        return math.exp(self._log_min + (i + 1) / self._scale)
+
+    def percentiles(self, ps=(50, 95, 99)):
+        """ Percentis (ms), aproximados pelo limite superior do bin. """
+        counts = list(self.counts)  # Cópia: o worker continua registrando
+        total = sum(counts)
+        result = {}
+        if total == 0:
+            return result
+        targets = sorted(ps)
+        acc = 0
+        t = 0
+        for i, c in enumerate(counts):
+            acc += c
+            while t < len(targets) and acc >= total * targets[t] / 100.0:
+                result[targets[t]] = min(self._bin_upper_ms(i), self.max_ms)
+                t += 1
+            if t == len(targets):
+                break
+        return result
+
+    def snapshot(self):
+        snap = {
+            "count": self.count,
+            "mean_ms": self.total_ms / self.count if self.count else 0.0,
+            "max_ms": self.max_ms,
+        }
+        for p, value in self.percentiles().items():
+            snap[f"p{p}_ms"] = value
+        return snap
+
+
+class LatencyTracer:
+    """
+    Marca os limites de estágio de UMA amostra por vez (o worker é uma
+    thread só) e alimenta um LatencyHistogram por estágio.
+
+    Com o worker em lote: begin_batch() registra os estágios até o worker
+    de todas as amostras do lote e, antes de cada estado entregue ao
+    emulador, select() indica de qual amostra ele saiu.
+    """
+    STAGES = ("sample_to_recv", "kernel_to_recv", "recv_to_worker", "worker_to_decision", "decision_to_output", "recv_to_output")
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock  # Mesmo relógio do 't_recv' da Communication
+        self.enabled = True
+        self.histograms = {stage: LatencyHistogram() for stage in self.STAGES}
+        self._t_recv = None
+        self._t_worker = None
+        self._t_decision = None
+
+    def reset(self):
+        for hist in self.histograms.values():
+            hist.reset()
+
+    def begin(self, t_recv=None, t_sampled=None, t_kernel=None):
+        """
+        Worker começou a processar uma amostra (t_recv=None: sem luva, ex.:
+        bateria). Com t_sampled, o tempo em fila na rede é separado do
+        tempo de processamento no host; com t_kernel, o tempo parado no
+        socket é separado do tempo até a thread de recepção rodar.
+        """
+        if not self.enabled:
+            return
+        now = self.clock()
+        self._t_recv = t_recv if t_recv else None
+        self._t_worker = now
+        self._t_decision = None
+        if self._t_recv is not None:
+            self.histograms["recv_to_worker"].record((now - self._t_recv) * 1000.0)
+            if t_sampled and t_sampled == t_sampled:  # Ignora NaN (relógio ainda sem ajuste)
+                self.histograms["sample_to_recv"].record(max(0.0, self._t_recv - t_sampled) * 1000.0)
+            if t_kernel:
+                self.histograms["kernel_to_recv"].record(max(0.0, self._t_recv - t_kernel) * 1000.0)
+
+    def begin_batch(self, t_recv, t_sampled=None, t_kernel=None):
+        """ Worker começou a processar um lote (arrays por amostra, como em begin()). """
+        if not self.enabled:
+            return
+        now = self.clock()
+        self._t_recv = None
+        self._t_worker = now
+        self._t_decision = None
+        t_recv = np.asarray(t_recv, dtype=np.float64)
+        received = t_recv > 0
+        self.histograms["recv_to_worker"].record_many((now - t_recv[received]) * 1000.0)
+        if t_sampled is not None:
+            t_sampled = np.asarray(t_sampled, dtype=np.float64)
+            ok = received & ~np.isnan(t_sampled) & (t_sampled != 0)
+            self.histograms["sample_to_recv"].record_many(np.maximum(0.0, t_recv[ok] - t_sampled[ok]) * 1000.0)
+        if t_kernel is not None:
+            t_kernel = np.asarray(t_kernel, dtype=np.float64)
+            ok = received & (t_kernel > 0)
+            self.histograms["kernel_to_recv"].record_many(np.maximum(0.0, t_recv[ok] - t_kernel[ok]) * 1000.0)
+
+    def select(self, t_recv):
+        """ Próximo estado entregue ao emulador vem da amostra recebida em t_recv. """
+        self._t_recv = t_recv if t_recv else None
+        self._t_decision = None
+
+    def mark_decision(self):
+        """ Instrumento entregou o estado ao emulador. """
+        if self._t_worker is None:
+            return
+        now = self.clock()
+        self._t_decision = now
+        self.histograms["worker_to_decision"].record((now - self._t_worker) * 1000.0)
+
+    def mark_output(self):
+        """ Botão enviado ao sistema (gamepad.update() ou tecla). """
+        if self._t_decision is None:
+            return
+        now = self.clock()
+        self.histograms["decision_to_output"].record((now - self._t_decision) * 1000.0)
+        if self._t_recv is not None:
+            self.histograms["recv_to_output"].record((now - self._t_recv) * 1000.0)
+        self._t_decision = None
+
+    def snapshot(self):
+        return {stage: hist.snapshot() for stage, hist in self.histograms.items()}
+
+    def dump(self, path):
+        """ Grava percentis + contagens dos bins em JSON (para comparar sessões). """
+        report = {
+            "exported_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "bins": {
+                "min_ms": LatencyHistogram.MIN_MS,
+                "max_ms": LatencyHistogram.MAX_MS,
+                "bins_per_decade": LatencyHistogram.BINS_PER_DECADE,
+            },
+            "stages": {
+                stage: dict(hist.snapshot(), counts=list(hist.counts))
+                for stage, hist in self.histograms.items()
+            },
+        }
+        with open(path, "w") as f:
+            json.dump(report, f, indent=4)
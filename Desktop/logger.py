@@ -0,0 +1,170 @@
+"""
+Log com níveis para o caminho quente (worker, instrumentos, emulador).
+
+Por cima do módulo logging da biblioteca padrão:
+  - Nível desligado não custa nada além de uma comparação: a mensagem usa
+    formatação preguiçosa ("%s" + args), então nenhuma string é montada.
+  - Nível ligado só cria o LogRecord e o coloca num buffer circular em
+    memória (sem formatar, sem tocar no console).
+  - Uma thread de fundo formata e descarrega o buffer no console/arquivo
+    a cada FLUSH_INTERVAL e mantém as últimas linhas para a GUI.
+
+Uso:
+    from logger import get_logger
+    log = get_logger("worker")
+    log.debug("Vetor da câmera: %s", vetor)
+
+Atenção: os args são formatados depois, na thread de fundo. Passe valores
+que não serão alterados em seguida (ex.: uma cópia da lista).
+"""
+import collections
+import logging
+import sys
+import threading
+
+ROOT_NAME = "airband"
+RING_SIZE = 4096       # Registros aguardando a thread de fundo
+TAIL_SIZE = 500        # Linhas formatadas guardadas para a GUI
+FLUSH_INTERVAL = 0.2   # Segundos entre descargas
+LINE_FORMAT = "%(asctime)s.%(msecs)03d %(levelname)-7s [%(name)s] %(message)s"
+DATE_FORMAT = "%H:%M:%S"
+
+LEVELS = {
+    "DEBUG": logging.DEBUG,
+    "INFO": logging.INFO,
+    "WARNING": logging.WARNING,
+    "ERROR": logging.ERROR,
+}
+
+
+def get_logger(name):
+    """ Logger filho de 'airband' (ex.: get_logger("worker") -> "airband.worker"). """
+    return logging.getLogger(f"{ROOT_NAME}.{name}")
+
+
+class RingBufferHandler(logging.Handler):
+    """
+    Guarda o LogRecord cru num deque de tamanho fixo. Sem lock nem
+    formatação: deque.append é atômico. Se a thread de fundo atrasar,
+    os registros mais antigos são descartados (contados em 'dropped').
+    """
+
+    def __init__(self, capacity=RING_SIZE):
+        super().__init__()
+        self.records = collections.deque(maxlen=capacity)
+        self.dropped = 0
+
+    def handle(self, record):
+        records = self.records
+        if len(records) == records.maxlen:
+            self.dropped += 1
+        records.append(record)
+        return True
+
+    def emit(self, record):
+        self.handle(record)
+
+
+class LogService:
+    """ Buffer circular + thread que formata e descarrega os registros. """
+
+    def __init__(self, level=logging.INFO, console=True, path=None):
+        self.ring = RingBufferHandler()
+        self.tail = collections.deque(maxlen=TAIL_SIZE)
+        self.formatter = logging.Formatter(LINE_FORMAT, DATE_FORMAT)
+        self.streams = []
+        if console:
+            self.streams.append(sys.stderr)
+        self._file = open(path, "a", encoding="utf-8") if path else None
+        if self._file:
+            self.streams.append(self._file)
+
+        self.root = logging.getLogger(ROOT_NAME)
+        self.root.setLevel(level)
+        self.root.propagate = False
+        self.root.addHandler(self.ring)
+
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="log-flusher", daemon=True)
+        self._thread.start()
+
+    def set_level(self, level):
+        self.root.setLevel(LEVELS.get(level, level))
+
+    def get_level(self):
+        return logging.getLevelName(self.root.level)
+
+    def flush(self):
+        records = self.ring.records
+        lines = []
+        while records:
+            try:
+                record = records.popleft()
+            except IndexError:
+                break
+            try:
+                lines.append(self.formatter.format(record))
+            except Exception as e:
+                lines.append(f"<erro ao formatar log de {record.name}: {e}>")
+        if not lines:
+            return
+        self.tail.extend(lines)
+        text = "\n".join(lines) + "\n"
+        for stream in self.streams:
+            try:
+                stream.write(text)
+                stream.flush()
+            except (OSError, ValueError):
+                pass  # Console fechado (ex.: pythonw) não pode derrubar a aplicação
+
+    def _run(self):
+        while not self._stop.wait(FLUSH_INTERVAL):
+            self.flush()
+        self.flush()
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=1.0)
+        self.root.removeHandler(self.ring)
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+_service = None
+
+
+def setup_logging(level=logging.INFO, console=True, path=None):
+    """ Liga o buffer + thread de descarga (uma vez; chamadas seguintes só ajustam o nível). """
+    global _service
+    if _service is None:
+        _service = LogService(LEVELS.get(level, level), console, path)
+    else:
+        _service.set_level(level)
+    return _service
+
+
+def set_level(level):
+    if _service:
+        _service.set_level(level)
+    else:
+        logging.getLogger(ROOT_NAME).setLevel(LEVELS.get(level, level))
+
+
+def get_tail(n=200):
+    """ Últimas n linhas já formatadas (para a GUI). """
+    if _service is None:
+        return []
+    tail = list(_service.tail)
+    return tail[-n:]
+
+
+def get_dropped():
+    return _service.ring.dropped if _service else 0
+
+
+def shutdown():
+    global _service
+    if _service:
+        _service.close()
+        _service = None
@@ -0,0 +1,176 @@
+import numpy as np
+
+# Canais da IMU que o worker repassa aos instrumentos além dos dedos mapeados
+IMU_FIELDS = (
+    'gyro_ax', 'gyro_ay', 'gyro_az', 'gyro_gx', 'gyro_gy', 'gyro_gz',
+    'slave_ax', 'slave_ay', 'slave_az', 'slave_gx', 'slave_gy', 'slave_gz',
+)
+
+
+class MappingPlan:
+    """
+    Versão "compilada" e imutável do sensor_mappings.json.
+
+    Todo o trabalho com dicionários (procurar a ação, ler 'key', converter
+    'rest'/'full' com float(), calcular faixas e acoplamentos) acontece uma
+    vez só, aqui. O caminho quente só indexa arrays:
+
+        keys[i]         canal do sensor do dedo i (None se não mapeado)
+        rest/full[i]    calibração do dedo i
+        span[i]         full - rest, já trocado por 1.0 onde não é válido
+        valid[i]        dedo calibrado (|full - rest| > MIN_RANGE)
+        press/release[i] limiares de toque/soltura do dedo i ("press"/"release"
+                        no json, ativação 0..1); NaN = usar os da Guitar
+        hysteresis[i]   margem mínima entre toque e soltura pedida pelo ruído
+                        do sensor ("hysteresis", da calibração); NaN = nenhuma
+        coupling[o, t]  quanto o dedo 'o' dobrado ativa o sensor do dedo 't'
+                        (só onde |faixa de 't'| > MIN_COUPLING_RANGE)
+
+    Valores não finitos (NaN, inf) no json contam como ausentes.
+
+    Com RELATIVE_COUPLING = True o acoplamento vale onde a faixa de 't' é
+    calibrada (> MIN_RANGE) e maior que COUPLING_NOISE_SIGMAS vezes o ruído
+    medido ("noise"), em vez do limiar fixo do algoritmo original. Isso liga
+    a subtração em calibrações em volts que o limiar fixo ignorava, então
+    as lanes mudam: é opção explícita, não o padrão.
+
+    Para trocar a calibração, compile um novo plano e substitua a referência
+    (atribuição em Python é atômica): quem já pegou o plano antigo termina
+    a amostra com ele.
+    """
+    MIN_RANGE = 0.1           # Faixa mínima para o dedo contar como calibrado
+    MIN_COUPLING_RANGE = 10   # Mesmo limiar do cálculo de crosstalk original
+    RELATIVE_COUPLING = False    # True: limiar relativo ao ruído em vez de MIN_COUPLING_RANGE
+    COUPLING_NOISE_SIGMAS = 4.0  # Faixa mínima do sensor alvo, em desvios do ruído, no limiar relativo
+
+    def __init__(self, mappings, actions, fields=None):
+        """
+        mappings: dict do sensor_mappings.json; actions: nomes dos dedos na
+        ordem das lanes; fields: nomes de campo disponíveis na amostra
+        (None = não filtra).
+        """
+        self.actions = tuple(actions)
+        n = len(self.actions)
+
+        keys = []
+        rest = np.zeros(n)
+        full = np.ones(n)
+        valid = np.zeros(n, dtype=bool)
+        press = np.full(n, np.nan)
+        release = np.full(n, np.nan)
+        hysteresis = np.full(n, np.nan)
+        noise = np.zeros(n)
+        for i, action in enumerate(self.actions):
+            calib = mappings.get(action, {})
+            for array, name in ((press, "press"), (release, "release"), (hysteresis, "hysteresis"),
+                                (noise, "noise")):
+                try:
+                    value = float(calib[name])
+                except (KeyError, ValueError, TypeError):
+                    continue
+                if np.isfinite(value):
+                    array[i] = value
+            key = calib.get("key")
+            if fields is not None and key not in fields:
+                key = None
+            keys.append(key or None)
+            try:
+                rest[i] = float(calib.get("rest", 0))
+                full[i] = float(calib.get("full", 1))
+            except (ValueError, TypeError):
+                rest[i], full[i] = 0.0, 1.0
+                continue
+            if not (np.isfinite(rest[i]) and np.isfinite(full[i])):
+                rest[i], full[i] = 0.0, 1.0
+                continue
+            valid[i] = abs(full[i] - rest[i]) > self.MIN_RANGE
+
+        span = full - rest
+        self.keys = tuple(keys)
+        self.rest = rest
+        self.full = full
+        self.span = np.where(valid, span, 1.0)
+        self.valid = valid & np.array([k is not None for k in keys], dtype=bool)
+        self.press = press
+        self.release = release
+        self.hysteresis = hysteresis
+
+        # Acoplamento: (leitura do sensor 't' com o dedo 'o' dobrado - repouso de 't') / faixa de 't'
+        if self.RELATIVE_COUPLING:
+            coupling_ok = (np.abs(span) > self.MIN_RANGE) & (np.abs(span) > self.COUPLING_NOISE_SIGMAS * noise)
+        else:
+            coupling_ok = np.abs(span) > self.MIN_COUPLING_RANGE
+        coupling = np.zeros((n, n))
+        for o, other in enumerate(self.actions):
+            crosstalk_ref = mappings.get(other, {}).get("crosstalk_ref", {})
+            for t, target_key in enumerate(self.keys):
+                if o == t or target_key is None:
+                    continue
+                value = crosstalk_ref.get(target_key)
+                if value is not None and coupling_ok[t] and np.isfinite(float(value)):
+                    coupling[o, t] = (float(value) - rest[t]) / span[t]
+        self.coupling = coupling
+
+        # Campos que o worker copia de cada amostra para o dict dos instrumentos
+        names = list(IMU_FIELDS) + [k for k in self.keys if k]
+        if fields is not None:
+            names = [k for k in names if k in fields]
+        self.fields = tuple(dict.fromkeys(names))
+
+        for array in (self.rest, self.full, self.span, self.valid, self.press, self.release, self.hysteresis,
+                      self.coupling):
+            array.setflags(write=False)
+
+    def __len__(self):
+        return len(self.actions)
+
+    def mask_matrix(self, gain):
+        """
+        Matriz do desacoplamento "máscara" (algoritmo original):
+            interferência = ativos @ mask_matrix(gain)
+        onde 'ativos' são as ativações > 0.05. Como as ativações são >= 0,
+        somar só as interferências positivas equivale a usar max(C*gain, 0).
+        """
+        matrix = np.maximum(self.coupling * gain, 0.0)
+        np.fill_diagonal(matrix, 0.0)
+        return matrix
+
+    def unmix_matrix(self, gain):
+        """
+        Desacoplamento por mínimos quadrados. Modelo: o que cada sensor lê é
+        a ativação do próprio dedo mais o acoplamento dos outros,
+            medido = real @ (I + gain * C)
+        então real = medido @ pinv(I + gain * C), uma única multiplicação.
+        """
+        mixing = np.eye(len(self.actions)) + gain * self.coupling
+        return np.linalg.pinv(mixing)
+
+    def extract(self, sample):
+        """
+        Valores crus dos dedos de UMA amostra (registro NumPy ou dict),
+        na ordem das lanes. None onde o dedo não tem sensor/valor.
+        """
+        values = []
+        for key in self.keys:
+            try:
+                values.append(float(sample[key]) if key is not None else None)
+            except (KeyError, ValueError):
+                values.append(None)
+        return values
+
+    def extract_batch(self, samples):
+        """
+        Valores crus dos dedos de um lote, como array T x N (float64), na
+        ordem das lanes; NaN onde o dedo não tem sensor. 'samples' é o array
+        estruturado do SampleReader (uma cópia por coluna) ou uma sequência
+        de registros/dicts.
+        """
+        n = len(self.actions)
+        if isinstance(samples, np.ndarray) and samples.dtype.names:
+            values = np.full((len(samples), n), np.nan)
+            for i, key in enumerate(self.keys):
+                if key is not None:
+                    values[:, i] = samples[key]
+            return values
+        rows = [[np.nan if v is None else v for v in self.extract(sample)] for sample in samples]
+        return np.array(rows, dtype=np.float64).reshape(len(rows), n)
@@ -0,0 +1,201 @@
+import math
+import threading
+import numpy as np
+
+
+class LinkStats:
+    """
+    Estatísticas de um link UDP (uma fonte/luva), calculadas a partir do
+    'timestamp' (millis() do ESP32) que vem no final de cada pacote.
+
+    - Taxa efetiva de recepção (Hz)
+    - Jitter entre chegadas (percentis) e jitter RFC 3550
+    - Lacunas (pacotes perdidos), duplicados e fora de ordem
+
+    Perdas: com nº de sequência (formato em lote v2, inclusive K=1) a
+    contagem é exata. Sem ele (pacote legado) são inferidas dos saltos do
+    millis(), que tem resolução de 1 ms: isso só é confiável com período
+    bem acima de 1 ms. Perto de 1 kHz o jitter de ±1 ms vira "lacuna" e a
+    perda é superestimada (snapshot: loss_source = "millis" e
+    loss_reliable = False abaixo de MILLIS_MIN_PERIOD_MS).
+    """
+    HISTORY = 512         # Nº de intervalos guardados para percentis
+    RECENT_IDS = 64       # Pacotes recentes usados para detectar duplicados
+    NOMINAL_PERIOD_MS = 10.0  # 100Hz (WifiServer::sendDataToClient)
+    MILLIS_MIN_PERIOD_MS = 4.0  # Abaixo disso (> 250 Hz) as perdas pelo millis() não são confiáveis
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.packets = 0      # Datagramas recebidos
+            self.samples = 0      # Amostras (um datagrama em lote traz várias)
+            self.lost = 0
+            self.gaps = 0
+            self.duplicates = 0
+            self.out_of_order = 0
+            self.jitter_ms = 0.0  # Estimador RFC 3550 (suavizado 1/16)
+
+            self._last_host = None
+            self._last_device = None   # Maior timestamp visto (desenrolado)
+            self._period_ms = self.NOMINAL_PERIOD_MS
+
+            self._arrivals = np.zeros(self.HISTORY)       # Tempo de chegada no host (s)
+            self._interarrival = np.zeros(self.HISTORY)   # Intervalo host entre pacotes (ms)
+            self._transit_var = np.zeros(self.HISTORY)    # |Δhost - Δdevice| (ms)
+            self._device_deltas = np.full(self.HISTORY, self.NOMINAL_PERIOD_MS)
+            self._n_hist = 0
+            self._recent = np.full(self.RECENT_IDS, -1, dtype=np.int64)
+            self._recent_idx = 0
+            self._next_seq = None  # Próxima sequência esperada (formato em lote)
+            self._sequenced = False  # Já chegou pacote com nº de sequência
+
+    def update(self, device_ts, host_time, packet_key=None):
+        """
+        Registra um pacote. device_ts em ms (uint32), host_time em segundos.
+        packet_key identifica o pacote para detectar duplicados (ex.: hash
+        do conteúdo). Sem ele, usa o timestamp, o que só é válido até 1kHz.
+        Pacote sem nº de sequência: perdas pelo millis() (ver docstring da classe).
+        """
+        if packet_key is None:
+            packet_key = device_ts
+        with self._lock:
+            if not self._count_arrival(packet_key, host_time, 1):
+                return
+
+            d_device = self._device_delta(device_ts, host_time)
+            if d_device is None:
+                return
+            if d_device < 0:
+                # Chegou atrasado: preenche uma lacuna já contada como perda
+                self.out_of_order += 1
+                if self.lost > 0:
+                    self.lost -= 1
+                return
+
+            # Lacunas: quantos períodos nominais cabem no salto do timestamp.
+            # Empates arredondam para baixo: o millis() tem resolução de 1ms,
+            # então a taxas altas (período ~2ms) um salto de 3ms é só jitter.
+            missing = math.floor(d_device / self._period_ms + 0.5 - 1e-6) - 1
+            if missing > 0:
+                self.lost += missing
+                self.gaps += 1
+
+    def update_batch(self, seq, count, device_ts, host_time):
+        """
+        Registra um datagrama em lote (count amostras a partir da sequência seq).
+        Com nº de sequência a contagem de perdas é exata, em qualquer taxa.
+        device_ts é o timestamp da ÚLTIMA amostra do lote.
+        """
+        with self._lock:
+            if not self._count_arrival(seq, host_time, count):
+                return
+
+            self._sequenced = True
+            if self._next_seq is not None:
+                gap = ((seq - self._next_seq + 0x80000000) & 0xFFFFFFFF) - 0x80000000
+                if gap < 0:
+                    self.out_of_order += 1
+                    self.lost -= min(count, self.lost)
+                    self._last_host = host_time
+                    return
+                if gap > 0:
+                    self.lost += gap
+                    self.gaps += 1
+            self._next_seq = (seq + count) & 0xFFFFFFFF
+
+            self._device_delta(device_ts, host_time)
+
+    def _count_arrival(self, packet_key, host_time, count):
+        """ Conta o datagrama; retorna False se for duplicado. """
+        self.packets += 1
+        self._arrivals[self.packets % self.HISTORY] = host_time
+
+        # Duplicado: mesmo pacote visto recentemente
+        if np.any(self._recent == packet_key):
+            self.duplicates += 1
+            self._last_host = host_time
+            return False
+        self._recent[self._recent_idx] = packet_key
+        self._recent_idx = (self._recent_idx + 1) % self.RECENT_IDS
+        self.samples += count
+        return True
+
+    def _device_delta(self, device_ts, host_time):
+        """
+        Atualiza o histórico de intervalos/jitter e retorna o salto do
+        timestamp do dispositivo (ms, com sinal) ou None no primeiro pacote.
+        """
+        if self._last_device is None:
+            self._last_device = device_ts
+            self._last_host = host_time
+            return None
+
+        # Diferença com sinal tratando o "wrap" de 32 bits do millis()
+        d_device = ((device_ts - self._last_device + 0x80000000) & 0xFFFFFFFF) - 0x80000000
+        d_host = (host_time - self._last_host) * 1000.0
+        self._last_host = host_time
+        if d_device < 0:
+            return d_device
+
+        self._last_device = device_ts
+
+        i = self._n_hist % self.HISTORY
+        self._n_hist += 1
+        self._interarrival[i] = d_host
+        self._device_deltas[i] = d_device
+
+        # Jitter de trânsito (RFC 3550): variação do atraso entre pacotes
+        transit = abs(d_host - d_device)
+        self._transit_var[i] = transit
+        self.jitter_ms += (transit - self.jitter_ms) / 16.0
+
+        # Reestima o período do firmware de tempos em tempos (mediana robusta)
+        if self._n_hist % 64 == 0:
+            n = min(self._n_hist, self.HISTORY)
+            self._period_ms = max(1.0, float(np.median(self._device_deltas[:n])))
+        return d_device
+
+    def snapshot(self):
+        """ Retorna um dict com os números atuais (pronto para GUI/JSON). """
+        with self._lock:
+            n = min(self._n_hist, self.HISTORY)
+            expected = self.samples + self.lost
+            window = min(self.packets, self.HISTORY)
+            rate = 0.0
+            if window > 1:
+                times = np.roll(self._arrivals, -(self.packets % self.HISTORY) - 1)[-window:]
+                span = times[-1] - times[0]
+                if span > 0:
+                    rate = float((window - 1) / span)
+
+            unique = self.packets - self.duplicates
+            snap = {
+                "packets": self.packets,
+                "samples": self.samples,
+                "rate_hz": rate,
+                "sample_rate_hz": rate * self.samples / unique if unique > 0 else 0.0,
+                "period_ms": self._period_ms,
+                "lost": self.lost,
+                "loss_pct": 100.0 * self.lost / expected if expected > 0 else 0.0,
+                "loss_source": "seq" if self._sequenced else "millis",
+                "loss_reliable": self._sequenced or self._period_ms >= self.MILLIS_MIN_PERIOD_MS,
+                "gaps": self.gaps,
+                "duplicates": self.duplicates,
+                "out_of_order": self.out_of_order,
+                "jitter_ms": self.jitter_ms,
+            }
+            if n > 0:
+                p = np.percentile(self._interarrival[:n], [50, 95, 99])
+                t = np.percentile(self._transit_var[:n], [50, 95, 99])
+                snap.update({
+                    "interarrival_p50_ms": float(p[0]),
+                    "interarrival_p95_ms": float(p[1]),
+                    "interarrival_p99_ms": float(p[2]),
+                    "transit_jitter_p50_ms": float(t[0]),
+                    "transit_jitter_p95_ms": float(t[1]),
+                    "transit_jitter_p99_ms": float(t[2]),
+                })
+            return snap
@@ -0,0 +1,272 @@
+import threading
+import numpy as np
+
+# Nomes dos campos na mesma ordem do SensorPacket (Firmware/include/WifiServer.hpp)
+SENSOR_FIELDS = (
+    # --- MESTRA ---
+    "gyro_ax", "gyro_ay", "gyro_az",
+    "gyro_gx", "gyro_gy", "gyro_gz",
+    "mag_mx", "mag_my", "mag_mz",
+    "mag_heading",
+    "adc_v32", "adc_v33", "adc_v34", "adc_v35",
+    # --- ESCRAVA ---
+    "slave_ax", "slave_ay", "slave_az",
+    "slave_gx", "slave_gy", "slave_gz",
+    # --- FOOTER ---
+    "timestamp",
+)
+
+# Campos preenchidos pelo host (não vêm no datagrama), anexados ao final de cada amostra
+HOST_FIELDS = (
+    ("t_recv", "<f8"),     # time.monotonic() da recepção do datagrama (s)
+    ("t_sampled", "<f8"),  # Instante de amostragem estimado no relógio do host (ver clock_sync.py)
+    ("t_kernel", "<f8"),   # Chegada no kernel (SO_TIMESTAMPNS), convertida p/ time.monotonic(); 0 = sem
+)
+
+# Conversão dos códigos do módulo struct para tipos NumPy (little-endian)
+_STRUCT_TO_NUMPY = {"h": "<i2", "i": "<i4", "f": "<f4", "I": "<u4"}
+
+
+def packet_dtype(struct_format):
+    """
+    Cria um dtype estruturado com o MESMO layout binário do STRUCT_FORMAT.
+    Assim um datagrama pode ser interpretado direto com np.frombuffer.
+    """
+    codes = struct_format.lstrip("<")
+    if len(codes) != len(SENSOR_FIELDS):
+        raise ValueError("STRUCT_FORMAT e SENSOR_FIELDS têm tamanhos diferentes.")
+    return np.dtype([(name, _STRUCT_TO_NUMPY[c]) for name, c in zip(SENSOR_FIELDS, codes)])
+
+
+def sample_dtype(wire_dtype):
+    """ dtype das amostras guardadas: layout do datagrama + HOST_FIELDS no final. """
+    wire_dtype = np.dtype(wire_dtype)
+    return np.dtype([(name, wire_dtype.fields[name][0]) for name in wire_dtype.names] + list(HOST_FIELDS))
+
+
+class SampleRingBuffer:
+    """
+    Buffer circular pré-alocado de amostras da luva (dtype estruturado).
+
+    Cada amostra é escrita duas vezes (posição i e i + capacity). Com esse
+    "espelho", qualquer janela das últimas N amostras é sempre contígua e
+    pode ser devolvida como view, sem cópia e sem criar dicionários.
+
+    Atenção: as views apontam para a memória do buffer. Se o consumidor
+    precisar guardar os dados por mais tempo que 'capacity' amostras,
+    deve fazer .copy().
+
+    wire_size é quantos bytes do início de cada amostra vêm do datagrama
+    (o resto são os HOST_FIELDS, ex.: 't_recv'). Padrão: a amostra inteira.
+    """
+
+    def __init__(self, dtype, capacity=4096, wire_size=None):
+        if capacity < 1:
+            raise ValueError("capacity deve ser >= 1")
+        self.dtype = np.dtype(dtype)
+        self.capacity = capacity
+        self.wire_size = wire_size or self.dtype.itemsize
+        self._data = np.zeros(2 * capacity, dtype=self.dtype)
+        # View em bytes: permite copiar o datagrama cru para dentro do slot
+        self._raw = self._data.view(np.uint8).reshape(2 * capacity, self.dtype.itemsize)
+        # Views das colunas do host presentes no dtype, na ordem de HOST_FIELDS
+        self._host_columns = [self._data[name] for name, _ in HOST_FIELDS if name in self.dtype.names]
+        self._count = 0  # Total de amostras já escritas (também é o nº de sequência)
+        self._generation = 0  # Sobe a cada clear(): sequências de antes não valem mais
+        # Condition: protege o buffer e acorda leitores quando chega amostra nova
+        self._cond = threading.Condition(threading.Lock())
+
+    @property
+    def count(self):
+        return self._count
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def write_bytes(self, packet, *host_values):
+        """
+        Copia um datagrama cru (bytes/memoryview) para o próximo slot.
+        host_values: valores dos HOST_FIELDS (t_recv, t_sampled, ...), na ordem.
+        """
+        with self._cond:
+            slot = self._count % self.capacity
+            row = np.frombuffer(packet, dtype=np.uint8, count=self.wire_size)
+            self._raw[slot, :self.wire_size] = row
+            self._raw[slot + self.capacity, :self.wire_size] = row
+            for column, value in zip(self._host_columns, host_values):
+                column[slot] = value
+                column[slot + self.capacity] = value
+            self._count += 1
+            self._cond.notify_all()
+
+    def write_batch(self, data, count, offset=0, *host_values):
+        """
+        Copia 'count' amostras contíguas de um datagrama (a partir de 'offset')
+        com uma única chamada np.frombuffer, tratando a volta do buffer.
+        Cada valor de host_values pode ser um escalar ou um array por amostra.
+        """
+        size = self.wire_size
+        rows = np.frombuffer(data, dtype=np.uint8, count=count * size, offset=offset)
+        rows = rows.reshape(count, size)
+        host_values = [np.broadcast_to(np.asarray(v, dtype=np.float64), (count,)) for v in host_values]
+        if count > self.capacity:
+            # Mais amostras que o buffer: só as últimas cabem
+            skipped = count - self.capacity
+            rows = rows[skipped:]
+            host_values = [v[skipped:] for v in host_values]
+        else:
+            skipped = 0
+        with self._cond:
+            self._count += skipped
+            n = len(rows)
+            slot = self._count % self.capacity
+            first = min(n, self.capacity - slot)
+            self._store(slot, rows[:first], [v[:first] for v in host_values])
+            if first < n:
+                self._store(0, rows[first:], [v[first:] for v in host_values])
+            self._count += n
+            self._cond.notify_all()
+
+    def _store(self, slot, rows, host_values):
+        """ Escreve linhas cruas a partir de 'slot' e no espelho (sem dar a volta). """
+        end = slot + len(rows)
+        self._raw[slot:end, :self.wire_size] = rows
+        self._raw[slot + self.capacity:end + self.capacity, :self.wire_size] = rows
+        for column, values in zip(self._host_columns, host_values):
+            column[slot:end] = values
+            column[slot + self.capacity:end + self.capacity] = values
+
+    def get_window(self, n):
+        """
+        Retorna uma view (sem cópia) das últimas n amostras, em ordem
+        cronológica. Se ainda não houver n amostras, retorna as que existem.
+        """
+        with self._cond:
+            available = min(n, self._count, self.capacity)
+            if available <= 0:
+                return self._data[:0]
+            end = (self._count - 1) % self.capacity + self.capacity + 1
+            return self._data[end - available:end]
+
+    def get_latest(self):
+        """ Última amostra (np.void) ou None se o buffer estiver vazio. """
+        window = self.get_window(1)
+        if len(window) == 0:
+            return None
+        return window[0]
+
+    def read_from(self, seq, max_items=None, generation=None):
+        """
+        Lê (cópia) as amostras a partir do nº de sequência 'seq'.
+        Retorna (amostras, primeiro_seq, perdidas, geração). 'perdidas' é
+        quantas amostras já tinham sido sobrescritas antes da leitura
+        (overflow). 'generation' é a geração em que 'seq' foi obtido: se o
+        buffer foi limpo desde então, a leitura recomeça do início.
+        """
+        with self._cond:
+            if generation is not None and generation != self._generation:
+                seq = 0
+            oldest = max(0, self._count - self.capacity)
+            lost = 0
+            if seq < oldest:
+                lost = oldest - seq
+                seq = oldest
+            n = self._count - seq
+            if max_items is not None:
+                n = min(n, max_items)
+            start = seq % self.capacity
+            # Cópia: o escritor pode reciclar esses slots enquanto o lote é processado
+            return self._data[start:start + n].copy(), seq, lost, self._generation
+
+    def wait_for(self, seq, timeout=None, generation=None):
+        """
+        Bloqueia até existir amostra com sequência >= seq (ou timeout/wake).
+        Com 'generation' de antes de um clear(), qualquer amostra nova serve.
+        """
+        with self._cond:
+            if generation is not None and generation != self._generation:
+                seq = 0
+            if self._count <= seq:
+                self._cond.wait(timeout)
+                if generation is not None and generation != self._generation:
+                    seq = 0
+            return self._count > seq
+
+    def wake(self):
+        """ Acorda todos os leitores bloqueados em wait_for (ex.: ao encerrar). """
+        with self._cond:
+            self._cond.notify_all()
+
+    def clear(self):
+        """ Esvazia o buffer; os leitores recomeçam do início na próxima leitura. """
+        with self._cond:
+            self._count = 0
+            self._generation += 1
+            self._cond.notify_all()
+
+
+class SampleReader:
+    """
+    Cursor de leitura sem perdas sobre um SampleRingBuffer.
+
+    Cada leitor guarda o próximo nº de sequência que ainda não processou.
+    drain() devolve TUDO o que chegou desde a última chamada, como um lote.
+    Se o leitor atrasar mais que a capacidade do buffer, as amostras
+    sobrescritas são contadas em 'dropped' (nada some em silêncio).
+    Depois de um clear() no buffer o cursor volta para o início.
+    """
+
+    def __init__(self, buffer, from_start=False):
+        self.buffer = buffer
+        self.generation = buffer.generation
+        self.next_seq = 0 if from_start else buffer.count
+        # --- Contadores ---
+        self.received = 0    # Amostras entregues ao consumidor
+        self.dropped = 0     # Amostras perdidas por overflow do buffer
+        self.overflows = 0   # Quantas leituras encontraram overflow
+        self.lag = 0         # Amostras pendentes após a última leitura
+        self.max_lag = 0     # Maior atraso observado (em amostras)
+        self.batches = 0
+        self.max_batch = 0
+
+    def wait(self, timeout=None):
+        return self.buffer.wait_for(self.next_seq, timeout, self.generation)
+
+    def drain(self, max_items=None):
+        """ Retorna um array estruturado com as amostras novas (pode ser vazio). """
+        samples, first_seq, lost, self.generation = self.buffer.read_from(self.next_seq, max_items, self.generation)
+        if lost:
+            self.dropped += lost
+            self.overflows += 1
+
+        n = len(samples)
+        self.next_seq = first_seq + n
+        self.lag = max(self.buffer.count - self.next_seq, 0)
+        pending = lost + n + self.lag
+        if pending > self.max_lag:
+            self.max_lag = pending
+        if n:
+            self.received += n
+            self.batches += 1
+            if n > self.max_batch:
+                self.max_batch = n
+        return samples
+
+    def skip_to_latest(self):
+        """ Descarta o atraso sem contar como perda (ex.: consumidor pausado). """
+        self.generation = self.buffer.generation
+        self.next_seq = self.buffer.count
+        self.lag = 0
+
+    def get_stats(self):
+        return {
+            "next_seq": self.next_seq,
+            "received": self.received,
+            "dropped": self.dropped,
+            "overflows": self.overflows,
+            "lag": self.lag,
+            "max_lag": self.max_lag,
+            "batches": self.batches,
+            "max_batch": self.max_batch,
+        }
@@ -0,0 +1,239 @@
+"""
+Gravação e reprodução (replay) do tráfego UDP da luva.
+
+Formato do arquivo (append-only, little-endian, pode ser lido via mmap):
+    Cabeçalho: MAGIC (8s) | versão (H) | reservado (H) | hora de início (d, epoch)
+    Registros: t_host (d, time.monotonic) | ip (I) | porta (H) | tamanho (H) | bytes do datagrama
+
+Uso pela linha de comando:
+    python session_recorder.py info sessao.airrec
+    python session_recorder.py bench sessao.airrec [--mappings sensor_mappings.json]
+"""
+import argparse
+import json
+import mmap
+import os
+import socket
+import struct
+import threading
+import time
+
+MAGIC = b"AIRBREC1"
+VERSION = 1
+FILE_HEADER = struct.Struct("<8sHHd")
+RECORD_HEADER = struct.Struct("<dIHH")
+
+
+def _ip_to_int(ip):
+    try:
+        return struct.unpack("!I", socket.inet_aton(ip))[0]
+    except OSError:
+        return 0
+
+
+def _int_to_ip(value):
+    return socket.inet_ntoa(struct.pack("!I", value))
+
+
+class SessionRecorder:
+    """ Grava datagramas crus + tempo de recepção do host em um arquivo append-only. """
+
+    def __init__(self, path):
+        self.path = path
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, "ab")
+        if is_new:
+            self._file.write(FILE_HEADER.pack(MAGIC, VERSION, 0, time.time()))
+        else:
+            _check_header(path)
+        self.records = 0
+        self._lock = threading.Lock()
+
+    def write(self, data, addr, t_host):
+        header = RECORD_HEADER.pack(t_host, _ip_to_int(addr[0]), addr[1], len(data))
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(header)
+            self._file.write(data)
+            self.records += 1
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+
+def _check_header(path):
+    with open(path, "rb") as f:
+        magic, version, _, _ = FILE_HEADER.unpack(f.read(FILE_HEADER.size))
+    if magic != MAGIC:
+        raise ValueError(f"'{path}' não é uma gravação do AirBand.")
+    if version != VERSION:
+        raise ValueError(f"Versão de gravação não suportada: {version}")
+
+
+class SessionReader:
+    """ Lê uma gravação via mmap, sem carregar o arquivo inteiro na memória. """
+
+    def __init__(self, path):
+        _check_header(path)
+        self.path = path
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        _, _, _, self.start_time = FILE_HEADER.unpack_from(self._mm, 0)
+
+    def __iter__(self):
+        """ Gera (t_host, (ip, porta), bytes) para cada datagrama gravado. """
+        mm = self._mm
+        offset = FILE_HEADER.size
+        end = len(mm)
+        while offset + RECORD_HEADER.size <= end:
+            t_host, ip, port, length = RECORD_HEADER.unpack_from(mm, offset)
+            offset += RECORD_HEADER.size
+            if offset + length > end:
+                break  # Registro truncado (gravação interrompida)
+            yield t_host, (_int_to_ip(ip), port), mm[offset:offset + length]
+            offset += length
+
+    def summary(self):
+        count = 0
+        first = last = None
+        sources = {}
+        for t_host, addr, data in self:
+            count += 1
+            first = t_host if first is None else first
+            last = t_host
+            source = f"{addr[0]}:{addr[1]}"
+            sources[source] = sources.get(source, 0) + 1
+        duration = (last - first) if count > 1 else 0.0
+        return {
+            "records": count,
+            "duration_s": duration,
+            "rate_hz": (count - 1) / duration if duration > 0 else 0.0,
+            "sources": sources,
+            "recorded_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.start_time)),
+        }
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+
+class ReplaySource:
+    """
+    Reinjeta uma gravação no mesmo caminho de decodificação da Communication.
+
+    speed=1.0 reproduz no tempo original, speed=N reproduz N vezes mais
+    rápido e speed=None (ou 0) reproduz o mais rápido possível.
+
+    Em qualquer velocidade, cada datagrama vai com a chegada ORIGINAL
+    (t_host gravado, rebaseado para o início do replay) em 't_source':
+    o relógio da luva estima o t_sampled com o espaçamento gravado, então
+    filtros e gatilho (hold/rearm em segundos) se comportam como ao vivo.
+    Só as latências de recepção (t_recv, relógio real) ficam comprimidas
+    fora de 1x.
+    """
+
+    def __init__(self, path, on_datagram, speed=1.0, on_finished=None):
+        self.path = path
+        self.on_datagram = on_datagram
+        self.speed = speed if speed else None
+        self.on_finished = on_finished
+        self.replayed = 0
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=1.0)
+
+    def _run(self):
+        reader = SessionReader(self.path)
+        try:
+            t0_rec = None
+            t0_wall = time.monotonic()
+            for t_host, addr, data in reader:
+                if not self.running:
+                    break
+                if t0_rec is None:
+                    t0_rec = t_host
+                if self.speed is not None:
+                    delay = t0_wall + (t_host - t0_rec) / self.speed - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                self.on_datagram(data, addr, t_source=t0_wall + (t_host - t0_rec))
+                self.replayed += 1
+        finally:
+            reader.close()
+            self.running = False
+            if self.on_finished:
+                self.on_finished()
+
+
+class _NullEmulator:
+    """ Emulador "mudo" para medir só o custo do instrumento. """
+    def __init__(self):
+        self.changes = 0
+        self._last = None
+
+    def atualizar_estado(self, novo_estado):
+        if novo_estado != self._last:
+            self.changes += 1
+            self._last = list(novo_estado)
+
+
+def _bench(path, mappings_path):
+    from communication import Communication
+    from instruments import Guitar
+
+    with open(mappings_path) as f:
+        mappings = json.load(f)
+
+    comm = Communication()
+    reader = comm.open_reader()
+    guitar = Guitar()
+    emulator = _NullEmulator()
+    keys = [m["key"] for m in mappings.values() if "key" in m]
+
+    session = SessionReader(path)
+    t0 = time.perf_counter()
+    processed = 0
+    for t_host, addr, data in session:
+        comm._handle_datagram(data, addr)
+        for sample in reader.drain():
+            guitar.process_data({k: sample[k] for k in keys}, mappings, emulator)
+            processed += 1
+    elapsed = time.perf_counter() - t0
+    session.close()
+    print(f"{processed} amostras em {elapsed:.3f}s ({processed / elapsed:.0f} amostras/s), "
+          f"{emulator.changes} mudanças de estado, {reader.dropped} perdidas")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    info = sub.add_parser("info", help="Resumo de uma gravação")
+    info.add_argument("path")
+    bench = sub.add_parser("bench", help="Mede o custo da Guitar sobre uma gravação")
+    bench.add_argument("path")
+    bench.add_argument("--mappings", default="sensor_mappings.json")
+    args = parser.parse_args()
+
+    if args.command == "info":
+        reader = SessionReader(args.path)
+        print(json.dumps(reader.summary(), indent=4))
+        reader.close()
+    elif args.command == "bench":
+        _bench(args.path, args.mappings)
+
+
+if __name__ == "__main__":
+    main()
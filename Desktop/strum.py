@@ -0,0 +1,113 @@
+"""
+Detector de batida (strum) da guitarra a partir do giroscópio da luva.
+
+Roda sobre TODAS as amostras do lote (taxa cheia da luva), não uma vez
+por iteração do worker: a batida é marcada na amostra exata em que o
+giro cruzou o limiar.
+
+Sinal: soma ponderada dos eixos do giroscópio mestre/escravo (CHANNELS),
+em graus/s, menos o viés estimado num pequeno buffer circular de amostras
+em repouso. Detecção com histerese:
+
+    |sinal| > ON_DPS   -> batida (se STRUM_COOLDOWN já passou), sentido = sinal
+    |sinal| < OFF_DPS  -> fim do pico, rearma
+
+Sinal positivo = batida para baixo (DOWN), negativo = para cima (UP).
+"""
+import time
+import numpy as np
+
+DOWN = 1
+UP = -1
+
+
+class StrumDetector:
+    GYRO_LSB_PER_DPS = 131.0  # MPU6050 na faixa padrão (±250 °/s)
+    CHANNELS = {"gyro_gz": 0.5, "slave_gz": 0.5}
+    ON_DPS = 100.0    # Início da batida
+    OFF_DPS = 40.0    # Fim do pico (histerese)
+    RING = 64         # Amostras em repouso usadas para o viés do giroscópio
+
+    def __init__(self, cooldown=0.10):
+        self.cooldown = cooldown
+        self.reset()
+
+    def reset(self):
+        self._ring = np.zeros(self.RING)
+        self._ring_count = 0
+        self._bias = 0.0
+        self._in_peak = False
+        self.last_strum_time = -float("inf")
+        self.last_direction = 0
+        self.last_peak_dps = 0.0
+        self.strums = 0
+
+    def signal(self, samples):
+        """ Sinal de giro (°/s, sem viés) de um lote: array estruturado ou sequência de dicts. """
+        if isinstance(samples, np.ndarray) and samples.dtype.names:
+            raw = np.zeros(len(samples))
+            for name, weight in self.CHANNELS.items():
+                if name in samples.dtype.names:
+                    raw += weight * samples[name]
+        else:
+            raw = np.array([sum(weight * float(s.get(name, 0)) for name, weight in self.CHANNELS.items())
+                            for s in samples], dtype=np.float64)
+        return raw / self.GYRO_LSB_PER_DPS - self._bias
+
+    def process(self, samples, times=None):
+        """
+        Detecta batidas num lote. 'times' (s, um por amostra) é usado no
+        cooldown; sem ele, todas as amostras ficam com o instante atual.
+        Retorna um array int8 com DOWN/UP na amostra da batida e 0 no resto.
+        """
+        dps = self.signal(samples)
+        n = len(dps)
+        events = np.zeros(n, dtype=np.int8)
+        if n == 0:
+            return events
+        if times is None:
+            times = np.full(n, time.monotonic())
+
+        # Só percorre em Python a partir das amostras acima do limiar de repouso
+        magnitude = np.abs(dps)
+        moving = magnitude >= self.OFF_DPS
+        in_peak = self._in_peak
+        if in_peak or moving.any():
+            on = self.ON_DPS
+            off = self.OFF_DPS
+            cooldown = self.cooldown
+            start = 0 if in_peak else int(np.argmax(moving))
+            mags = magnitude.tolist()
+            for i in range(start, n):
+                m = mags[i]
+                if in_peak:
+                    if m < off:
+                        in_peak = False
+                    elif m > self.last_peak_dps:
+                        self.last_peak_dps = m
+                elif m > on:
+                    in_peak = True
+                    t = float(times[i])
+                    if t - self.last_strum_time >= cooldown:
+                        direction = DOWN if dps[i] > 0 else UP
+                        events[i] = direction
+                        self.last_strum_time = t
+                        self.last_direction = direction
+                        self.last_peak_dps = m
+                        self.strums += 1
+            self._in_peak = in_peak
+
+        self._update_bias(dps[~moving] + self._bias)
+        return events
+
+    def _update_bias(self, rest_dps):
+        """ Guarda as amostras em repouso (°/s, com viés) e recalcula o viés. """
+        rest_dps = rest_dps[-self.RING:]
+        k = len(rest_dps)
+        if k == 0:
+            return
+        idx = (self._ring_count + np.arange(k)) % self.RING
+        self._ring[idx] = rest_dps
+        self._ring_count += k
+        filled = min(self._ring_count, self.RING)
+        self._bias = float(self._ring[:filled].mean())
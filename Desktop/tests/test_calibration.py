@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+from calibration import finger_mapping
+
+SENSORS = ["adc_v32", "adc_v33"]
+FINGERS = ["Dedo 1", "Dedo 2"]
+
+
+def _fit(span, noise):
+    return {"rest": np.array([1.0, 2.0]), "gain": np.array([[span, 0.05], [0.1, 1.0]]),
+            "noise": np.array([noise, 0.001])}
+
+
+def test_histerese_sai_do_ruido_relativo_a_faixa():
+    mapping = finger_mapping(_fit(1.0, 0.01), SENSORS, FINGERS, "Dedo 1", "adc_v32")
+    assert mapping["full"] == pytest.approx(2.0)
+    assert mapping["hysteresis"] == pytest.approx(0.04)
+    assert mapping["crosstalk_ref"] == {"adc_v33": pytest.approx(2.05)}
+
+
+@pytest.mark.parametrize("span, noise", [(0.22, 0.030), (0.0, 0.001), (np.nan, 0.001)])
+def test_ruido_grande_demais_ou_faixa_nula_rejeita(span, noise):
+    # 30 mV de ruído em 0.22 V de faixa pediria histerese > MAX_HYSTERESIS
+    with pytest.raises(ValueError):
+        finger_mapping(_fit(span, noise), SENSORS, FINGERS, "Dedo 1", "adc_v32")
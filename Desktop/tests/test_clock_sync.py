@@ -0,0 +1,46 @@
+import numpy as np
+
+from clock_sync import ClockSync
+
+
+def _feed(clock, device_ms, host_s):
+    return [clock.update(int(d) & 0xFFFFFFFF, h) for d, h in zip(device_ms, host_s)]
+
+
+def test_desenrola_o_wrap_de_32_bits():
+    clock = ClockSync()
+    device = 0xFFFFFFFF - 500 + np.arange(0, 2000, 10)  # passa pelo wrap no meio
+    host = 50.0 + np.arange(0, 2000, 10) / 1000.0
+    sampled = _feed(clock, device, host)
+    assert np.all(np.diff(sampled) > 0)
+    np.testing.assert_allclose(np.diff(sampled), 0.01, atol=1e-6)
+    assert clock.resets == 0
+
+
+def test_update_igual_a_to_host_escalar_e_array():
+    clock = ClockSync()
+    rng = np.random.default_rng(2)
+    device = 1000 + np.arange(0, 8000, 10)
+    host = 10.0 + np.arange(0, 8000, 10) / 1000.0 + rng.uniform(0, 0.003, len(device))
+    for d, h in zip(device, host):
+        t = clock.update(int(d), h)
+        assert abs(t - clock.to_host(int(d))) < 1e-9
+        assert abs(t - clock.to_host(np.array([d], dtype=np.uint32))[0]) < 1e-9
+
+
+def test_reinicio_do_firmware_recomeca_o_ajuste():
+    clock = ClockSync()
+    _feed(clock, 600000 + np.arange(0, 3000, 10), 100.0 + np.arange(0, 3000, 10) / 1000.0)
+    # ESP32 reiniciou: millis() volta para perto de zero com o host seguindo em frente
+    sampled = _feed(clock, 20 + np.arange(0, 1000, 10), 103.5 + np.arange(0, 1000, 10) / 1000.0)
+    assert clock.resets == 1
+    np.testing.assert_allclose(sampled[0], 103.5, atol=1e-6)
+    np.testing.assert_allclose(np.diff(sampled), 0.01, atol=1e-6)
+
+
+def test_pacote_fora_de_ordem_nao_volta_o_relogio():
+    clock = ClockSync()
+    _feed(clock, [1000, 1010, 1020], [1.0, 1.01, 1.02])
+    late = clock.update(1005, 1.03)
+    assert abs(late - clock.to_host(1005)) < 1e-9
+    assert clock.to_host(1030) > clock.to_host(1020)
@@ -0,0 +1,56 @@
+import struct
+import time
+
+from communication import Communication
+
+
+def _packet(ts):
+    values = [0] * 6 + [0] * 3 + [0.0] * 5 + [0] * 6 + [ts]
+    return struct.pack(Communication.STRUCT_FORMAT, *values)
+
+
+def test_luvas_na_mesma_porta_ficam_separadas():
+    comm = Communication()
+    a, b = ("10.0.0.2", 4000), ("10.0.0.3", 4000)
+    for i in range(5):
+        comm._handle_datagram(_packet(10 * i), a)
+        comm._handle_datagram(_packet(5000 + 10 * i), b)
+    assert comm.samples.count == 10
+    assert comm.get_device("10.0.0.2:4000").samples.count == 5
+    assert comm.get_device("10.0.0.3:4000").samples.count == 5
+
+
+def test_luva_ativa_e_a_primeira_e_troca_quando_silencia():
+    comm = Communication()
+    assert comm.active_device() is None
+    comm._handle_datagram(_packet(0), ("10.0.0.2", 4000))
+    comm._handle_datagram(_packet(0), ("10.0.0.3", 4000))
+    assert comm.active_device(1.0) == "10.0.0.2:4000"
+    comm.get_device("10.0.0.2:4000").last_seen = time.monotonic() - 5.0
+    assert comm.active_device(1.0) == "10.0.0.3:4000"
+    assert comm.active_device() == "10.0.0.2:4000"
+
+
+def test_replay_tem_entrada_propria_e_descarta_a_rede(tmp_path):
+    from session_recorder import SessionRecorder
+
+    path = str(tmp_path / "sessao.airrec")
+    recorder = SessionRecorder(path)
+    for i in range(50):
+        recorder.write(_packet(10 * i), ("10.0.0.2", 4000), 100.0 + i * 0.01)
+    recorder.close()
+
+    comm = Communication()
+    live = comm.get_device("10.0.0.2:4000")
+    comm._handle_datagram(_packet(900000), ("10.0.0.2", 4000))
+    fit_before = live.clock.snapshot()
+
+    comm.start_replay(path, speed=0.5)   # 0.5x: ~1 s, a rede chega no meio
+    comm._handle_datagram(_packet(900010), ("10.0.0.2", 4000))
+    comm.replay.thread.join(timeout=5.0)
+    comm._handle_datagram(_packet(900020), ("10.0.0.2", 4000))
+
+    assert comm.rx_ignored == 1
+    assert live.samples.count == 2
+    assert live.clock.snapshot()["clock_resets"] == fit_before["clock_resets"]
+    assert comm.get_device("replay:10.0.0.2:4000").samples.count == 50
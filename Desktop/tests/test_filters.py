@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from filters import FILTERS, EMAFilter
+
+
+def _signal(n=600, channels=3, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(n) / 100.0
+    x = np.column_stack([np.sin(t * (c + 1)) + rng.normal(0, 0.05, n) for c in range(channels)])
+    return x, t
+
+
+def _in_chunks(f, x, t, sizes):
+    out, i, k = [], 0, 0
+    while i < len(x):
+        size = sizes[k % len(sizes)]
+        out.append(f.process(x[i:i + size], t[i:i + size]))
+        i += size
+        k += 1
+    return np.vstack(out)
+
+
+@pytest.mark.parametrize("name", sorted(FILTERS))
+def test_independe_da_divisao_em_lotes(name):
+    x, t = _signal()
+    whole = FILTERS[name](x.shape[1]).process(x, t)
+    chunked = _in_chunks(FILTERS[name](x.shape[1]), x, t, [1, 7, 50, 3])
+    np.testing.assert_allclose(chunked, whole, rtol=1e-9, atol=1e-12)
+
+
+@pytest.mark.parametrize("alpha", [0.02, 0.4, 1.0])
+def test_ema_forma_fechada_igual_a_recorrencia(alpha):
+    # alpha pequeno força vários trechos (b^-L limitado por MAX_GROWTH)
+    x, _ = _signal(n=2000)
+    y = EMAFilter(x.shape[1], alpha).process(x)
+    expected = np.empty_like(x)
+    prev = x[0]
+    for i, row in enumerate(x):
+        prev = alpha * row + (1 - alpha) * prev
+        expected[i] = prev
+    np.testing.assert_allclose(y, expected, rtol=1e-9, atol=1e-12)
+
+
+def test_ema_step_igual_a_process():
+    x, _ = _signal(n=200)
+    x[50:60, 1] = np.nan  # canal sem valor: saída NaN, estado mantido
+    batch = EMAFilter(x.shape[1], 0.3)
+    stepped = EMAFilter(x.shape[1], 0.3)
+    for row in x:
+        a = batch.process(row[None, :])[0]
+        b = np.array(stepped.step(row.tolist()))
+        np.testing.assert_allclose(b, a, rtol=1e-12, equal_nan=True)
+    np.testing.assert_allclose(stepped.state, batch.state, rtol=1e-12)
+
+
+def test_canal_sem_valor_nao_muda_estado():
+    f = EMAFilter(2, 0.5)
+    f.process(np.array([[1.0, 2.0]]))
+    out = f.process(np.array([[3.0, np.nan]]))
+    assert np.isnan(out[0, 1])
+    assert f.state[1] == 2.0
@@ -0,0 +1,133 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from bench_crosstalk import legacy_lanes, legacy_raw, plain_guitar, synthetic, _Capture
+from instruments import Guitar
+from mapping_plan import MappingPlan
+
+MAPPINGS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sensor_mappings.json")
+
+
+@pytest.fixture(scope="module")
+def mappings():
+    with open(MAPPINGS_PATH) as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope="module")
+def samples(mappings):
+    return synthetic(3000, mappings)
+
+
+def _in_millivolts(mappings):
+    """ Mesma calibração em mV: as faixas passam do limiar de acoplamento original (10). """
+    scaled = {}
+    for action, calib in mappings.items():
+        calib = dict(calib)
+        for name in ("rest", "full"):
+            calib[name] = float(calib[name]) * 1000.0
+        calib["crosstalk_ref"] = {k: v * 1000.0 for k, v in calib.get("crosstalk_ref", {}).items()}
+        scaled[action] = calib
+    return scaled
+
+
+@pytest.mark.parametrize("units", ["V", "mV"])
+@pytest.mark.parametrize("gain", [0.8, 1.0, 1.2])
+def test_lote_e_por_amostra_iguais_ao_laco_original(mappings, units, gain):
+    # Em V nenhum acoplamento vale (como no original); em mV o desacoplamento entra de verdade
+    if units == "mV":
+        mappings = _in_millivolts(mappings)
+        assert MappingPlan(mappings, Guitar.DEFAULT_FINGER_ACTIONS).coupling.any()
+    samples = synthetic(3000, mappings)
+    actions = Guitar.DEFAULT_FINGER_ACTIONS
+    smoothed = {}
+    reference = plain_guitar()
+    expected = [tuple(legacy_lanes(legacy_raw(s, mappings, actions, smoothed, reference.FILTER_ALPHA),
+                                   mappings, actions, gain, reference.TRIGGER_THRESHOLD))
+                for s in samples]
+
+    guitar = plain_guitar()
+    guitar.CROSSTALK_GAIN = gain
+    capture = _Capture()
+    for sample in samples:
+        guitar.process_data(sample, mappings, capture)
+    assert capture.lanes == expected
+
+    guitar = plain_guitar()
+    guitar.CROSSTALK_GAIN = gain
+    plan = MappingPlan(mappings, guitar.finger_actions)
+    lanes = guitar.process_batch(plan.extract_batch(samples), plan)
+    assert [tuple(row) for row in lanes.tolist()] == expected
+
+
+@pytest.mark.parametrize("filter_type", ["ema", "one_euro", "kalman"])
+@pytest.mark.parametrize("mode", ["mask", "lstsq"])
+def test_caminho_por_amostra_igual_ao_lote(mappings, samples, filter_type, mode):
+    plan = MappingPlan(mappings, Guitar.DEFAULT_FINGER_ACTIONS)
+    values = plan.extract_batch(samples)
+    times = np.arange(len(values)) / 100.0
+
+    def guitar(scalar):
+        g = Guitar()
+        g.FILTER_TYPE = filter_type
+        g.CROSSTALK_MODE = mode
+        if not scalar:
+            g.SCALAR_MAX_BATCH = 0
+        g.set_tracing(True)
+        return g
+
+    whole = guitar(False)
+    expected = whole.process_batch(values, plan, times=times)
+
+    chunked = guitar(True)
+    rng = np.random.default_rng(3)
+    parts, i = [], 0
+    while i < len(values):
+        k = int(rng.integers(1, chunked.SCALAR_MAX_BATCH + 1))
+        parts.append(chunked.process_batch(values[i:i + k], plan, times=times[i:i + k]))
+        i += k
+    np.testing.assert_array_equal(np.vstack(parts), expected)
+    np.testing.assert_array_equal(chunked.trigger_gate.suppressed_per_lane, whole.trigger_gate.suppressed_per_lane)
+    np.testing.assert_allclose(chunked.trace.snapshot()["final"], whole.trace.snapshot()["final"], atol=1e-6)
+
+
+def test_plano_de_outra_largura_recomeca_as_lanes(mappings):
+    guitar = Guitar()
+    actions = list(Guitar.DEFAULT_FINGER_ACTIONS) + ["Traste 5 (Laranja)"]
+    plan = MappingPlan(mappings, actions)
+    lanes = guitar.process_batch(np.zeros((3, len(actions))), plan, times=np.arange(3) / 100.0)
+    assert lanes.shape == (3, 5)
+    assert guitar.n_lanes == 5
+
+
+@pytest.mark.parametrize("extra", [{"hysteresis": 0.569}, {"release": -0.2}, {"hysteresis": float("inf")}])
+def test_soltura_fica_entre_min_release_e_o_toque(extra):
+    action = Guitar.DEFAULT_FINGER_ACTIONS[0]
+    mappings = {action: dict({"key": "adc_v32", "rest": 0.0, "full": 0.22}, **extra)}
+    plan = MappingPlan(mappings, Guitar.DEFAULT_FINGER_ACTIONS)
+    guitar = Guitar()
+    press, release = guitar._thresholds(plan)
+    assert np.all((release >= guitar.MIN_RELEASE) & (release < press))
+
+    # Dedo dobra e volta ao repouso com 30 mV de ruído: a lane tem que soltar
+    rng = np.random.default_rng(0)
+    bent = np.r_[np.full(20, 0.22), np.zeros(180)] + rng.normal(0, 0.030, 200)
+    values = np.zeros((200, len(plan)))
+    values[:, 0] = bent
+    lanes = guitar.process_batch(values, plan, times=np.arange(200) / 100.0)[:, 0]
+    assert lanes[:20].any()
+    assert lanes[100:].mean() < 0.5
+
+
+def test_reset_recomeca_como_guitarra_nova(mappings, samples):
+    plan = MappingPlan(mappings, Guitar.DEFAULT_FINGER_ACTIONS)
+    values = plan.extract_batch(samples)
+    times = np.arange(len(values)) / 100.0
+    guitar = Guitar()
+    guitar.process_batch(values[:1500], plan, times=times[:1500])
+    guitar.reset()
+    np.testing.assert_array_equal(guitar.process_batch(values[1500:], plan, times=times[1500:]),
+                                  Guitar().process_batch(values[1500:], plan, times=times[1500:]))
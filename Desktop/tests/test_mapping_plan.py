@@ -0,0 +1,52 @@
+import json
+import os
+
+import numpy as np
+
+from bench_crosstalk import synthetic
+from instruments import Guitar
+from mapping_plan import MappingPlan
+
+MAPPINGS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sensor_mappings.json")
+
+
+def _mappings():
+    with open(MAPPINGS_PATH) as f:
+        return json.load(f)
+
+
+def test_acoplamento_padrao_usa_o_limiar_original():
+    # Calibração em volts: nenhuma faixa passa de MIN_COUPLING_RANGE, como no laço original
+    plan = MappingPlan(_mappings(), Guitar.DEFAULT_FINGER_ACTIONS)
+    assert not plan.coupling.any()
+
+
+def test_acoplamento_relativo_e_opcao_explicita(monkeypatch):
+    mappings = _mappings()
+    monkeypatch.setattr(MappingPlan, "RELATIVE_COUPLING", True)
+    plan = MappingPlan(mappings, Guitar.DEFAULT_FINGER_ACTIONS)
+    assert plan.coupling.any()
+    # Ruído grande demais para a faixa do alvo: aquele acoplamento fica de fora
+    target = Guitar.DEFAULT_FINGER_ACTIONS[0]
+    noisy = dict(mappings, **{target: dict(mappings[target], noise=1.0)})
+    column = MappingPlan(noisy, Guitar.DEFAULT_FINGER_ACTIONS).coupling[:, 0]
+    assert not column.any()
+    assert plan.coupling[:, 0].any()
+
+    # E muda as lanes em relação ao padrão (é por isso que não é o padrão)
+    samples = synthetic(3000, mappings)
+    relative = Guitar().process_batch(plan.extract_batch(samples), plan, times=np.arange(3000) / 100.0)
+    monkeypatch.setattr(MappingPlan, "RELATIVE_COUPLING", False)
+    plan = MappingPlan(mappings, Guitar.DEFAULT_FINGER_ACTIONS)
+    default = Guitar().process_batch(plan.extract_batch(samples), plan, times=np.arange(3000) / 100.0)
+    assert (relative != default).any()
+
+
+def test_valores_nao_finitos_contam_como_ausentes():
+    action = Guitar.DEFAULT_FINGER_ACTIONS[0]
+    mappings = {action: {"key": "adc_v34", "rest": 0.0, "full": float("inf"), "press": float("nan"),
+                         "hysteresis": float("inf"), "noise": float("nan")}}
+    plan = MappingPlan(mappings, Guitar.DEFAULT_FINGER_ACTIONS)
+    assert not plan.valid[0]
+    assert np.isnan(plan.press[0]) and np.isnan(plan.hysteresis[0])
+    assert np.isfinite(plan.span).all()
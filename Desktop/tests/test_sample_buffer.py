@@ -0,0 +1,55 @@
+import threading
+
+import numpy as np
+
+from sample_buffer import SampleReader, SampleRingBuffer
+
+DTYPE = np.dtype([("value", "<i4")])
+
+
+def _write(buffer, values):
+    for v in values:
+        buffer.write_bytes(np.array([v], dtype="<i4").tobytes())
+
+
+def test_drain_entrega_tudo_em_ordem():
+    buffer = SampleRingBuffer(DTYPE, capacity=8)
+    reader = SampleReader(buffer)
+    _write(buffer, range(5))
+    assert reader.drain()["value"].tolist() == [0, 1, 2, 3, 4]
+    assert len(reader.drain()) == 0
+
+
+def test_overflow_conta_como_perda():
+    buffer = SampleRingBuffer(DTYPE, capacity=4)
+    reader = SampleReader(buffer)
+    _write(buffer, range(10))
+    assert reader.drain()["value"].tolist() == [6, 7, 8, 9]
+    assert reader.dropped == 6
+
+
+def test_clear_e_drain_recomeca_do_inicio():
+    buffer = SampleRingBuffer(DTYPE, capacity=8)
+    reader = SampleReader(buffer)
+    _write(buffer, range(6))
+    reader.drain()
+    buffer.clear()
+    # O escritor já passou do cursor antigo? Não importa: nada da geração nova se perde
+    _write(buffer, [100, 101])
+    assert reader.wait(timeout=0)
+    assert reader.drain()["value"].tolist() == [100, 101]
+    _write(buffer, range(200, 207))
+    assert reader.drain()["value"].tolist() == list(range(200, 207))
+    assert reader.dropped == 0 and reader.lag == 0
+
+
+def test_clear_acorda_e_wait_espera_a_geracao_nova():
+    buffer = SampleRingBuffer(DTYPE, capacity=8)
+    reader = SampleReader(buffer)
+    _write(buffer, range(3))
+    reader.drain()
+    buffer.clear()
+    assert not reader.wait(timeout=0)
+    threading.Timer(0.05, _write, (buffer, [7])).start()
+    assert reader.wait(timeout=2.0)
+    assert reader.drain()["value"].tolist() == [7]
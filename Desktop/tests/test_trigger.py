@@ -0,0 +1,63 @@
+import numpy as np
+
+from trigger import TriggerGate
+
+
+def _run(gate, acts, times, press=0.5, release=0.4):
+    return gate.process(np.asarray(acts, dtype=float)[:, None], press, release, np.asarray(times, dtype=float))[:, 0]
+
+
+def test_histerese_segura_entre_os_limiares():
+    gate = TriggerGate(1, hold=0.0, rearm=0.0)
+    out = _run(gate, [0.0, 0.6, 0.45, 0.55, 0.45, 0.35, 0.45], np.arange(7) * 0.01)
+    assert out.tolist() == [0, 1, 1, 1, 1, 0, 0]
+
+
+def test_hold_atrasa_a_soltura():
+    gate = TriggerGate(1, hold=0.03, rearm=0.0)
+    # Toca em t=0.01 e solta já em t=0.02: só pode soltar a partir de t=0.04
+    out = _run(gate, [0.0, 0.6, 0.1, 0.1, 0.1, 0.1], np.arange(6) * 0.01)
+    assert out.tolist() == [0, 1, 1, 1, 0, 0]
+
+
+def test_rearm_atrasa_o_novo_toque():
+    gate = TriggerGate(1, hold=0.0, rearm=0.03)
+    out = _run(gate, [0.6, 0.1, 0.6, 0.6, 0.6, 0.6], np.arange(6) * 0.01)
+    # Soltou em t=0.01: novo toque só a partir de t=0.04
+    assert out.tolist() == [1, 0, 0, 0, 1, 1]
+
+
+def test_trocas_seguradas_contam_como_suprimidas():
+    gate = TriggerGate(1, hold=0.05, rearm=0.0)
+    _run(gate, [0.6, 0.1, 0.6, 0.1, 0.6], np.arange(5) * 0.01)
+    assert gate.suppressed > 0
+
+
+def test_step_igual_a_process_e_independe_de_lotes():
+    rng = np.random.default_rng(1)
+    acts = np.clip(np.cumsum(rng.normal(0, 0.15, (800, 3)), axis=0) % 1.0, 0, 1)
+    times = np.arange(len(acts)) / 100.0
+    press, release = np.array([0.5, 0.6, 0.4]), np.array([0.4, 0.5, 0.2])
+
+    whole = TriggerGate(3, hold=0.03, rearm=0.02)
+    expected = whole.process(acts, press, release, times)
+
+    chunked = TriggerGate(3, hold=0.03, rearm=0.02)
+    parts = [chunked.process(acts[i:i + 13], press, release, times[i:i + 13]) for i in range(0, len(acts), 13)]
+    np.testing.assert_array_equal(np.vstack(parts), expected)
+
+    stepped = TriggerGate(3, hold=0.03, rearm=0.02)
+    rows = [stepped.step(a.tolist(), press.tolist(), release.tolist(), t) for a, t in zip(acts, times)]
+    np.testing.assert_array_equal(np.array(rows), expected)
+
+    np.testing.assert_array_equal(chunked.suppressed_per_lane, whole.suppressed_per_lane)
+    np.testing.assert_array_equal(stepped.suppressed_per_lane, whole.suppressed_per_lane)
+
+
+def test_soltura_segurada_pelo_hold_fica_pendente_entre_lotes():
+    acts = [0.6, 0.1, 0.45, 0.45, 0.45]   # Depois da soltura o sinal fica entre os limiares
+    times = np.arange(5) * 0.01
+    whole = _run(TriggerGate(1, hold=0.03, rearm=0.0), acts, times)
+    gate = TriggerGate(1, hold=0.03, rearm=0.0)
+    split = np.concatenate([_run(gate, acts[:2], times[:2]), _run(gate, acts[2:], times[2:])])
+    assert whole.tolist() == split.tolist() == [1, 1, 1, 0, 0]
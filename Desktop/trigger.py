@@ -0,0 +1,265 @@
+"""
+Máquina de estados dos gatilhos dos dedos: histerese + tempo mínimo
+pressionado + atraso para rearmar.
+
+Por dedo, com a ativação já desacoplada (0..1):
+
+    solto       -> pressionado  ativação > press    e já passou 'rearm' s desde a última soltura
+    pressionado -> solto        ativação < release  e já passou 'hold' s desde o último toque
+
+Entre 'release' e 'press' vale o último limiar cruzado, então um sinal
+tremendo em volta do limiar não liga/desliga a lane a cada amostra. Um
+cruzamento segurado pelo hold/rearm fica pendente e é aplicado quando o
+tempo de espera acaba, mesmo que o sinal já esteja entre os limiares.
+
+OnsetPredictor (opcional) roda antes: antecipa o toque pela inclinação
+da ativação.
+
+Vetorizado: a histerese sozinha é um "forward fill" do último evento
+(acima de press = 1, abaixo de release = 0) ao longo do lote. Só as
+trocas de estado (poucas por lote) passam por Python, para aplicar os
+tempos de hold/rearm.
+"""
+import time
+import numpy as np
+
+
+class TriggerGate:
+    RATE = 100.0  # Hz assumido quando o lote vem sem instantes
+
+    def __init__(self, n_lanes, hold=0.03, rearm=0.03):
+        self.hold = hold
+        self.rearm = rearm
+        self.reset(n_lanes)
+
+    def reset(self, n_lanes=None):
+        n = n_lanes or len(self.state)
+        self.state = np.zeros(n, dtype=np.int8)
+        self.wanted = np.zeros(n, dtype=np.int8)      # Último limiar cruzado (pode estar pendente)
+        self.last_change = np.full(n, -np.inf)
+        self.raw_state = np.zeros(n, dtype=np.int8)  # Estado só com o limiar 'press' (sem a máquina)
+        self.suppressed_per_lane = np.zeros(n, dtype=np.int64)
+
+    @property
+    def suppressed(self):
+        """ Trocas de lane (toque ou soltura) que o limiar simples faria e a máquina segurou. """
+        return int(self.suppressed_per_lane.sum())
+
+    def process(self, activations, press, release, times=None):
+        """
+        activations: T x N; press/release: limiares por dedo (N) ou escalares;
+        times: instante de cada amostra (s). Retorna T x N (int8) com o
+        estado de cada lane após cada amostra.
+        """
+        activations = np.asarray(activations, dtype=np.float64)
+        n_samples, n = activations.shape
+        if n_samples == 0:
+            return np.zeros((0, n), dtype=np.int8)
+        times = _sample_times(times, n_samples, self.RATE)
+        press = np.broadcast_to(np.asarray(press, dtype=np.float64), (n,))
+        release = np.minimum(np.broadcast_to(np.asarray(release, dtype=np.float64), (n,)), press)
+
+        # Histerese: índice do último evento decisivo (ou -1 = o do lote anterior)
+        above = activations > press
+        events = np.where(above, 1, np.where(activations < release, 0, -1)).astype(np.int8)
+        idx = np.where(events >= 0, np.arange(n_samples)[:, None], -1)
+        np.maximum.accumulate(idx, axis=0, out=idx)
+        wanted = np.where(idx >= 0, np.take_along_axis(events, np.maximum(idx, 0), axis=0), self.wanted)
+
+        out = wanted.astype(np.int8)
+        if self.hold > 0 or self.rearm > 0:
+            times = np.maximum.accumulate(times)  # searchsorted precisa de instantes em ordem
+            for lane in np.flatnonzero((wanted != self.state).any(axis=0)):
+                self._apply_timing(out[:, lane], wanted[:, lane], times, lane)
+
+        # Contadores: amostras em que o limiar simples trocaria e a máquina segurou
+        raw = above.astype(np.int8)
+        raw_changes = np.diff(np.vstack((self.raw_state, raw)), axis=0) != 0
+        gated_changes = np.diff(np.vstack((self.state, out)), axis=0) != 0
+        self.suppressed_per_lane += np.count_nonzero(raw_changes & ~gated_changes, axis=0)
+
+        self.raw_state = raw[-1].copy()
+        self.wanted = wanted[-1].astype(np.int8)
+        self.state = out[-1].copy()
+        return out
+
+    def step(self, activations, press, release, t):
+        """
+        Uma amostra (listas de floats por dedo, instante t em s) com as
+        mesmas regras e contadores de process(), em floats do Python: é o
+        caminho do caso ao vivo (1 amostra por pacote). Retorna a lista de
+        estados das lanes.
+        """
+        state = self.state.tolist()
+        pending = self.wanted.tolist()
+        last = self.last_change.tolist()
+        raw_state = self.raw_state.tolist()
+        hold, rearm = self.hold, self.rearm
+        timing = hold > 0 or rearm > 0
+        suppressed = None
+        for i, a in enumerate(activations):
+            p = press[i]
+            above = a > p
+            current = state[i]
+            wanted = 1 if above else (0 if a < min(release[i], p) else pending[i])
+            pending[i] = wanted
+            if wanted != current and (not timing or t >= last[i] + (hold if current else rearm)):
+                state[i] = wanted
+                if timing:
+                    last[i] = t
+            if above != raw_state[i]:
+                raw_state[i] = int(above)
+                if state[i] == current:
+                    suppressed = suppressed or []
+                    suppressed.append(i)
+        if suppressed:
+            self.suppressed_per_lane[suppressed] += 1
+        self.state = np.array(state, dtype=np.int8)
+        self.wanted = np.array(pending, dtype=np.int8)
+        self.last_change = np.array(last)
+        self.raw_state = np.array(raw_state, dtype=np.int8)
+        return state
+
+    def _apply_timing(self, out, wanted, times, lane):
+        """
+        Aplica hold/rearm a uma lane, pulando de troca em troca: a próxima
+        troca é a primeira amostra que pede o estado oposto E já está fora
+        do tempo de espera do estado atual.
+        """
+        state = int(self.state[lane])
+        last = self.last_change[lane]
+        differs = {0: np.flatnonzero(wanted != 0), 1: np.flatnonzero(wanted != 1)}
+        pos = 0
+        n_samples = len(wanted)
+        while pos < n_samples:
+            wait = self.hold if state else self.rearm
+            earliest = max(pos, int(np.searchsorted(times, last + wait, side="left")))
+            candidates = differs[state]
+            k = int(np.searchsorted(candidates, earliest))
+            if k == len(candidates):
+                out[pos:] = state
+                break
+            i = int(candidates[k])
+            out[pos:i] = state
+            state = 1 - state
+            last = times[i]
+            pos = i
+        self.last_change[lane] = last
+
+
+class OnsetPredictor:
+    """
+    Disparo antecipado: o sensor de flexão leva dezenas de ms subindo até
+    cruzar o limiar. Com a inclinação da ativação (mínimos quadrados nas
+    últimas 'window' amostras, em ativação/s), o dedo dispara quando o
+    cruzamento projetado cai dentro de 'lead' s:
+
+        ativação + inclinação * lead > press,
+        inclinação > min_slope  e  ativação > floor
+
+    Confirmação/cancelamento: o disparo antecipado só se mantém até
+    'confirm' s depois do início; se a ativação real não cruzou 'press'
+    até lá, ou se a inclinação caiu antes, ele é cancelado.
+
+    A saída é a ativação com os dedos antecipados empurrados para logo
+    acima de 'press', para entrar no TriggerGate como um toque normal; no
+    cancelamento, a amostra vai para logo abaixo de 'release', para a
+    histerese não segurar o toque falso.
+    """
+    RATE = 100.0
+
+    def __init__(self, n_lanes, lead=0.025, window=4, min_slope=2.0, floor=0.25, confirm=0.05):
+        self.lead = lead
+        self.window = window
+        self.min_slope = min_slope
+        self.floor = floor
+        self.confirm = confirm
+        self.reset(n_lanes)
+
+    def reset(self, n_lanes=None):
+        n = n_lanes or len(self._active)
+        self._hist = None             # Últimas window-1 ativações (e instantes) do lote anterior
+        self._hist_t = None
+        self._active = np.zeros(n, dtype=bool)   # Episódio (real ou antecipado) em andamento
+        self._run_start = np.full(n, np.nan)     # Início do episódio (s)
+        self._confirmed = np.zeros(n, dtype=bool)
+        self._early = np.zeros(n, dtype=bool)    # Antecipação ativa na última amostra
+        self.fired = 0
+        self.confirmed = 0
+        self.cancelled = 0
+
+    @property
+    def n_lanes(self):
+        return len(self._active)
+
+    def slope(self, activations, times):
+        """ Inclinação (ativação/s) por mínimos quadrados em janelas de 'window' amostras. """
+        k = max(int(self.window), 2)
+        if self._hist is None or self._hist.shape != (k - 1, activations.shape[1]):
+            # Sem histórico: janela preenchida com a primeira amostra (inclinação 0)
+            self._hist = np.repeat(activations[:1], k - 1, axis=0)
+            self._hist_t = times[0] - np.arange(k - 1, 0, -1) / self.RATE
+        acts = np.vstack((self._hist, activations))
+        ts = np.concatenate((self._hist_t, times))
+        self._hist = acts[-(k - 1):]
+        self._hist_t = ts[-(k - 1):]
+
+        tw = np.lib.stride_tricks.sliding_window_view(ts - ts[0], k)                  # T x k
+        aw = np.lib.stride_tricks.sliding_window_view(acts, k, axis=0)                # T x N x k
+        tc = tw - tw.mean(axis=1, keepdims=True)
+        ac = aw - aw.mean(axis=2, keepdims=True)
+        var = (tc ** 2).sum(axis=1)
+        var = np.where(var > 0, var, np.inf)
+        return (ac * tc[:, None, :]).sum(axis=2) / var[:, None]
+
+    def process(self, activations, press, release, times=None):
+        activations = np.asarray(activations, dtype=np.float64)
+        n_samples, n = activations.shape
+        if n_samples == 0:
+            return activations
+        times = _sample_times(times, n_samples, self.RATE)
+        press = np.broadcast_to(np.asarray(press, dtype=np.float64), (n,))
+        release = np.minimum(np.broadcast_to(np.asarray(release, dtype=np.float64), (n,)), press)
+
+        slope = self.slope(activations, times)
+        real = activations > press
+        early = (~real & (activations > self.floor) & (slope > self.min_slope)
+                 & (activations + slope * self.lead > press))
+
+        # Episódios contínuos de (real | antecipado): início e se já houve cruzamento real
+        active = real | early
+        previous = np.vstack((self._active, active[:-1]))
+        rows = np.arange(n_samples)[:, None]
+        idx = np.where(active & ~previous, rows, -1)
+        np.maximum.accumulate(idx, axis=0, out=idx)
+        began = idx >= 0
+        start = np.where(began, times[np.maximum(idx, 0)], self._run_start)
+        seen = np.cumsum(real, axis=0)
+        seen_before = np.vstack((np.zeros((1, n), dtype=seen.dtype), seen[:-1]))
+        base = np.where(began, np.take_along_axis(seen_before, np.maximum(idx, 0), axis=0),
+                        -self._confirmed.astype(seen.dtype))
+        confirmed = (seen - base) > 0
+
+        # Antecipação vale até 'confirm' s depois do início do episódio, se ainda não confirmado
+        allowed = early & ~confirmed & (times[:, None] - start <= self.confirm)
+
+        prev_allowed = np.vstack((self._early, allowed[:-1]))
+        self.fired += int(np.count_nonzero(allowed & ~prev_allowed))
+        ended = prev_allowed & ~allowed
+        cancel = ended & ~real
+        self.confirmed += int(np.count_nonzero(ended & real))
+        self.cancelled += int(np.count_nonzero(cancel))
+
+        self._active = active[-1].copy()
+        self._run_start = np.where(active[-1], start[-1], np.nan)
+        self._confirmed = confirmed[-1] & active[-1]
+        self._early = allowed[-1].copy()
+        out = np.where(allowed, np.nextafter(press, np.inf), activations)
+        return np.where(cancel, np.minimum(out, np.nextafter(release, -np.inf)), out)
+
+
+def _sample_times(times, n_samples, rate):
+    """ Instantes do lote (s); sem eles, amostras espaçadas de 1/rate terminando agora. """
+    if times is None:
+        return time.monotonic() - np.arange(n_samples - 1, -1, -1) / rate
+    return np.asarray(times, dtype=np.float64).reshape(-1)
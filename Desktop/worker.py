@@ -1,7 +1,17 @@
-from PyQt5.QtCore import QThread, QMutex
 import time
 
+import numpy as np
+from PyQt5.QtCore import QThread, QMutex, QWaitCondition
+
+from latency import LatencyTracer
+from mapping_plan import MappingPlan
+from logger import get_logger
+
+log = get_logger("worker")
+
 class InstrumentWorker(QThread):
+    AUTO_DEVICE_SILENCE = 1.0  # s sem pacotes da luva escolhida automaticamente antes de passar a outra
+
     def __init__(self, communication, guitar, drum, emulator):
         super().__init__()
         self.comm = communication
@@ -10,86 +20,217 @@ class InstrumentWorker(QThread):
         self.emulator = emulator
         self.running = True
         self.sensor_mappings = {} 
+        # Mapeamentos compilados (índices/arrays); trocado inteiro em update_mappings
+        self.plan = self._compile_plan(self.sensor_mappings)
         
         # --- NOVO: Estado e Dados da Câmera ---
         self.current_instrument = "Guitarra (Luva)" # Default
         self.camera_data = {"Drum_Vector": [0,0,0,0]} # Buffer seguro
         self.data_mutex = QMutex() # Para evitar leitura/escrita simultânea
+        # Acorda o worker assim que chega um resultado novo da câmera
+        self.camera_cond = QWaitCondition()
+        self._camera_seq = 0       # Resultados recebidos da câmera
+        self._camera_seen = 0      # Último resultado já processado pelo worker
+        self._last_drum_vector = None  # Último vetor enviado ao emulador
+
+        # Cursor sem perdas: cada iteração processa TODAS as amostras novas.
+        # Uma luva por vez: o filtro e o gatilho da Guitar têm estado de uma
+        # só. Em modo automático (padrão) é a primeira luva ativa; bind_device()
+        # prende a uma luva escolhida.
+        self.device_id = None
+        self.auto_device = True
+        self.reader = self.comm.open_reader()
+        self._guitar_reader = self.reader  # Leitor cujo estado a Guitar tem agora
+
+        # Latência recepção -> worker -> decisão -> emulador (histogramas por estágio)
+        self.tracer = LatencyTracer()
+        self.emulator.tracer = self.tracer
+
+    def _compile_plan(self, mappings):
+        return MappingPlan(mappings, self.guitar.finger_actions, self.comm.SAMPLE_DTYPE.names)
 
     def update_mappings(self, new_mappings):
+        """ Compila os mapeamentos fora do caminho quente e troca o plano de uma vez. """
+        plan = self._compile_plan(new_mappings)
         self.sensor_mappings = new_mappings
+        self.plan = plan  # Atribuição atômica: o worker pega o novo no próximo lote
 
     def set_instrument(self, instrument_name):
         """ Chamado pela UI quando o usuário troca o combobox. """
         self.current_instrument = instrument_name
+        # O emulador pode ter outro estado agora: reenvia o próximo vetor da bateria
+        self._last_drum_vector = None
 
     def update_camera_data(self, data):
-        """ Chamado pela UI (CameraWidget) sempre que chega um frame novo. """
+        """ Chamado pela thread de inferência da câmera (CameraPipeline) a cada frame processado. """
         self.data_mutex.lock()
         self.camera_data = data
+        self._camera_seq += 1
+        self.camera_cond.wakeAll()
         self.data_mutex.unlock()
 
+    def _wait_camera_data(self, timeout_ms):
+        """
+        Bloqueia até chegar um resultado da câmera ainda não processado.
+        Retorna uma cópia dele, ou None no timeout (cada resultado sai uma vez só).
+        """
+        self.data_mutex.lock()
+        try:
+            if self._camera_seq == self._camera_seen:
+                self.camera_cond.wait(self.data_mutex, timeout_ms)
+            if self._camera_seq == self._camera_seen:
+                return None
+            self._camera_seen = self._camera_seq
+            return self.camera_data.copy()
+        finally:
+            self.data_mutex.unlock()
+
+    def bind_device(self, device_id):
+        """
+        Liga o instrumento a uma luva específica. None = automático: a
+        primeira luva ativa, trocada se ela ficar AUTO_DEVICE_SILENCE s sem
+        mandar pacotes (ver _follow_active_device).
+        """
+        self.auto_device = device_id is None
+        if device_id is None:
+            device_id = self.comm.active_device(self.AUTO_DEVICE_SILENCE)
+        self._open_reader(device_id)
+
+    def _open_reader(self, device_id):
+        if device_id == self.device_id:
+            return
+        self.device_id = device_id
+        # Troca atômica do leitor: a thread do worker usa o novo na próxima iteração
+        self.reader = self.comm.open_reader(device_id=device_id)
+
+    def _follow_active_device(self):
+        """ Modo automático: fica na luva atual enquanto ela manda pacotes, senão passa à primeira ativa. """
+        if self.device_id is not None:
+            device = self.comm.get_device(self.device_id, create=False)
+            if device is not None and device.last_seen is not None \
+                    and time.monotonic() - device.last_seen <= self.AUTO_DEVICE_SILENCE:
+                return
+        device_id = self.comm.active_device(self.AUTO_DEVICE_SILENCE)
+        if device_id is not None:
+            self._open_reader(device_id)
+
+    def get_stream_stats(self):
+        """ Contadores do fluxo luva -> worker (atraso, perdas, tamanho de lote, trocas suprimidas). """
+        stats = self.reader.get_stats()
+        stats["suppressed"] = self.guitar.trigger_gate.suppressed
+        return stats
+
+    def get_latency_stats(self):
+        """ Percentis de latência por estágio (ver latency.LatencyTracer). """
+        return self.tracer.snapshot()
+
     def stop(self):
         self.running = False
-        self.comm.new_data_event.set()
+        self.comm.wake_readers()
+        self.data_mutex.lock()
+        self.camera_cond.wakeAll()
+        self.data_mutex.unlock()
         self.wait()
 
+    def _build_logical_data(self, sample, plan):
+        """ Converte uma amostra do buffer no dict esperado pelos instrumentos (IMU + dedos). """
+        return {k: sample[k] for k in plan.fields}
+
     def run(self):
         while self.running:
+            if self.auto_device:
+                self._follow_active_device()
+
             # Se for Bateria (Camera), não espera dados da luva
             if self.current_instrument == "Bateria (Camera)":
-                # Bateria roda a cada 30ms mesmo sem luva
-                time.sleep(0.03)
-            else:
-                # Guitarra espera dados da luva
-                has_data = self.comm.wait_for_data(timeout=0.1)
-                if not has_data:
+                # Acorda a cada resultado novo da câmera (timeout só para checar 'running')
+                camera_data = self._wait_camera_data(100)
+                # Luva não é usada aqui: descarta o atraso sem contar como perda
+                self.reader.skip_to_latest()
+                if camera_data is None:
                     continue
 
-            raw_data = self.comm.get_latest_data()
-            if not raw_data and self.current_instrument != "Bateria (Camera)":
-                continue  # Se for guitarra e não tiver dados, pula
-            
-            logical_data = {}
-            
-            # 1. Copia dados brutos (Accel + Gyro)
-            essential_keys = [
-                'gyro_ax', 'gyro_ay', 'gyro_az', 'gyro_gx', 'gyro_gy', 'gyro_gz',
-                'slave_ax', 'slave_ay', 'slave_az', 'slave_gx', 'slave_gy', 'slave_gz'
-            ]
-            for k in essential_keys:
-                if k in raw_data: logical_data[k] = raw_data[k]
-
-            # 2. Copia Mapeamentos (Dedos)
-            for action, mapping in self.sensor_mappings.items():
-                raw_key = mapping.get("key")
-                if raw_key and raw_key in raw_data:
-                    logical_data[raw_key] = raw_data[raw_key]
-
-            # 3. Pega dados mais recentes da câmera (Thread-Safe)
-            self.data_mutex.lock()
-            current_camera_data = self.camera_data.copy()
-            self.data_mutex.unlock()
-            
-            # Pega o vetor de bateria [0, 1, 0, 0]
-            active_drums = current_camera_data.get("Drum_Vector", [0,0,0,0])
-
-            # 4. Lógica Condicional (Seleção de Instrumento)
-            print(f"🎵 [WORKER] Instrumento Atual: {self.current_instrument}")
-            print(f"🔄 [WORKER] Câmera Vetor: {active_drums}")
-            
-            if self.current_instrument == "Guitarra (Luva)":
-                self.guitar.process_data(
-                    logical_data, 
-                    self.sensor_mappings, 
-                    self.emulator
-                )
-            
-            elif self.current_instrument == "Bateria (Camera)":
-                print(f"🥁 [WORKER] Processando Bateria com vetor: {active_drums}")
-                self.drum.process_data(
-                    logical_data,
-                    active_drums,
-                    self.sensor_mappings,
-                    self.emulator
-                )
\ No newline at end of file
+                # Vetor igual ao último enviado: o emulador não precisa saber
+                active_drums = camera_data.get("Drum_Vector", [0] * self.drum.n_lanes)
+                if active_drums == self._last_drum_vector:
+                    continue
+                self._last_drum_vector = list(active_drums)
+
+                latest = self.comm.get_latest_sample(self.device_id)
+                logical_data = self._build_logical_data(latest, self.plan) if latest is not None else {}
+                self.tracer.begin()  # Vetor vem da câmera: sem tempo de recepção da luva
+                self._process_drum(logical_data, camera_data)
+                continue
+
+            # Guitarra espera dados da luva
+            reader = self.reader
+            if reader is not self._guitar_reader:
+                # Outra luva: filtro e gatilho recomeçam em vez de misturar as duas
+                self.guitar.reset()
+                self._guitar_reader = reader
+            if not reader.wait(timeout=0.1):
+                continue
+            if self.device_id is None:
+                # Nenhuma luva identificada ainda: o buffer comum pode misturar várias
+                reader.skip_to_latest()
+                continue
+
+            # Processa em lote TUDO o que chegou desde a última iteração
+            batch = reader.drain()
+            if len(batch) == 0:
+                continue
+            plan = self.plan  # Um plano por lote, mesmo que a calibração seja salva no meio
+            log.debug("Guitarra: lote de %d amostras", len(batch))
+            t_recv = batch["t_recv"]
+            t_sampled = batch["t_sampled"]
+            self.tracer.begin_batch(t_recv, t_sampled, batch["t_kernel"])
+            # Uma chamada para o lote inteiro: só os canais dos dedos, direto das colunas.
+            # No modo batida o detector vê o giroscópio de TODAS as amostras do lote.
+            guitar = self.guitar
+            times = np.where(np.isnan(t_sampled), t_recv, t_sampled)
+            imu = batch if guitar.use_strumming else None
+            lanes = guitar.process_batch(plan.extract_batch(batch), plan, imu, times)
+            self._emit_lanes(lanes, t_recv, guitar.strum_events)
+
+    def _emit_lanes(self, lanes, t_recv, strums=None):
+        """
+        Entrega ao emulador, em ordem, cada estado de lanes diferente do
+        anterior (T x N de process_batch). Sem mudança no lote, reenvia o
+        último estado (o emulador ignora, mas a decisão entra na latência).
+        Numa batida com lanes já pressionadas, solta tudo antes para a nota
+        ser tocada de novo. Até 63 lanes (máscara em int64).
+        """
+        # Cada linha vira uma máscara de bits (bit i = lane i): comparar e
+        # entregar custa o mesmo com 4 ou com 60 lanes
+        masks = lanes.astype(np.int64) @ (np.int64(1) << np.arange(lanes.shape[1], dtype=np.int64))
+        previous = np.concatenate(([self.emulator.mascara], masks[:-1]))
+        changed = masks != previous
+        restrike = None
+        if strums is not None and len(strums) == len(lanes):
+            restrike = (strums != 0) & ((masks & previous) != 0)
+            changed |= restrike
+        rows = np.flatnonzero(changed)
+        if len(rows) == 0:
+            rows = [len(lanes) - 1]
+        emulator = self.emulator
+        for i in rows:
+            self.tracer.select(float(t_recv[i]))
+            if restrike is not None and restrike[i]:
+                emulator.atualizar_mascara(0)
+            emulator.atualizar_mascara(int(masks[i]))
+
+    def _process_drum(self, logical_data, current_camera_data):
+        """
+        Bateria: um resultado da câmera por chamada. A guitarra não passa
+        por aqui, vai em lote por process_batch/_emit_lanes em run().
+        """
+        # Pega o vetor de bateria [0, 1, 0, 0]
+        active_drums = current_camera_data.get("Drum_Vector", [0] * self.drum.n_lanes)
+        # Formatação preguiçosa: com DEBUG desligado nada disso vira string
+        log.debug("Processando bateria com vetor: %s", active_drums)
+        self.drum.process_data(
+            logical_data,
+            active_drums,
+            self.sensor_mappings,
+            self.emulator
+        )